@@ -1,6 +1,7 @@
 from flask import Flask
 from flask_cors import CORS
 from config import Config
+from api.utils.json_provider import BSONJSONProvider
 
 def create_app():
     """Create and configure the Flask application."""
@@ -9,19 +10,149 @@ def create_app():
     # Load configuration
     app.config.from_object(Config)
     
+    # Serialize ObjectIds and datetimes straight from MongoDB documents
+    app.json = BSONJSONProvider(app)
+    
     # Enable CORS
     CORS(app)
     
+    # Collection versions behind ETags, and the server-side response cache
+    from api.utils.db import get_db
+    from api.utils.versions import collection_versions
+    from api.utils.cache import response_cache
+    collection_versions.init_app(app, get_db)
+    response_cache.init_app(app)
+    
+    # Request metrics and /metrics (MongoDB timings are recorded by the client's listeners)
+    from api.utils.metrics import metrics
+    metrics.init_app(app)
+    
+    # Compress responses for clients that accept gzip, br or zstd
+    from api.utils.compression import compression
+    compression.init_app(app)
+    
+    # Thread pool for running a request's independent queries concurrently
+    from api.utils.fanout import fan_out
+    fan_out.init_app(app)
+    
+    # Name -> id maps for genres and streaming platforms on the write path
+    from api.utils.resolver import genre_names, platform_names
+    genre_names.init_app(app)
+    platform_names.init_app(app)
+    
+    # Cached totals for paginated listings
+    from api.utils.counts import counts
+    counts.init_app(app)
+    
+    # Memory-mapped recommendations snapshot
+    from api.utils.recommend import recommender
+    recommender.init_app(app)
+    
     # Register blueprints
     from api.routes.movies import movies
     from api.routes.streaming import streaming
     from api.routes.genres import genres
     from api.routes.movie_details import movie_details
+    from api.routes.recommendations import recommendations
+    from api.routes.export import export
     
     app.register_blueprint(movies, url_prefix='/api/v1')
     app.register_blueprint(streaming, url_prefix='/api/v1')
     app.register_blueprint(genres, url_prefix='/api/v1')
     app.register_blueprint(movie_details, url_prefix='/api/v1')
+    app.register_blueprint(recommendations, url_prefix='/api/v1')
+    app.register_blueprint(export, url_prefix='/api/v1')
+    
+    # Create any missing indexes without holding up worker startup
+    if app.config.get('ENSURE_INDEXES_ON_STARTUP'):
+        from api.utils.indexes import ensure_indexes_in_background
+        ensure_indexes_in_background(get_db)
+    
+    # Count movies for genres that predate genres.movie_count
+    if app.config.get('BACKFILL_GENRE_COUNTS_ON_STARTUP'):
+        from api.utils.genre_counts import backfill_genre_counts_in_background
+        backfill_genre_counts_in_background(get_db)
+    
+    # Refresh similar movies queued by writes, off the request path
+    from api.utils.similarity import similar_movies_refresher
+    similar_movies_refresher.init_app(app, get_db)
+    
+    # Build the per-worker title suggestion index
+    from api.utils.suggest import title_suggestions
+    title_suggestions.init_app(app, get_db)
+    
+    @app.cli.command('rebuild-similar-movies')
+    def rebuild_similar_movies_command():
+        """Recompute every movie's most similar movies from movie_details."""
+        from api.utils.similarity import rebuild_similar_movies
+        count = rebuild_similar_movies(get_db())
+        print(f"Computed similar movies for {count} movies")
+    
+    @app.cli.command('refresh-similar-movies')
+    def refresh_similar_movies_command():
+        """Refresh the similar movies of every movie queued by a write."""
+        from api.utils.similarity import drain_similar_movies
+        count = drain_similar_movies(get_db())
+        print(f"Refreshed similar movies for {count} movies")
+    
+    @app.cli.command('build-recommendations')
+    def build_recommendations_command():
+        """Build the recommendations snapshot from movie_details."""
+        from api.utils.recommend import build_recommendations
+        count = build_recommendations(get_db(), app.config['RECOMMENDATIONS_PATH'])
+        print(f"Built recommendations for {count} movies")
+    
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Rebuild the movie title search index from the movies collection."""
+        from api.utils.search import rebuild_search_index
+        count = rebuild_search_index(get_db())
+        print(f"Indexed {count} movie titles")
+    
+    @app.cli.command('reconcile-genre-counts')
+    def reconcile_genre_counts_command():
+        """Recompute every genre's movie_count from movie_details."""
+        from api.utils.genre_counts import reconcile_genre_counts
+        corrected = reconcile_genre_counts(get_db())
+        if corrected:
+            collection_versions.bump('genres')
+        print(f"Corrected movie counts for {corrected} genres")
+    
+    @app.cli.command('merge-duplicate-names')
+    def merge_duplicate_names_command():
+        """Fold genres and platforms sharing a name into one, so names can be indexed as unique."""
+        from api.utils.resolver import merge_duplicate_names
+        from api.utils.genre_counts import reconcile_genre_counts
+        db = get_db()
+        genres_removed = merge_duplicate_names(db, 'genres', {'movie_details': 'genres.id'})
+        platforms_removed = merge_duplicate_names(db, 'streaming_platforms_list', {
+            'movies': 'streaming_platforms.platform_id',
+            'movie_details': 'streaming_platforms.platform_id'
+        })
+        if genres_removed:
+            reconcile_genre_counts(db)
+            collection_versions.bump('genres', 'movie_details')
+        if platforms_removed:
+            collection_versions.bump('streaming_platforms_list', 'movies', 'movie_details')
+        print(f"Merged {genres_removed} duplicate genres and {platforms_removed} duplicate platforms")
+    
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Create every index declared in api.utils.indexes, rebuilding changed ones."""
+        from api.utils.indexes import ensure_indexes
+        for collection, names in ensure_indexes(get_db(), rebuild=True).items():
+            print(f"{collection}: {', '.join(names)}")
+    
+    @app.cli.command('check-indexes')
+    def check_indexes_command():
+        """Explain each route's query shape and fail if any needs a COLLSCAN."""
+        from api.utils.indexes import check_indexes
+        report = check_indexes(get_db())
+        for row in report:
+            status = 'COLLSCAN' if row['collscan'] else 'ok'
+            print(f"{status:<8} {row['name']:<45} {row['collection']:<25} {' <- '.join(row['stages'])}")
+        if any(row['collscan'] for row in report):
+            raise SystemExit(1)
     
     @app.route('/health')
     def health_check():
@@ -1,56 +1,99 @@
 from api.utils.db import get_db
+from api.models.loader import RequestLoader, current_loader
+from bson import ObjectId
+from pymongo import ReturnDocument
 from typing import Dict, List, Optional, Any
 
 class BaseModel:
     """Base model class with common database operations."""
-    
-    table_name: str = None
-    
+
+    collection_name: str = None
+    # Field that find_by_id / find_by_ids and the write methods look records up by
+    key_field: str = '_id'
+
     @classmethod
     def get_db(cls):
         return get_db()
-    
+
     @classmethod
-    async def find_by_id(cls, id: str) -> Optional[Dict]:
-        """Retrieve a record by ID."""
+    def collection(cls):
+        return cls.get_db()[cls.collection_name]
+
+    @classmethod
+    def _key(cls, id):
+        """Coerce an id to the stored type of key_field."""
+        if cls.key_field == '_id' and isinstance(id, str) and ObjectId.is_valid(id):
+            return ObjectId(id)
+        return id
+
+    @classmethod
+    def _forget(cls):
+        loader = current_loader()
+        if loader is not None:
+            loader.clear(cls.collection_name)
+
+    @classmethod
+    def find_by_ids(cls, ids: List, projection: Optional[Dict] = None) -> List[Optional[Dict]]:
+        """
+        Retrieve records by key in one query, in the order of `ids`, with None
+        for keys that don't exist. Within a request, repeated keys and keys
+        already loaded are served from the request's loader.
+        """
         try:
-            response = cls.get_db().table(cls.table_name).select("*").eq("id", id).execute()
-            return response.data[0] if response.data else None
+            loader = current_loader() or RequestLoader()
+            keys = [cls._key(id) for id in ids]
+            return loader.load_many(cls.collection(), cls.key_field, keys, projection)
         except Exception as e:
-            raise Exception(f"Error retrieving {cls.table_name}: {str(e)}")
-    
+            raise Exception(f"Error retrieving {cls.collection_name}: {str(e)}")
+
+    @classmethod
+    def find_by_id(cls, id: str, projection: Optional[Dict] = None) -> Optional[Dict]:
+        """Retrieve a record by ID."""
+        return cls.find_by_ids([id], projection)[0]
+
     @classmethod
-    async def find_all(cls) -> List[Dict]:
-        """Retrieve all records."""
+    def find_all(cls, filter: Optional[Dict] = None, projection: Optional[Dict] = None,
+                 sort: Optional[List] = None, limit: int = 0) -> List[Dict]:
+        """Retrieve all records matching a filter."""
         try:
-            response = cls.get_db().table(cls.table_name).select("*").execute()
-            return response.data
+            cursor = cls.collection().find(filter or {}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            return list(cursor.limit(limit))
         except Exception as e:
-            raise Exception(f"Error retrieving {cls.table_name}s: {str(e)}")
-    
+            raise Exception(f"Error retrieving {cls.collection_name}s: {str(e)}")
+
     @classmethod
-    async def create(cls, data: Dict[str, Any]) -> Dict:
+    def create(cls, data: Dict[str, Any]) -> Dict:
         """Create a new record."""
         try:
-            response = cls.get_db().table(cls.table_name).insert(data).execute()
-            return response.data[0]
+            record = dict(data)
+            cls.collection().insert_one(record)
+            cls._forget()
+            return record
         except Exception as e:
-            raise Exception(f"Error creating {cls.table_name}: {str(e)}")
-    
+            raise Exception(f"Error creating {cls.collection_name}: {str(e)}")
+
     @classmethod
-    async def update(cls, id: str, data: Dict[str, Any]) -> Optional[Dict]:
+    def update(cls, id: str, data: Dict[str, Any]) -> Optional[Dict]:
         """Update a record by ID."""
         try:
-            response = cls.get_db().table(cls.table_name).update(data).eq("id", id).execute()
-            return response.data[0] if response.data else None
+            record = cls.collection().find_one_and_update(
+                {cls.key_field: cls._key(id)},
+                {'$set': data},
+                return_document=ReturnDocument.AFTER
+            )
+            cls._forget()
+            return record
         except Exception as e:
-            raise Exception(f"Error updating {cls.table_name}: {str(e)}")
-    
+            raise Exception(f"Error updating {cls.collection_name}: {str(e)}")
+
     @classmethod
-    async def delete(cls, id: str) -> bool:
+    def delete(cls, id: str) -> bool:
         """Delete a record by ID."""
         try:
-            response = cls.get_db().table(cls.table_name).delete().eq("id", id).execute()
-            return bool(response.data)
+            result = cls.collection().delete_one({cls.key_field: cls._key(id)})
+            cls._forget()
+            return result.deleted_count > 0
         except Exception as e:
-            raise Exception(f"Error deleting {cls.table_name}: {str(e)}")
+            raise Exception(f"Error deleting {cls.collection_name}: {str(e)}")
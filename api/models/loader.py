@@ -0,0 +1,94 @@
+from typing import Dict, Iterable, List, Optional
+from flask import g, has_app_context
+
+
+def _with_key_field(projection: Dict, field: str) -> Optional[Dict]:
+    """The projection, made to return the key field needed to match documents to keys."""
+    # An exclusion of the key is dropped, and an inclusion projection always names it,
+    # so {field: 0} or {'title': 1, field: 0} can't make every document look missing
+    projection = dict(projection)
+    projection.pop(field, None)
+    if any(value for name, value in projection.items() if name != '_id'):
+        projection[field] = 1
+    return projection or None
+
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Optional[Dict]:
+    """
+    A full document cut down to a projection of top-level fields, as the
+    server would return it; None when the projection is beyond that (dotted
+    paths, operators) and has to be left to the server.
+    """
+    if not projection:
+        return doc
+    if any('.' in name or not isinstance(value, (bool, int)) for name, value in projection.items()):
+        return None
+    included = [name for name, value in projection.items() if value and name != '_id']
+    if included:
+        projected = {name: doc[name] for name in included if name in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            projected['_id'] = doc['_id']
+        return projected
+    return {name: value for name, value in doc.items() if projection.get(name, 1)}
+
+
+class RequestLoader:
+    """
+    Per-request memo of documents fetched by key, in the spirit of DataLoader.
+
+    Each batch of keys is deduplicated, keys already loaded in this request
+    are answered from memory, and the rest are fetched with a single $in
+    query. A document loaded without a projection also answers projected
+    lookups of the same key, cut down to the projection. Writes through the models clear the collection's
+    entries so a request never reads its own stale copy.
+    """
+
+    def __init__(self):
+        # (collection, field, projection) -> {key: document or None}
+        self._loaded: Dict[tuple, Dict] = {}
+
+    @staticmethod
+    def _projection_key(projection: Optional[Dict]) -> Optional[str]:
+        return repr(sorted(projection.items())) if projection else None
+
+    def load_many(self, collection, field: str, keys: Iterable,
+                  projection: Optional[Dict] = None) -> List[Optional[Dict]]:
+        """Documents whose `field` matches each key, in key order, None where missing."""
+        keys = list(keys)
+        projection_key = self._projection_key(projection)
+        loaded = self._loaded.setdefault((collection.name, field, projection_key), {})
+        query_projection = _with_key_field(projection, field) if projection else None
+
+        if projection_key is not None:
+            full = self._loaded.get((collection.name, field, None), {})
+            for key in dict.fromkeys(keys):
+                if key in full and key not in loaded:
+                    doc = full[key]
+                    projected = _project(doc, query_projection) if doc is not None else None
+                    if doc is None or projected is not None:
+                        loaded[key] = projected
+
+        missing = [key for key in dict.fromkeys(keys) if key not in loaded]
+        if missing:
+            found = {}
+            for doc in collection.find({field: {'$in': missing}}, query_projection):
+                found.setdefault(doc.get(field), doc)
+            for key in missing:
+                loaded[key] = found.get(key)
+
+        # Copies, so callers decorating a document don't change the memo
+        return [dict(loaded[key]) if loaded[key] is not None else None for key in keys]
+
+    def clear(self, collection_name: str):
+        """Forget everything loaded from a collection."""
+        for cache_key in [k for k in self._loaded if k[0] == collection_name]:
+            del self._loaded[cache_key]
+
+
+def current_loader() -> Optional[RequestLoader]:
+    """The loader for the current request, or None outside an app context."""
+    if not has_app_context():
+        return None
+    if '_request_loader' not in g:
+        g._request_loader = RequestLoader()
+    return g._request_loader
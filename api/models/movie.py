@@ -1,34 +1,49 @@
 from typing import Dict, Optional, List
 from . import BaseModel
+from api.utils.search import index_movie_title, remove_movie_title, search_titles
 
 class Movie(BaseModel):
     """Movie model for database operations."""
-    table_name = "movies"
-    
+    collection_name = "movies"
+    key_field = "movie_id"
+
     @classmethod
-    async def find_by_movie_id(cls, movie_id: str) -> Optional[Dict]:
+    def find_by_movie_id(cls, movie_id: str, projection: Optional[Dict] = None) -> Optional[Dict]:
         """Find a movie by movie_id."""
-        try:
-            response = cls.get_db().table(cls.table_name)\
-                .select("*")\
-                .eq("movie_id", movie_id)\
-                .execute()
-            return response.data[0] if response.data else None
-        except Exception as e:
-            raise Exception(f"Error finding movie by movie_id: {str(e)}")
-    
+        return cls.find_by_id(movie_id, projection)
+
+    @classmethod
+    def create(cls, data: Dict) -> Dict:
+        """Create a movie and make its title searchable."""
+        movie = super().create(data)
+        index_movie_title(cls.get_db(), movie['movie_id'], movie['title'])
+        return movie
+
+    @classmethod
+    def update(cls, id: str, data: Dict) -> Optional[Dict]:
+        """Update a movie, re-indexing its title if it changed."""
+        movie = super().update(id, data)
+        if movie and 'title' in data:
+            index_movie_title(cls.get_db(), movie['movie_id'], movie['title'])
+        return movie
+
+    @classmethod
+    def delete(cls, id: str) -> bool:
+        """Delete a movie and drop it from search."""
+        deleted = super().delete(id)
+        if deleted:
+            remove_movie_title(cls.get_db(), id)
+        return deleted
+
     @classmethod
-    async def search_by_title(cls, title: str) -> List[Dict]:
+    def search_by_title(cls, title: str, limit: int = 20) -> List[Dict]:
         """Search movies by title."""
         try:
-            response = cls.get_db().table(cls.table_name)\
-                .select("*")\
-                .ilike("title", f"%{title}%")\
-                .execute()
-            return response.data
+            movies, _ = search_titles(cls.get_db(), title, limit)
+            return movies
         except Exception as e:
             raise Exception(f"Error searching movies: {str(e)}")
-    
+
     @classmethod
     def validate_movie_data(cls, data: Dict) -> Dict:
         """Validate movie data before creation/update."""
@@ -38,94 +53,128 @@ class Movie(BaseModel):
                 raise ValueError(f"Missing required field: {field}")
         return data
 
+# Fields returned by MovieDetail.get_full_movie per profile; 'page' is what a
+# title page shows, 'full' is both documents whole
+FULL_MOVIE_PROFILES = {
+    'page': {
+        'movie': ['movie_id', 'title', 'year', 'runtime', 'streaming_platforms'],
+        'details': ['ua', 'rating', 'description', 'director', 'writers', 'studio', 'cast_members',
+                    'genres', 'streaming_platforms', 'is_featured', 'is_latest'],
+    },
+    'full': None,
+}
+
 class MovieDetail(BaseModel):
     """MovieDetail model for database operations."""
-    table_name = "movie_details"
-    
+    collection_name = "movie_details"
+    key_field = "movie_id"
+
     @classmethod
-    async def find_by_movie_id(cls, movie_id: str) -> Optional[Dict]:
+    def find_by_movie_id(cls, movie_id: str, projection: Optional[Dict] = None) -> Optional[Dict]:
         """Find movie details by movie_id."""
-        try:
-            response = cls.get_db().table(cls.table_name)\
-                .select("*")\
-                .eq("movie_id", movie_id)\
-                .execute()
-            return response.data[0] if response.data else None
-        except Exception as e:
-            raise Exception(f"Error finding movie details by movie_id: {str(e)}")
-    
+        return cls.find_by_id(movie_id, projection)
+
     @classmethod
-    async def create_with_movie(cls, movie_data: Dict, detail_data: Dict) -> Dict:
+    def create_with_movie(cls, movie_data: Dict, detail_data: Dict) -> Dict:
         """Create both movie and its details."""
         try:
             # First create the movie
-            movie = await Movie.create(Movie.validate_movie_data(movie_data))
-            
+            movie = Movie.create(Movie.validate_movie_data(movie_data))
+
             # Then create the movie details
-            detail_data['movie_id'] = movie['movie_id']
-            detail = await cls.create(detail_data)
-            
+            detail = cls.create({**detail_data, 'movie_id': movie['movie_id']})
+
             return {**movie, 'details': detail}
         except Exception as e:
             raise Exception(f"Error creating movie with details: {str(e)}")
-    
+
+    @classmethod
+    def get_full_movies(cls, movie_ids: List[str], detail_projection: Optional[Dict] = None) -> List[Optional[Dict]]:
+        """
+        Get movies with their details, in the order of `movie_ids` (None where
+        the movie doesn't exist). One query per collection however many ids.
+        """
+        try:
+            movies = Movie.find_by_ids(movie_ids)
+            found = [movie['movie_id'] for movie in movies if movie]
+            details = dict(zip(found, cls.find_by_ids(found, detail_projection)))
+            return [
+                ({**movie, 'details': details[movie['movie_id']]} if details.get(movie['movie_id']) else movie)
+                if movie else None
+                for movie in movies
+            ]
+        except Exception as e:
+            raise Exception(f"Error getting full movies: {str(e)}")
+
     @classmethod
-    async def get_full_movie(cls, movie_id: str) -> Optional[Dict]:
-        """Get movie with its details."""
+    def full_movie_pipeline(cls, movie_id: str, profile: str = 'full') -> List[Dict]:
+        """
+        Aggregation on movies joining a movie's details and the current genre
+        and platform documents they reference, projected to `profile`.
+        """
+        pipeline = [
+            {'$match': {'movie_id': movie_id}},
+            {'$limit': 1},
+            {'$lookup': {'from': cls.collection_name, 'localField': 'movie_id',
+                         'foreignField': 'movie_id', 'as': 'details'}},
+            {'$unwind': {'path': '$details', 'preserveNullAndEmptyArrays': True}},
+            {'$lookup': {'from': 'genres', 'localField': 'details.genres.id',
+                         'foreignField': '_id', 'as': '_genres'}},
+            {'$lookup': {'from': 'streaming_platforms_list', 'localField': 'details.streaming_platforms.platform_id',
+                         'foreignField': '_id', 'as': '_detail_platforms'}},
+            {'$lookup': {'from': 'streaming_platforms_list', 'localField': 'streaming_platforms.platform_id',
+                         'foreignField': '_id', 'as': '_movie_platforms'}},
+        ]
+        fields = FULL_MOVIE_PROFILES[profile]
+        if fields:
+            projection = {field: 1 for field in fields['movie']}
+            projection.update({f'details.{field}': 1 for field in fields['details']})
+            for joined in ('_genres', '_detail_platforms', '_movie_platforms'):
+                projection.update({f'{joined}._id': 1, f'{joined}.name': 1})
+            pipeline.append({'$project': projection})
+        return pipeline
+
+    @staticmethod
+    def _resolve_names(movie: Dict) -> Dict:
+        """Replace the names stored on a joined movie's genres and platforms with the current ones."""
+        genres = {genre['_id']: genre.get('name') for genre in movie.pop('_genres', [])}
+        platforms = {
+            platform['_id']: platform.get('name')
+            for platform in movie.pop('_detail_platforms', []) + movie.pop('_movie_platforms', [])
+        }
+        details = movie.get('details') or {}
+        for genre in details.get('genres') or []:
+            genre['name'] = genres.get(genre.get('id')) or genre.get('name')
+        for platform in (movie.get('streaming_platforms') or []) + (details.get('streaming_platforms') or []):
+            platform['platform_name'] = platforms.get(platform.get('platform_id')) or platform.get('platform_name')
+        return movie
+
+    @classmethod
+    def get_full_movie(cls, movie_id: str, profile: str = 'full') -> Optional[Dict]:
+        """Get movie with its details and current genre and platform names, in one round trip."""
         try:
-            movie = await Movie.find_by_movie_id(movie_id)
-            if not movie:
-                return None
-                
-            details = await cls.find_by_movie_id(movie_id)
-            return {**movie, 'details': details} if details else movie
+            movies = list(Movie.collection().aggregate(cls.full_movie_pipeline(movie_id, profile)))
+            return cls._resolve_names(movies[0]) if movies else None
         except Exception as e:
             raise Exception(f"Error getting full movie: {str(e)}")
-            
+
     @classmethod
-    async def get_all_genres(cls) -> List[str]:
-        """Get all unique genres from the database."""
+    def get_all_genres(cls) -> List[str]:
+        """Get all unique genre names used by movie details."""
         try:
-            # Get all non-null genres
-            response = cls.get_db().table(cls.table_name)\
-                .select('genre')\
-                .neq('genre', None)\
-                .execute()
-            
-            # Process genres to get unique values
-            all_genres = set()
-            for item in response.data:
-                genre = item.get('genre')
-                if genre:
-                    # Handle both comma and pipe separated genres
-                    genres = [g.strip() for g in genre.replace('|', ',').split(',')]
-                    # Filter out empty strings
-                    genres = [g for g in genres if g]
-                    all_genres.update(genres)
-            
-            # Return sorted list of genres
-            return sorted(list(filter(None, all_genres)))
+            return sorted(name for name in cls.collection().distinct('genres.name') if name)
         except Exception as e:
             raise Exception(f"Error getting genres: {str(e)}")
-            
+
     @classmethod
-    async def get_featured_movies(cls, limit: int = 10) -> List[Dict]:
-        """Get featured movies with high match scores and recent releases."""
+    def get_featured_movies(cls, limit: int = 10) -> List[Dict]:
+        """Get the newest featured movies, each with its details."""
         try:
-            # Get movies with high match scores and recent releases
-            response = cls.get_db().table(cls.table_name)\
-                .select('*, movies!inner(*)')\
-                .order('match', desc=True)\
-                .limit(limit)\
-                .execute()
-            
-            # Process and format the response
-            featured_movies = []
-            for item in response.data:
-                if 'movies' in item:
-                    movie_data = item.pop('movies')
-                    featured_movies.append({**movie_data, 'details': item})
-            
-            return featured_movies
+            details = cls.find_all({'is_featured': True}, sort=[('created_at', -1)], limit=limit)
+            movies = Movie.find_by_ids([detail['movie_id'] for detail in details])
+            return [
+                {**movie, 'details': detail}
+                for movie, detail in zip(movies, details) if movie
+            ]
         except Exception as e:
-            raise Exception(f"Error getting featured movies: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error getting featured movies: {str(e)}")
@@ -5,23 +5,22 @@ import re
 
 class User(BaseModel):
     """User model for database operations."""
-    table_name = "users"
+    collection_name = "users"
     
     @classmethod
-    async def find_by_email(cls, email: str) -> Optional[Dict]:
+    def find_by_email(cls, email: str) -> Optional[Dict]:
         """Find a user by email."""
         try:
-            response = cls.get_db().table(cls.table_name).select("*").eq("email", email).execute()
-            return response.data[0] if response.data else None
+            return cls.collection().find_one({'email': email})
         except Exception as e:
             raise Exception(f"Error finding user by email: {str(e)}")
     
     @classmethod
-    async def create_user(cls, data: Dict) -> Dict:
+    def create_user(cls, data: Dict) -> Dict:
         """Create a new user with password hashing."""
         validated_data = cls.validate_user_data(data)
         validated_data['password'] = bcrypt.hash(validated_data['password'])
-        return await cls.create(validated_data)
+        return cls.create(validated_data)
     
     @classmethod
     def validate_user_data(cls, data: Dict) -> Dict:
@@ -43,9 +42,9 @@ class User(BaseModel):
         return data
     
     @classmethod
-    async def verify_password(cls, email: str, password: str) -> Optional[Dict]:
+    def verify_password(cls, email: str, password: str) -> Optional[Dict]:
         """Verify user password and return user if valid."""
-        user = await cls.find_by_email(email)
+        user = cls.find_by_email(email)
         if user and bcrypt.verify(password, user['password']):
             return user
         return None
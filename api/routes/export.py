@@ -0,0 +1,126 @@
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from datetime import datetime
+import csv
+import io
+import re
+from api.utils.db import get_db
+from api.utils.fields import InvalidFields, parse_fields
+from api.utils.json_provider import bson_default
+
+export = Blueprint('export', __name__)
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# CSV columns when ?fields= isn't given
+CSV_COLUMNS = ['movie_id', 'title', 'year', 'ua', 'rating', 'runtime', 'director', 'writers', 'studio',
+               'cast_members', 'genres', 'streaming_platforms', 'is_featured', 'is_latest', 'created_at']
+
+def _csv_value(value):
+    """Flatten a field for a CSV cell; lists become '|'-separated names"""
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return '|'.join(
+            str(item.get('name') or item.get('platform_name') or '') if isinstance(item, dict) else str(item)
+            for item in value
+        )
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return bson_default(value)
+
+def _stream_ndjson(results, batch_size):
+    """Yield one JSON document per line, a cursor batch per chunk"""
+    dumps = current_app.json.dumps
+    chunk = []
+    for doc in results:
+        chunk.append(dumps(doc) + '\n')
+        if len(chunk) >= batch_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+def _stream_csv(results, columns, batch_size):
+    """Yield a header row then the documents as CSV rows, a cursor batch per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    for doc in results:
+        writer.writerow([_csv_value(doc.get(column)) for column in columns])
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+def _export_filter(db):
+    """The movie_details filter for ?genre=, ?platform= and ?since=, or a 404 response"""
+    query = {}
+    genre_name = request.args.get('genre')
+    if genre_name:
+        genre = db.genres.find_one({'name': {'$regex': f'^{re.escape(genre_name)}$', '$options': 'i'}}, {'_id': 1})
+        if not genre:
+            return None, (jsonify({'error': 'Genre not found'}), 404)
+        query['genres.id'] = genre['_id']
+    platform_name = request.args.get('platform')
+    if platform_name:
+        platform = db.streaming_platforms_list.find_one(
+            {'name': {'$regex': f'^{re.escape(platform_name)}$', '$options': 'i'}}, {'_id': 1})
+        if not platform:
+            return None, (jsonify({'error': 'Platform not found'}), 404)
+        query['streaming_platforms.platform_id'] = platform['_id']
+    since = request.args.get('since')
+    if since:
+        query['created_at'] = {'$gte': datetime.fromisoformat(since.replace('Z', '+00:00'))}
+    return query, None
+
+@export.route('/export/movie-details', methods=['GET'])
+def export_movie_details():
+    """Stream every movie detail matching the filters as NDJSON or CSV"""
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'format must be ndjson or csv'}), 400
+        fieldset = parse_fields('movie_details')
+        if fieldset.fields is None:
+            columns = CSV_COLUMNS
+        else:
+            # Requested order, with movie_id first
+            names = [name.strip() for name in request.args['fields'].split(',') if name.strip()]
+            columns = list(dict.fromkeys(['movie_id'] + names))
+
+        db = get_db()
+        query, error = _export_filter(db)
+        if error:
+            return error
+
+        # Read in bounded batches and written out batch by batch, so the worker
+        # holds one batch at a time however large the export or slow the client
+        batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+        projection = fieldset.projection or {'_id': 0}
+        results = db.movie_details.find(query, projection).batch_size(batch_size)
+
+        def body():
+            try:
+                if export_format == 'csv':
+                    yield from _stream_csv(results, columns, batch_size)
+                else:
+                    yield from _stream_ndjson(results, batch_size)
+            finally:
+                # Also runs when the client disconnects mid-export
+                results.close()
+
+        return Response(stream_with_context(body()), mimetype=EXPORT_FORMATS[export_format], headers={
+            'Content-Disposition': f'attachment; filename="movie-details.{export_format}"'
+        })
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'since must be an ISO-8601 date'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
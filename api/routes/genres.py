@@ -1,11 +1,51 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, copy_current_request_context, request, jsonify
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+from api.utils.cache import response_cache
+from api.utils.counts import counts
 from api.utils.db import get_db
+from api.utils.fanout import fan_out
+from api.utils.fields import InvalidFields, parse_fields
+from api.utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+from api.utils.resolver import genre_names
+from api.utils.similarity import TOP_K, queue_similar_movies
+from api.utils.versions import collection_versions
 from functools import wraps
+import logging
+
+logger = logging.getLogger(__name__)
 
 genres = Blueprint('genres', __name__)
 
+# sort_by values accepted by /genres/<genre_name>/movies, each backed by an index
+GENRE_MOVIE_SORTS = {
+    'rating': 'rating',
+    'title': 'title',
+    'year': 'year',
+    'runtime': 'runtime'
+}
+
+# Movie fields each genre listing returns when ?fields= isn't given
+TOP_MOVIE_FIELDS = {
+    'movie_id': 1, 'title': 1, 'year': 1, 'rating': 1, 'runtime': 1, 'director': 1, 'description': 1
+}
+GENRE_MOVIE_FIELDS = {
+    'movie_id': 1, 'title': 1, 'year': 1, 'rating': 1, 'runtime': 1, 'director': 1, 'description': 1,
+    'cast_members': 1, 'streaming_platforms': 1, 'is_featured': 1, 'is_latest': 1
+}
+GENRE_PREVIEW_FIELDS = {
+    'movie_id': 1, 'title': 1, 'description': 1, 'rating': 1, 'year': 1, 'runtime': 1, 'director': 1,
+    'is_featured': 1, 'is_latest': 1, 'streaming_platforms': 1
+}
+
+def _joined_movie_projection(fieldset, quality):
+    """$project for movies joined into a genre, with image_url computed only if wanted."""
+    projection = dict(fieldset.projection)
+    if fieldset.wants('image_url'):
+        projection['image_url'] = {'$concat': [f"https://imgcdn.media/pv/{quality}/", '$movie_id', '.jpg']}
+    return projection
+
 def sync_route(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -27,15 +67,14 @@ def search_genres():
             {'name': {'$regex': name, '$options': 'i'}},
             {'name': 1, 'created_at': 1}
         ))
-
-        for genre in genres:
-            genre['_id'] = str(genre['_id'])
             
         return jsonify(genres), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @genres.route('/genres', methods=['POST'])
+@response_cache.invalidates('genres')
+@collection_versions.bumps('genres')
 # @sync_route
 def create_genre():
     """Create a new genre"""
@@ -46,19 +85,23 @@ def create_genre():
 
         genre = {
             'name': data['name'],
+            'movie_count': 0,
             'created_at': datetime.utcnow()
         }
         
         db = get_db()
         collection = db['genres']
-        result = collection.insert_one(genre)
+        collection.insert_one(genre)
         
-        genre['_id'] = str(result.inserted_id)
         return jsonify(genre), 201
+    except DuplicateKeyError:
+        return jsonify({'error': 'Genre already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @genres.route('/genres', methods=['GET'])
+@collection_versions.etag('genres')
+@response_cache.cached(tags=['genres'], timeout=300)
 # @sync_route
 def get_genres():
     """Get all genres"""
@@ -69,9 +112,6 @@ def get_genres():
             {},
             {'name': 1, 'created_at': 1}
         ))
-
-        for genre in genres:
-            genre['_id'] = str(genre['_id'])
             
         return jsonify(genres), 200
     except Exception as e:
@@ -88,14 +128,14 @@ def get_genre(genre_id):
         
         if not genre:
             return jsonify({'error': 'Genre not found'}), 404
-            
-        genre['_id'] = str(genre['_id'])
         
         return jsonify(genre), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @genres.route('/genres/<genre_id>', methods=['PUT'])
+@response_cache.invalidates('genres')
+@collection_versions.bumps('genres')
 # @sync_route
 def update_genre(genre_id):
     """Update a genre"""
@@ -113,12 +153,17 @@ def update_genre(genre_id):
         
         if result.matched_count == 0:
             return jsonify({'error': 'Genre not found'}), 404
+        genre_names.forget_id(ObjectId(genre_id))
             
         return jsonify({'message': 'Genre updated successfully'}), 200
+    except DuplicateKeyError:
+        return jsonify({'error': 'Genre already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @genres.route('/genres/<genre_id>', methods=['DELETE'])
+@response_cache.invalidates('genres')
+@collection_versions.bumps('genres')
 # @sync_route
 def delete_genre(genre_id):
     """Delete a genre"""
@@ -129,51 +174,51 @@ def delete_genre(genre_id):
         
         if result.deleted_count == 0:
             return jsonify({'error': 'Genre not found'}), 404
+        genre_names.forget_id(ObjectId(genre_id))
             
         return jsonify({'message': 'Genre deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @genres.route('/genres/top-movies', methods=['GET'])
+@collection_versions.etag('genres', 'movie_details')
+@response_cache.cached(tags=['genres', 'movie_details'])
 def get_top_movies_by_genre():
     """Get top movies for each genre with customizable limit"""
     try:
         db = get_db()
         limit = int(request.args.get('limit', 15))  # Default to 15 if not specified
         quality = request.args.get('quality', '720')  # Default image quality
+        fieldset = parse_fields('movie_details', default=TOP_MOVIE_FIELDS, computed=['image_url'])
         
         # Validate limit
         if limit < 1:
             return jsonify({'error': 'Limit must be greater than 0'}), 400
         
-        # Get all genres first
-        genres = list(db.genres.find({}, {'name': 1}))
-        
-        result = {}
-        for genre in genres:
-            # Find movies for this genre, sorted by rating
-            movies = list(db.movie_details.find(
-                {'genres.id': genre['_id']},
-                {
-                    'movie_id': 1,
-                    'title': 1,
-                    'year': 1,
-                    'rating': 1,
-                    'runtime': 1,
-                    'director': 1,
-                    'description': 1
+        # One round trip: each genre joins its own top-rated movies server-side,
+        # which an index on (genres.id, rating) serves directly (MongoDB 5.0+)
+        genres = db.genres.aggregate([
+            {'$project': {'name': 1}},
+            {
+                '$lookup': {
+                    'from': 'movie_details',
+                    'localField': '_id',
+                    'foreignField': 'genres.id',
+                    'pipeline': [
+                        {'$sort': {'rating': -1}},
+                        {'$limit': limit},
+                        {'$project': _joined_movie_projection(fieldset, quality)}
+                    ],
+                    'as': 'movies'
                 }
-            ).sort('rating', -1).limit(limit))  # Use the provided limit
-            
-            # Convert ObjectId to string and add image URLs
-            for movie in movies:
-                movie['_id'] = str(movie['_id'])
-                movie['image_url'] = f"https://imgcdn.media/pv/{quality}/{movie['movie_id']}.jpg"
-            
-            # Add to result dictionary
-            result[genre['name']] = movies
+            }
+        ])
+        
+        result = {genre['name']: genre['movies'] for genre in genres}
         
         return jsonify(result), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except ValueError:
         return jsonify({'error': 'Invalid limit parameter'}), 400
     except Exception as e:
@@ -181,14 +226,21 @@ def get_top_movies_by_genre():
 
 @genres.route('/genres/<genre_name>/movies', methods=['GET'])
 def get_movies_by_genre_name(genre_name):
-    """Get all movies for a specific genre"""
+    """Get movies for a specific genre, by page number or keyset cursor"""
     try:
         db = get_db()
+        cursor = request.args.get('cursor')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
         sort_by = request.args.get('sort_by', 'rating')  # default sort by rating
         sort_order = request.args.get('sort_order', 'desc')  # default descending
         quality = request.args.get('quality', '720')  # Default image quality
+        # Totals are reported on numbered pages unless turned off; cursor pages skip them
+        include_total = request.args.get('include_total', 'false' if cursor is not None else 'true').lower() == 'true'
+        count_mode = request.args.get('count', 'exact')  # exact, or approx from the genre's counter
+        if page < 1 or per_page < 1 or count_mode not in ('exact', 'approx'):
+            raise ValueError('Invalid pagination parameters')
+        fieldset = parse_fields('movie_details', default=GENRE_MOVIE_FIELDS, computed=['image_url'])
         
         # Find genre by name (case-insensitive)
         genre = db.genres.find_one({'name': {'$regex': f'^{genre_name}$', '$options': 'i'}})
@@ -197,63 +249,70 @@ def get_movies_by_genre_name(genre_name):
             
         # Prepare sort parameters
         sort_direction = -1 if sort_order.lower() == 'desc' else 1
-        sort_field = {
-            'rating': 'rating',
-            'title': 'title',
-            'year': 'year',
-            'runtime': 'runtime'
-        }.get(sort_by, 'rating')
+        sort_field = GENRE_MOVIE_SORTS.get(sort_by, 'rating')
+        sort_key = f"{sort_field}:{'desc' if sort_direction < 0 else 'asc'}"
         
-        # Calculate skip value for pagination
-        skip = (page - 1) * per_page
+        # Each sort is served by a (genres.id, field, _id) index, so a cursor
+        # page seeks straight to its first row however deep it is
+        query = {'genres.id': genre['_id']}
+        skip = 0
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort_key)
+            query.update(keyset_filter(sort_field, value, last_id, sort_direction))
+        elif cursor is None:
+            skip = (page - 1) * per_page
         
-        # Find movies for this genre with pagination
-        movies = list(db.movie_details.find(
-            {'genres.id': genre['_id']},
-            {
-                'movie_id': 1,
-                'title': 1,
-                'year': 1,
-                'rating': 1,
-                'runtime': 1,
-                'director': 1,
-                'description': 1,
-                'cast_members': 1,
-                'streaming_platforms': 1,
-                'is_featured': 1,
-                'is_latest': 1
-            }
-        ).sort(sort_field, sort_direction).skip(skip).limit(per_page))
+        # Fetch the page and, when asked for, the total count concurrently.
+        # The next cursor is built from the sort field and _id, so those are read even if not asked for
+        calls = [lambda: list(db.movie_details.find(
+            query,
+            fieldset.projection_with(sort_field, '_id')
+        ).sort([(sort_field, sort_direction), ('_id', sort_direction)]).skip(skip).limit(per_page + 1))]
+        if include_total:
+            # The count reads collection versions from the request context, which the pool thread needs a copy of
+            calls.append(copy_current_request_context(lambda: counts.count(
+                db, 'movie_details', {'genres.id': genre['_id']},
+                approx=count_mode == 'approx', estimate=genre.get('movie_count')
+            )))
+        movies, *total = fan_out.gather(*calls)
+        has_more = len(movies) > per_page
+        movies = movies[:per_page]
         
-        # Get total count for pagination
-        total_movies = db.movie_details.count_documents({'genres.id': genre['_id']})
+        next_cursor = None
+        if has_more:
+            last = movies[-1]
+            next_cursor = encode_cursor(last.get(sort_field), last['_id'], sort_key)
         
-        # Convert ObjectId to string and add image URLs
-        for movie in movies:
-            movie['_id'] = str(movie['_id'])
-            movie['image_url'] = f"https://imgcdn.media/pv/{quality}/{movie['movie_id']}.jpg"
-            # Convert platform IDs if present
-            if 'streaming_platforms' in movie:
-                for platform in movie['streaming_platforms']:
-                    if 'platform_id' in platform:
-                        platform['platform_id'] = str(platform['platform_id'])
+        # Add image URLs
+        if fieldset.wants('image_url'):
+            for movie in movies:
+                movie['image_url'] = f"https://imgcdn.media/pv/{quality}/{movie['movie_id']}.jpg"
         
         response = {
             'genre': genre['name'],
-            'total_movies': total_movies,
-            'total_pages': (total_movies + per_page - 1) // per_page,
-            'current_page': page,
             'per_page': per_page,
-            'movies': movies
+            'movies': [fieldset.trim(movie) for movie in movies],
+            'next': next_cursor
         }
+        if cursor is None:
+            response['current_page'] = page
+        if include_total:
+            total_movies, exact = total[0]
+            response['total_movies'] = total_movies
+            response['total_pages'] = (total_movies + per_page - 1) // per_page
+            response['total_exact'] = exact
         
         return jsonify(response), 200
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except ValueError as e:
         return jsonify({'error': 'Invalid pagination parameters'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @genres.route('/genres/with-movies', methods=['GET'])
+@collection_versions.etag('genres', 'movie_details')
+@response_cache.cached(tags=['genres', 'movie_details'], timeout=300)
 def get_genres_with_movies():
     try:
         db = get_db()
@@ -261,64 +320,40 @@ def get_genres_with_movies():
         page = max(int(request.args.get('page', 1)), 1)
         per_page = min(int(request.args.get('per_page', 20)), 50)  # Cap at 50 genres per page
         quality = request.args.get('quality', '720')
+        count_mode = request.args.get('count', 'exact')
+        if count_mode not in ('exact', 'approx'):
+            raise ValueError('count must be exact or approx')
+        fieldset = parse_fields('movie_details', default=GENRE_PREVIEW_FIELDS, computed=['image_url'])
         
-        # Get total genres count for pagination
-        total_genres = db.genres.count_documents({})
-        
-        # Get genres with pagination, sorted by movie count
+        # Page through genres by their maintained movie count (indexed sort),
+        # joining each genre's top movies in the same round trip
         pipeline = [
+            {'$sort': {'movie_count': -1, '_id': 1}},
+            {'$skip': (page - 1) * per_page},
+            {'$limit': per_page},
             {
                 '$lookup': {
                     'from': 'movie_details',
                     'localField': '_id',
                     'foreignField': 'genres.id',
-                    'as': 'movie_count'
-                }
-            },
-            {
-                '$addFields': {
-                    'movieCount': { '$size': '$movie_count' }
+                    'pipeline': [
+                        {'$sort': {'rating': -1, 'year': -1}},
+                        {'$limit': limit},
+                        {'$project': _joined_movie_projection(fieldset, quality)}
+                    ],
+                    'as': 'movies'
                 }
             },
-            { '$sort': { 'movieCount': -1 } },
-            { '$skip': (page - 1) * per_page },
-            { '$limit': per_page }
+            {'$project': {'name': 1, 'movies': 1}}
         ]
         
-        genres = list(db.genres.aggregate(pipeline))
-        
-        result = []
-        for genre in genres:
-            movies = list(db.movie_details.find(
-                {'genres.id': genre['_id']},
-                {
-                    'movie_id': 1,
-                    'title': 1,
-                    'description': 1,
-                    'rating': 1,
-                    'year': 1,
-                    'runtime': 1,
-                    'director': 1,
-                    'is_featured': 1,
-                    'is_latest': 1,
-                    'streaming_platforms': 1
-                }
-            ).sort([('rating', -1), ('year', -1)]).limit(limit))
-            
-            # Process movies...
-            for movie in movies:
-                movie['_id'] = str(movie['_id'])
-                movie['image_url'] = f"https://imgcdn.media/pv/{quality}/{movie['movie_id']}.jpg"
-                if 'streaming_platforms' in movie:
-                    for platform in movie['streaming_platforms']:
-                        if 'platform_id' in platform:
-                            platform['platform_id'] = str(platform['platform_id'])
-            
-            result.append({
-                '_id': str(genre['_id']),
-                'name': genre['name'],
-                'movies': movies
-            })
+        # The page and the total count for pagination are fetched concurrently;
+        # the count goes first so it runs on this thread, where the request's
+        # collection versions are available
+        (total_genres, exact), result = fan_out.gather(
+            lambda: counts.count(db, 'genres', approx=count_mode == 'approx'),
+            lambda: list(db.genres.aggregate(pipeline))
+        )
         
         response = {
             'genres': result,
@@ -326,7 +361,8 @@ def get_genres_with_movies():
                 'total_genres': total_genres,
                 'total_pages': (total_genres + per_page - 1) // per_page,
                 'current_page': page,
-                'per_page': per_page
+                'per_page': per_page,
+                'total_exact': exact
             }
         }
         
@@ -334,6 +370,8 @@ def get_genres_with_movies():
             'Cache-Control': 'public, max-age=300',
             'Vary': 'Accept-Encoding'
         }
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except ValueError:
         return jsonify({'error': 'Invalid parameters'}), 400
     except Exception as e:
@@ -341,52 +379,36 @@ def get_genres_with_movies():
 
 @genres.route('/movie-details/similar', methods=['GET'])
 def get_similar_movies():
-    """Get similar movies based on genres, excluding the current movie"""
+    """Get the precomputed most similar movies to a movie"""
     try:
         db = get_db()
-        genres = request.args.get('genres', '').split(',')
-        exclude_id = request.args.get('exclude')
+        # exclude is the movie's id in older clients, which also sent its genres
+        movie_id = request.args.get('movie_id') or request.args.get('exclude')
         limit = int(request.args.get('limit', 10))
+        fieldset = parse_fields('movie_details', computed=['score'])
 
-        if not genres or not exclude_id:
-            return jsonify({'error': 'Genres and exclude parameters are required'}), 400
-
-        movies = list(db.movie_details.find(
-            {
-                '$and': [
-                    {'movie_id': {'$ne': exclude_id}},
-                    {'genres.name': {'$in': genres}}
-                ]
-            },
-            {
-                'movie_id': 1,
-                'title': 1,
-                'description': 1,
-                'year': 1,
-                'rating': 1,
-                'runtime': 1,
-                'director': 1,
-                'cast_members': 1,
-                'genres': 1,
-                'is_featured': 1,
-                'created_at': 1
-            }
-        ).sort('rating', -1).limit(limit))
-
-        # Convert all ObjectId fields to strings
-        for movie in movies:
-            movie['_id'] = str(movie['_id'])
-            # Convert genre ObjectIds
-            if 'genres' in movie:
-                for genre in movie['genres']:
-                    if 'id' in genre:
-                        genre['id'] = str(genre['id'])
+        if not movie_id:
+            return jsonify({'error': 'movie_id parameter is required'}), 400
+        if not 1 <= limit <= TOP_K:
+            return jsonify({'error': f'limit must be between 1 and {TOP_K}'}), 400
 
-        if not movies:
-            return jsonify([]), 200
+        similar = db.similar_movies.find_one({'movie_id': movie_id}, {'neighbours': {'$slice': limit}})
+        if similar is not None:
+            neighbours = similar['neighbours']
+        else:
+            # Not built yet (e.g. before the first rebuild): the background
+            # refresher works it out, so this answer is empty rather than slow
+            neighbours = []
+            if db.movie_details.find_one({'movie_id': movie_id}, {'_id': 1}) is not None:
+                queue_similar_movies(db, [movie_id])
 
-        return jsonify(movies), 200
+        # Neighbours are stored whole, so fields are picked out here rather than projected
+        return jsonify([fieldset.trim(neighbour) for neighbour in neighbours]), 200
 
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid limit parameter'}), 400
     except Exception as e:
-        print(f"Error in get_similar_movies: {str(e)}")
+        logger.error(f"Error in get_similar_movies: {str(e)}")
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
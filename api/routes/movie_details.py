@@ -1,110 +1,150 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from datetime import datetime
 import uuid
+from api.models.movie import MovieDetail
+from api.utils.cache import response_cache
 from api.utils.db import get_db
+from api.utils.fanout import fan_out
+from api.utils.fields import parse_fields
+from api.utils.versions import collection_versions
+from api.utils.genre_counts import apply_genre_delta, genre_ids, run_in_transaction
+from api.utils.ndjson import iter_ndjson
+from api.utils.resolver import genre_names, platform_names
+from api.utils.search import index_movie_title, index_movie_titles
+from api.utils.similarity import SIMILARITY_FIELDS, queue_similar_movies
+from api.utils.suggest import title_suggestions
 
 movie_details = Blueprint('movie_details', __name__)
 
+# Upper bound on ?batch_size= for bulk ingestion
+MAX_BULK_BATCH_SIZE = 10000
+
+# Most movie ids one /movie-details/batch request may ask for
+MAX_BATCH_IDS = 100
+
 def generate_movie_id():
     """Generate a unique movie ID"""
     return uuid.uuid4().hex.upper()[:26]
 
+def _parse_available_until(value):
+    """Parse an ISO-8601 availability date, accepting a trailing Z"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+def _validate_complete_movie(data):
+    """Why a complete-movie payload can't be stored, or None if it can"""
+    if not isinstance(data, dict) or not data.get('title'):
+        return 'Title is required'
+    if not isinstance(data['title'], str):
+        return 'Title must be a string'
+    genres = data.get('genres') or []
+    if not isinstance(genres, list) or not all(
+            isinstance(genre, dict) and genre.get('name') and isinstance(genre['name'], str)
+            for genre in genres):
+        return 'Each genre needs a name'
+    platforms = data.get('streaming_platforms') or []
+    if not isinstance(platforms, list) or not all(
+            isinstance(platform, dict) and platform.get('platform_name') and isinstance(platform['platform_name'], str)
+            for platform in platforms):
+        return 'Each streaming platform needs a platform_name'
+    try:
+        for platform in platforms:
+            _parse_available_until(platform.get('available_until'))
+    except (AttributeError, TypeError, ValueError):
+        return 'available_until must be an ISO-8601 date'
+    return None
+
+def _complete_movie_documents(data, movie_id, current_time, genre_ids_by_name, platform_ids_by_name):
+    """Build the movies and movie_details records for a validated complete-movie payload"""
+    movie = {
+        'movie_id': movie_id,
+        'title': data['title'],
+        'year': data.get('year'),
+        'runtime': data.get('runtime'),
+        'created_at': current_time,
+        'streaming_platforms': []
+    }
+
+    movie_detail = {
+        'movie_id': movie_id,
+        'title': data['title'],
+        'year': data.get('year'),
+        'ua': data.get('ua'),
+        'rating': data.get('rating'),
+        'is_featured': data.get('is_featured', False),
+        'is_latest': data.get('is_latest', False),
+        'runtime': data.get('runtime'),
+        'description': data.get('description'),
+        'director': data.get('director'),
+        'writers': data.get('writers', []),
+        'studio': data.get('studio'),
+        'cast_members': data.get('cast_members', []),
+        'created_at': current_time,
+        'genres': [],
+        'streaming_platforms': []
+    }
+
+    for genre in data.get('genres') or []:
+        movie_detail['genres'].append({
+            'id': genre_ids_by_name[genre['name']],
+            'name': genre['name']
+        })
+
+    for platform in data.get('streaming_platforms') or []:
+        # The same platform document goes on both the movie and its details
+        platform_doc = {
+            'platform_id': platform_ids_by_name[platform['platform_name']],
+            'platform_name': platform['platform_name'],
+            'available_until': _parse_available_until(platform.get('available_until')),
+            'added_date': current_time
+        }
+        movie['streaming_platforms'].append(platform_doc)
+        movie_detail['streaming_platforms'].append(platform_doc)
+
+    return movie, movie_detail
+
 @movie_details.route('/movies/complete', methods=['POST'])
+@response_cache.invalidates('movies', 'movie_details', 'genres')
+@collection_versions.bumps('movies', 'movie_details', 'genres', 'streaming_platforms_list')
 def create_complete_movie():
     """Create a complete movie with details, genres, and streaming platforms"""
     try:
         data = request.get_json()
-        if not data or not data.get('title'):
-            return jsonify({'error': 'Title is required'}), 400
+        error = _validate_complete_movie(data)
+        if error:
+            return jsonify({'error': error}), 400
 
         db = get_db()
         movie_id = generate_movie_id()
         current_time = datetime.utcnow()
 
-        # 1. Create base movie record
-        movie = {
-            'movie_id': movie_id,
-            'title': data['title'],
-            'year': data.get('year'),
-            'runtime': data.get('runtime'),
-            'created_at': current_time,
-            'streaming_platforms': []
-        }
+        # 1. Resolve genre and platform names to ids, both lookups concurrently
+        genre_ids_by_name, platform_ids_by_name = fan_out.gather(
+            lambda: genre_names.resolve(db, [genre['name'] for genre in data.get('genres') or []]),
+            lambda: platform_names.resolve(
+                db, [platform['platform_name'] for platform in data.get('streaming_platforms') or []]
+            )
+        )
 
-        # 2. Create movie details
-        movie_detail = {
-            'movie_id': movie_id,
-            'title': data['title'],
-            'year': data.get('year'),
-            'ua': data.get('ua'),
-            'rating': data.get('rating'),
-            'is_featured': data.get('is_featured', False),
-            'is_latest': data.get('is_latest', False),
-            'runtime': data.get('runtime'),
-            'description': data.get('description'),
-            'director': data.get('director'),
-            'writers': data.get('writers', []),
-            'studio': data.get('studio'),
-            'cast_members': data.get('cast_members', []),
-            'created_at': current_time,
-            'genres': [],
-            'streaming_platforms': []
-        }
+        # 2. Build the movie and movie details records
+        movie, movie_detail = _complete_movie_documents(
+            data, movie_id, current_time, genre_ids_by_name, platform_ids_by_name
+        )
 
-        # 3. Process genres
-        if data.get('genres'):
-            for genre_data in data['genres']:
-                # Check if genre exists
-                genre = db.genres.find_one({'name': genre_data['name']})
-                if not genre:
-                    # Create new genre if it doesn't exist
-                    genre_result = db.genres.insert_one({
-                        'name': genre_data['name'],
-                        'created_at': current_time
-                    })
-                    genre_id = genre_result.inserted_id
-                else:
-                    genre_id = genre['_id']
-
-                # Add to movie details
-                genre_doc = {
-                    'id': genre_id,
-                    'name': genre_data['name']
-                }
-                movie_detail['genres'].append(genre_doc)
+        # 3. Insert all records and count the movie against its genres
+        def insert_records(session):
+            db.movies.insert_one(movie, session=session)
+            db.movie_details.insert_one(movie_detail, session=session)
+            apply_genre_delta(db, added=genre_ids(movie_detail), session=session)
 
-        # 4. Process streaming platforms
-        if data.get('streaming_platforms'):
-            for platform_data in data['streaming_platforms']:
-                # Check if platform exists
-                platform = db.streaming_platforms_list.find_one({'name': platform_data['platform_name']})
-                if not platform:
-                    # Create new platform if it doesn't exist
-                    platform_result = db.streaming_platforms_list.insert_one({
-                        'name': platform_data['platform_name'],
-                        'active': True,
-                        'created_at': current_time
-                    })
-                    platform_id = platform_result.inserted_id
-                else:
-                    platform_id = platform['_id']
-
-                # Create platform document for both movie and movie_detail
-                platform_doc = {
-                    'platform_id': platform_id,
-                    'platform_name': platform_data['platform_name'],
-                    'available_until': datetime.fromisoformat(platform_data['available_until'].replace('Z', '+00:00')) if platform_data.get('available_until') else None,
-                    'added_date': current_time
-                }
-                movie['streaming_platforms'].append(platform_doc)
-                movie_detail['streaming_platforms'].append(platform_doc)
-
-        # 5. Insert all records
-        db.movies.insert_one(movie)
-        db.movie_details.insert_one(movie_detail)
+        run_in_transaction(db, insert_records)
+        index_movie_title(db, movie_id, data['title'])
+        title_suggestions.upsert(movie_id, data['title'], movie_detail['rating'])
+        queue_similar_movies(db, [movie_id])
 
-        # 6. Prepare response
+        # 4. Prepare response
         response = {
             'movie_id': movie_id,
             'title': data['title'],
@@ -115,7 +155,113 @@ def create_complete_movie():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _insert_unordered(collection, docs):
+    """Insert docs in one unordered write; returns {position: error} for the ones that failed"""
+    if not docs:
+        return {}
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return {err['index']: err.get('errmsg', 'Write failed') for err in e.details.get('writeErrors', [])}
+    return {}
+
+def _insert_complete_batch(db, batch):
+    """Store one batch of validated (line, payload) pairs; returns a report row per line, in line order"""
+    current_time = datetime.utcnow()
+    genre_ids_by_name, platform_ids_by_name = fan_out.gather(
+        lambda: genre_names.resolve(
+            db, [genre['name'] for _, data in batch for genre in data.get('genres') or []]
+        ),
+        lambda: platform_names.resolve(
+            db, [platform['platform_name'] for _, data in batch for platform in data.get('streaming_platforms') or []]
+        )
+    )
+
+    records = [
+        _complete_movie_documents(data, generate_movie_id(), current_time, genre_ids_by_name, platform_ids_by_name)
+        for _, data in batch
+    ]
+
+    # Details are only written for movies that made it in; a movie whose
+    # details were rejected is removed again
+    failed = _insert_unordered(db.movies, [movie for movie, _ in records])
+    stored = [i for i in range(len(records)) if i not in failed]
+    detail_failed = _insert_unordered(db.movie_details, [records[i][1] for i in stored])
+    for position, error in detail_failed.items():
+        failed[stored[position]] = error
+    if detail_failed:
+        orphans = [records[stored[position]][0]['movie_id'] for position in detail_failed]
+        db.movies.delete_many({'movie_id': {'$in': orphans}})
+        stored = [i for i in stored if i not in failed]
+
+    details = [records[i][1] for i in stored]
+    apply_genre_delta(db, added=[genre_id for detail in details for genre_id in genre_ids(detail)])
+    index_movie_titles(db, [(detail['movie_id'], detail['title']) for detail in details])
+    for detail in details:
+        title_suggestions.upsert(detail['movie_id'], detail['title'], detail['rating'])
+    queue_similar_movies(db, [detail['movie_id'] for detail in details])
+
+    return [
+        {'line': line, 'status': 'error', 'error': failed[i]} if i in failed
+        else {'line': line, 'status': 'created', 'movie_id': records[i][0]['movie_id']}
+        for i, (line, _) in enumerate(batch)
+    ]
+
+@movie_details.route('/movies/complete/bulk', methods=['POST'])
+def create_complete_movies_bulk():
+    """Create complete movies from an NDJSON body, one movie per line, reporting each line as NDJSON"""
+    try:
+        batch_size = int(request.args.get('batch_size', current_app.config.get('BULK_INGEST_BATCH_SIZE', 1000)))
+        if not 1 <= batch_size <= MAX_BULK_BATCH_SIZE:
+            return jsonify({'error': f'batch_size must be between 1 and {MAX_BULK_BATCH_SIZE}'}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid batch_size parameter'}), 400
+
+    db = get_db()
+    dumps = current_app.json.dumps
+
+    def flush(batch):
+        try:
+            rows = _insert_complete_batch(db, batch)
+        except Exception as e:
+            rows = [{'line': line, 'status': 'error', 'error': str(e)} for line, _ in batch]
+        if any(row['status'] == 'created' for row in rows):
+            # The response is already under way, so the write decorators
+            # can't do this; readers see each batch as soon as it lands
+            response_cache.invalidate('movies', 'movie_details', 'genres')
+            collection_versions.bump('movies', 'movie_details', 'genres', 'streaming_platforms_list')
+        return ''.join(dumps(row) + '\n' for row in rows)
+
+    def body():
+        # Lines are parsed as they arrive and written a batch at a time; a
+        # line's row goes out once it has failed validation or its batch is written
+        batch = []
+        try:
+            lines = iter_ndjson(
+                request.stream,
+                current_app.json.loads,
+                current_app.config.get('BULK_INGEST_MAX_LINE_BYTES', 1024 * 1024)
+            )
+            for line, data, error in lines:
+                error = error or _validate_complete_movie(data)
+                if error:
+                    yield dumps({'line': line, 'status': 'error', 'error': error}) + '\n'
+                    continue
+                batch.append((line, data))
+                if len(batch) >= batch_size:
+                    yield flush(batch)
+                    batch = []
+            if batch:
+                yield flush(batch)
+        except Exception as e:
+            # Too late for a 500; the last row says why the report stops short
+            yield dumps({'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(body()), mimetype='application/x-ndjson')
+
 @movie_details.route('/movie-details', methods=['POST'])
+@response_cache.invalidates('movie_details')
+@collection_versions.bumps('movie_details')
 def create_movie_detail():
     """Create a new movie detail"""
     try:
@@ -163,50 +309,67 @@ def create_movie_detail():
                 movie_detail['streaming_platforms'].append(platform_doc)
         
         db = get_db()
-        result = db.movie_details.insert_one(movie_detail)
-        
-        # Convert ObjectId and dates to string for response
-        movie_detail['_id'] = str(result.inserted_id)
-        for genre in movie_detail['genres']:
-            genre['id'] = str(genre['id'])
-        for platform in movie_detail['streaming_platforms']:
-            platform['platform_id'] = str(platform['platform_id'])
-            if platform.get('available_until'):
-                platform['available_until'] = platform['available_until'].isoformat()
-            platform['added_date'] = platform['added_date'].isoformat()
+
+        def insert_detail(session):
+            db.movie_details.insert_one(movie_detail, session=session)
+            apply_genre_delta(db, added=genre_ids(movie_detail), session=session)
+
+        run_in_transaction(db, insert_detail)
+        title_suggestions.upsert(movie_detail['movie_id'], movie_detail['title'], movie_detail['rating'])
+        queue_similar_movies(db, [movie_detail['movie_id']])
         
         return jsonify(movie_detail), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@movie_details.route('/movie-details/batch', methods=['GET', 'POST'])
+def get_movie_details_batch():
+    """Get several movie details at once, in the order asked for"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            movie_ids = data.get('movie_ids')
+            fields = data.get('fields')
+        else:
+            movie_ids = [movie_id for movie_id in request.args.get('ids', '').split(',') if movie_id]
+            fields = None
+
+        if not movie_ids or not isinstance(movie_ids, list) or not all(isinstance(i, str) for i in movie_ids):
+            return jsonify({'error': 'A list of movie ids is required'}), 400
+        if len(movie_ids) > MAX_BATCH_IDS:
+            return jsonify({'error': f'At most {MAX_BATCH_IDS} movie ids per request'}), 400
+        fieldset = parse_fields('movie_details', value=fields)
+
+        # One $in query on the indexed movie_id, however many ids are asked for
+        details = MovieDetail.find_by_ids(movie_ids, fieldset.projection)
+
+        return jsonify({
+            'movie_details': details,
+            'missing': list(dict.fromkeys(movie_id for movie_id, detail in zip(movie_ids, details) if detail is None))
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @movie_details.route('/movie-details/<movie_id>', methods=['GET'])
 def get_movie_detail(movie_id):
     """Get a specific movie detail"""
     try:
-        db = get_db()
-        detail = db.movie_details.find_one({'movie_id': movie_id})
+        detail = MovieDetail.find_by_id(movie_id, parse_fields('movie_details').projection)
         
         if not detail:
             return jsonify({'error': 'Movie detail not found'}), 404
-            
-        # Convert ObjectId and dates to string for JSON serialization
-        detail['_id'] = str(detail['_id'])
-        for genre in detail.get('genres', []):
-            if genre.get('id'):
-                genre['id'] = str(genre['id'])
-        for platform in detail.get('streaming_platforms', []):
-            if platform.get('platform_id'):
-                platform['platform_id'] = str(platform['platform_id'])
-            if platform.get('available_until'):
-                platform['available_until'] = platform['available_until'].isoformat()
-            if platform.get('added_date'):
-                platform['added_date'] = platform['added_date'].isoformat()
         
         return jsonify(detail), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @movie_details.route('/movie-details/<movie_id>', methods=['PUT'])
+@response_cache.invalidates('movie_details')
+@collection_versions.bumps('movie_details')
 def update_movie_detail(movie_id):
     """Update a movie detail"""
     try:
@@ -248,14 +411,64 @@ def update_movie_detail(movie_id):
                 platforms.append(platform_doc)
             update_data['streaming_platforms'] = platforms
         
-        result = db.movie_details.update_one(
-            {'movie_id': movie_id},
-            {'$set': update_data}
-        )
+        def update_detail(session):
+            previous = db.movie_details.find_one_and_update(
+                {'movie_id': movie_id},
+                {'$set': update_data},
+                projection={'_id': 0, 'title': 1, 'rating': 1, 'genres': 1},
+                return_document=ReturnDocument.BEFORE,
+                session=session
+            )
+            if previous is not None and 'genres' in update_data:
+                apply_genre_delta(
+                    db,
+                    added=genre_ids(update_data),
+                    removed=genre_ids(previous),
+                    session=session
+                )
+            return previous
+
+        previous = run_in_transaction(db, update_detail)
         
-        if result.matched_count == 0:
+        if previous is None:
             return jsonify({'error': 'Movie detail not found'}), 404
+
+        if 'title' in update_data or 'rating' in update_data:
+            current = {**previous, **update_data}
+            title_suggestions.upsert(movie_id, current.get('title'), current.get('rating'))
+        if SIMILARITY_FIELDS & set(update_data):
+            queue_similar_movies(db, [movie_id])
             
         return jsonify({'message': 'Movie detail updated successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@movie_details.route('/movie-details/<movie_id>', methods=['DELETE'])
+@response_cache.invalidates('movie_details')
+@collection_versions.bumps('movie_details')
+def delete_movie_detail(movie_id):
+    """Delete a movie detail"""
+    try:
+        db = get_db()
+
+        def delete_detail(session):
+            deleted = db.movie_details.find_one_and_delete(
+                {'movie_id': movie_id},
+                projection={'genres': 1},
+                session=session
+            )
+            if deleted is not None:
+                apply_genre_delta(db, removed=genre_ids(deleted), session=session)
+            return deleted
+
+        deleted = run_in_transaction(db, delete_detail)
+
+        if deleted is None:
+            return jsonify({'error': 'Movie detail not found'}), 404
+
+        title_suggestions.remove(movie_id)
+        queue_similar_movies(db, [movie_id])
+
+        return jsonify({'message': 'Movie detail deleted successfully'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
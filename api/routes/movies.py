@@ -1,18 +1,47 @@
-from flask import Blueprint, jsonify, request
-from api.models.movie import Movie, MovieDetail
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from api.models.movie import FULL_MOVIE_PROFILES, Movie, MovieDetail
 from typing import Dict, Any
 from bson import ObjectId
 from datetime import datetime
 import uuid
+from api.utils.cache import response_cache
 from api.utils.db import get_db
+from api.utils.fields import InvalidFields, parse_fields
+from api.utils.versions import collection_versions
+from api.utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+from api.utils.search import index_movie_title, remove_movie_title, search_titles
+from api.utils.suggest import MAX_SUGGESTIONS, title_suggestions
 
 movies = Blueprint('movies', __name__)
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+STREAM_BATCH_SIZE = 500
+
 def generate_movie_id():
     """Generate a unique movie ID"""
     return uuid.uuid4().hex.upper()[:26]
 
+def _stream_json_array(results):
+    """Yield a JSON array from a live cursor, one cursor batch per chunk"""
+    dumps = current_app.json.dumps
+    yield '['
+    first = True
+    chunk = []
+    for movie in results:
+        item = dumps(movie)
+        chunk.append(item if first else ',' + item)
+        first = False
+        if len(chunk) >= STREAM_BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    yield ']'
+
 @movies.route('/movies', methods=['POST'])
+@response_cache.invalidates('movies')
+@collection_versions.bumps('movies')
 def create_movie():
     """Create a new movie"""
     try:
@@ -41,14 +70,8 @@ def create_movie():
                 movie['streaming_platforms'].append(platform_doc)
         
         db = get_db()
-        result = db.movies.insert_one(movie)
-        
-        # Convert ObjectId to string for response
-        movie['_id'] = str(result.inserted_id)
-        for platform in movie['streaming_platforms']:
-            platform['platform_id'] = str(platform['platform_id'])
-            platform['available_until'] = platform['available_until'].isoformat()
-            platform['added_date'] = platform['added_date'].isoformat()
+        db.movies.insert_one(movie)
+        index_movie_title(db, movie['movie_id'], movie['title'])
         
         return jsonify(movie), 201
     except Exception as e:
@@ -56,24 +79,51 @@ def create_movie():
 
 @movies.route('/movies', methods=['GET'])
 def get_movies():
-    """Get all movies"""
+    """Get movies, newest first, one keyset page at a time or streamed"""
     try:
+        cursor = request.args.get('cursor')
+        stream = request.args.get('stream', 'false').lower() == 'true'
+        # A stream is unbounded unless ?limit= is given; pages default to DEFAULT_PAGE_SIZE
+        limit = request.args.get('limit', default=None if stream else DEFAULT_PAGE_SIZE, type=int)
+
+        if limit is not None:
+            if limit < 1:
+                return jsonify({'error': 'Limit must be greater than 0'}), 400
+            if not stream and limit > MAX_PAGE_SIZE:
+                return jsonify({'error': f'Limit cannot exceed {MAX_PAGE_SIZE}'}), 400
+
+        fieldset = parse_fields('movies')
+        query = {}
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query = keyset_filter('created_at', created_at, last_id)
+
         db = get_db()
-        movies_list = list(db.movies.find())
-        
-        # Convert ObjectId and dates to string for JSON serialization
-        for movie in movies_list:
-            movie['_id'] = str(movie['_id'])
-            if movie.get('streaming_platforms'):
-                for platform in movie['streaming_platforms']:
-                    if platform.get('platform_id'):
-                        platform['platform_id'] = str(platform['platform_id'])
-                    if platform.get('available_until'):
-                        platform['available_until'] = platform['available_until'].isoformat()
-                    if platform.get('added_date'):
-                        platform['added_date'] = platform['added_date'].isoformat()
-            
-        return jsonify(movies_list), 200
+        if stream:
+            results = db.movies.find(query, fieldset.projection).sort([('created_at', -1), ('_id', -1)])
+            if limit is not None:
+                results = results.limit(limit)
+            results = results.batch_size(STREAM_BATCH_SIZE)
+            return Response(stream_with_context(_stream_json_array(results)), mimetype='application/json')
+
+        # The cursor is built from created_at and _id, so those are read even if not asked for
+        movies_list = list(db.movies.find(query, fieldset.projection_with('created_at', '_id'))
+                           .sort([('created_at', -1), ('_id', -1)]).limit(limit + 1))
+        has_more = len(movies_list) > limit
+        movies_list = movies_list[:limit]
+
+        next_cursor = None
+        if has_more:
+            last = movies_list[-1]
+            next_cursor = encode_cursor(last.get('created_at'), last['_id'])
+
+        return jsonify({
+            'movies': [fieldset.trim(movie) for movie in movies_list],
+            'next': next_cursor,
+            'limit': limit
+        }), 200
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -81,28 +131,37 @@ def get_movies():
 def get_movie(movie_id):
     """Get a specific movie"""
     try:
-        db = get_db()
-        movie = db.movies.find_one({'movie_id': movie_id})
+        movie = Movie.find_by_movie_id(movie_id, parse_fields('movies').projection)
         
         if not movie:
             return jsonify({'error': 'Movie not found'}), 404
-            
-        # Convert ObjectId and dates to string for JSON serialization
-        movie['_id'] = str(movie['_id'])
-        if movie.get('streaming_platforms'):
-            for platform in movie['streaming_platforms']:
-                if platform.get('platform_id'):
-                    platform['platform_id'] = str(platform['platform_id'])
-                if platform.get('available_until'):
-                    platform['available_until'] = platform['available_until'].isoformat()
-                if platform.get('added_date'):
-                    platform['added_date'] = platform['added_date'].isoformat()
         
+        return jsonify(movie), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@movies.route('/movies/<movie_id>/full', methods=['GET'])
+def get_full_movie(movie_id):
+    """Get a movie with its details and genre and platform names"""
+    try:
+        profile = request.args.get('profile', 'page')
+        if profile not in FULL_MOVIE_PROFILES:
+            return jsonify({'error': f"profile must be one of: {', '.join(FULL_MOVIE_PROFILES)}"}), 400
+
+        movie = MovieDetail.get_full_movie(movie_id, profile)
+
+        if not movie:
+            return jsonify({'error': 'Movie not found'}), 404
+
         return jsonify(movie), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @movies.route('/movies/<movie_id>', methods=['PUT'])
+@response_cache.invalidates('movies')
+@collection_versions.bumps('movies')
 def update_movie(movie_id):
     """Update a movie"""
     try:
@@ -141,12 +200,17 @@ def update_movie(movie_id):
         
         if result.matched_count == 0:
             return jsonify({'error': 'Movie not found'}), 404
+
+        if 'title' in update_data:
+            index_movie_title(db, movie_id, update_data['title'])
             
         return jsonify({'message': 'Movie updated successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @movies.route('/movies/<movie_id>', methods=['DELETE'])
+@response_cache.invalidates('movies')
+@collection_versions.bumps('movies')
 def delete_movie(movie_id):
     """Delete a movie"""
     try:
@@ -155,6 +219,8 @@ def delete_movie(movie_id):
         
         if result.deleted_count == 0:
             return jsonify({'error': 'Movie not found'}), 404
+
+        remove_movie_title(db, movie_id)
             
         return jsonify({'message': 'Movie deleted successfully'}), 200
     except Exception as e:
@@ -162,34 +228,59 @@ def delete_movie(movie_id):
 
 @movies.route('/movies/search', methods=['GET'])
 def search_movies():
-    """Search movies by title"""
+    """Search movies by title, best matches first"""
     try:
         title = request.args.get('title', '')
         if not title:
             return jsonify({'error': 'Title parameter is required'}), 400
 
+        limit = request.args.get('limit', default=DEFAULT_PAGE_SIZE, type=int)
+        if limit < 1:
+            return jsonify({'error': 'Limit must be greater than 0'}), 400
+        if limit > MAX_PAGE_SIZE:
+            return jsonify({'error': f'Limit cannot exceed {MAX_PAGE_SIZE}'}), 400
+
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        fieldset = parse_fields('movies', computed=['score'])
+
         db = get_db()
-        movies_list = list(db.movies.find(
-            {'title': {'$regex': title, '$options': 'i'}}
-        ))
-
-        # Convert ObjectId and dates to string for JSON serialization
-        for movie in movies_list:
-            movie['_id'] = str(movie['_id'])
-            if movie.get('streaming_platforms'):
-                for platform in movie['streaming_platforms']:
-                    if platform.get('platform_id'):
-                        platform['platform_id'] = str(platform['platform_id'])
-                    if platform.get('available_until'):
-                        platform['available_until'] = platform['available_until'].isoformat()
-                    if platform.get('added_date'):
-                        platform['added_date'] = platform['added_date'].isoformat()
+        movies_list, next_cursor = search_titles(db, title, limit, after, fieldset.projection)
             
-        return jsonify(movies_list), 200
+        return jsonify({
+            'movies': [fieldset.trim(movie) for movie in movies_list],
+            'next': next_cursor,
+            'limit': limit
+        }), 200
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@movies.route('/movies/suggest', methods=['GET'])
+def suggest_movies():
+    """Typeahead suggestions for titles starting with the query, best rated first"""
+    try:
+        query = request.args.get('q', '')
+        if not query:
+            return jsonify({'error': 'q parameter is required'}), 400
+
+        limit = request.args.get('limit', default=10, type=int)
+        if limit < 1:
+            return jsonify({'error': 'Limit must be greater than 0'}), 400
+        if limit > MAX_SUGGESTIONS:
+            return jsonify({'error': f'Limit cannot exceed {MAX_SUGGESTIONS}'}), 400
+
+        return jsonify({
+            'query': query,
+            'suggestions': title_suggestions.suggest(query, limit)
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @movies.route('/movies/latest', methods=['GET'])
+@collection_versions.etag('movies')
+@response_cache.cached(tags=['movies'])
 def get_latest_movies():
     """Get latest movies with optional limit parameter"""
     try:
@@ -204,31 +295,21 @@ def get_latest_movies():
 
         db = get_db()
         # Find movies, sort by created_at in descending order, and limit results
-        movies_list = list(db.movies.find().sort('created_at', -1).limit(limit))
-        
-        # Convert ObjectId and dates to string for JSON serialization
-        for movie in movies_list:
-            movie['_id'] = str(movie['_id'])
-            movie['created_at'] = movie['created_at'].isoformat() if movie.get('created_at') else None
-            if movie.get('streaming_platforms'):
-                for platform in movie['streaming_platforms']:
-                    if platform.get('platform_id'):
-                        platform['platform_id'] = str(platform['platform_id'])
-                    if platform.get('available_until'):
-                        platform['available_until'] = platform['available_until'].isoformat()
-                    if platform.get('added_date'):
-                        platform['added_date'] = platform['added_date'].isoformat()
-
+        movies_list = list(db.movies.find({}, parse_fields('movies').projection).sort('created_at', -1).limit(limit))
         
         return jsonify({
             'movies': movies_list,
             'total': len(movies_list),
             'limit': limit
         }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @movies.route('/movies/featured', methods=['GET'])
+@collection_versions.etag('movie_details')
+@response_cache.cached(tags=['movie_details'])
 def get_featured_movies():
     """Get featured movies with optional limit parameter"""
     try:
@@ -242,41 +323,33 @@ def get_featured_movies():
             return jsonify({'error': 'Limit cannot exceed 20'}), 400
 
         db = get_db()
+        fieldset = parse_fields('movie_details', default={
+            '_id': 1,
+            'movie_id': 1,
+            'title': 1,
+            'description': 1,
+            'year': 1,
+            'rating': 1,
+            'runtime': 1,
+            'director': 1,
+            'cast_members': 1,
+            'genres': 1,
+            'is_featured': 1,
+            'created_at': 1,
+            'quality': 1,  # Added quality field
+            'trailerUrl': 1  # Added trailerUrl field
+        })
         featured_movies = list(db.movie_details.find(
             {'is_featured': True},
-            {
-                '_id': 1,
-                'movie_id': 1,
-                'title': 1,
-                'description': 1,
-                'year': 1,
-                'rating': 1,
-                'runtime': 1,
-                'director': 1,
-                'cast_members': 1,
-                'genres': 1,
-                'is_featured': 1,
-                'created_at': 1,
-                'quality': 1,  # Added quality field
-                'trailerUrl': 1  # Added trailerUrl field
-            }
+            fieldset.projection
         ).sort('created_at', -1).limit(limit))  # Sort by newest first and limit results
 
-        # Transform the data for response
-        for movie in featured_movies:
-            movie['_id'] = str(movie['_id'])
-            # Transform genre IDs to strings
-            for genre in movie.get('genres', []):
-                if genre.get('id'):
-                    genre['id'] = str(genre['id'])
-            # Convert datetime to ISO string
-            if movie.get('created_at'):
-                movie['created_at'] = movie['created_at'].isoformat()
-
         return jsonify({
             'movies': featured_movies,
             'total': len(featured_movies),
             'limit': limit
         }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,60 @@
+from flask import Blueprint, request, jsonify
+from api.models.movie import MovieDetail
+from api.utils.fields import InvalidFields, parse_fields
+from api.utils.recommend import recommender
+
+recommendations = Blueprint('recommendations', __name__)
+
+# Bounds on ?seed= and ?limit=
+MAX_SEEDS = 50
+MAX_LIMIT = 100
+
+RECOMMENDATION_PROJECTION = {
+    'movie_id': 1,
+    'title': 1,
+    'description': 1,
+    'year': 1,
+    'rating': 1,
+    'runtime': 1,
+    'director': 1,
+    'cast_members': 1,
+    'genres': 1,
+    'is_featured': 1
+}
+
+@recommendations.route('/recommendations', methods=['GET'])
+def get_recommendations():
+    """Get movies like the seed movies, best match first"""
+    try:
+        seeds = [seed.strip() for seed in request.args.get('seed', '').split(',') if seed.strip()]
+        limit = int(request.args.get('limit', 20))
+        fieldset = parse_fields('movie_details', default=RECOMMENDATION_PROJECTION, computed=['score'])
+
+        if not seeds:
+            return jsonify({'error': 'seed parameter is required'}), 400
+        if len(seeds) > MAX_SEEDS:
+            return jsonify({'error': f'At most {MAX_SEEDS} seed movies are allowed'}), 400
+        if not 1 <= limit <= MAX_LIMIT:
+            return jsonify({'error': f'Limit must be between 1 and {MAX_LIMIT}'}), 400
+
+        matrix = recommender.matrix()
+        if matrix is None:
+            return jsonify({'error': 'Recommendations are not available yet'}), 503
+        if not len(matrix.row_numbers(seeds)):
+            return jsonify({'error': 'None of the seed movies are known'}), 404
+
+        ranked = matrix.most_similar(seeds, limit)
+        details = MovieDetail.find_by_ids([movie_id for movie_id, _ in ranked], fieldset.projection)
+        # Movies deleted since the snapshot was built are skipped
+        movies = [
+            {**detail, 'score': round(score, 4)} if fieldset.wants('score') else detail
+            for (_, score), detail in zip(ranked, details) if detail
+        ]
+
+        return jsonify(movies), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid limit parameter'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
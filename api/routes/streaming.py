@@ -1,11 +1,15 @@
 from flask import Blueprint, request, jsonify
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
 from api.utils.db import get_db
+from api.utils.resolver import platform_names
+from api.utils.versions import collection_versions
 
 streaming = Blueprint('streaming', __name__)
 
 @streaming.route('/platforms', methods=['POST'])
+@collection_versions.bumps('streaming_platforms_list')
 def create_platform():
     """Create a new streaming platform"""
     try:
@@ -20,23 +24,21 @@ def create_platform():
         }
         
         db = get_db()
-        result = db.streaming_platforms_list.insert_one(platform)
+        db.streaming_platforms_list.insert_one(platform)
         
-        platform['_id'] = str(result.inserted_id)
         return jsonify(platform), 201
+    except DuplicateKeyError:
+        return jsonify({'error': 'Platform already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @streaming.route('/platforms', methods=['GET'])
+@collection_versions.etag('streaming_platforms_list')
 def get_platforms():
     """Get all streaming platforms"""
     try:
         db = get_db()
         platforms = list(db.streaming_platforms_list.find({}, {'name': 1, 'active': 1}))
-        
-        # Convert ObjectId to string for JSON serialization
-        for platform in platforms:
-            platform['_id'] = str(platform['_id'])
             
         return jsonify(platforms), 200
     except Exception as e:
@@ -54,14 +56,13 @@ def get_platform(platform_id):
         
         if not platform:
             return jsonify({'error': 'Platform not found'}), 404
-            
-        platform['_id'] = str(platform['_id'])
         
         return jsonify(platform), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @streaming.route('/platforms/<platform_id>', methods=['PUT'])
+@collection_versions.bumps('streaming_platforms_list')
 def update_platform(platform_id):
     """Update a streaming platform"""
     try:
@@ -85,12 +86,16 @@ def update_platform(platform_id):
         
         if result.matched_count == 0:
             return jsonify({'error': 'Platform not found'}), 404
+        platform_names.forget_id(ObjectId(platform_id))
             
         return jsonify({'message': 'Platform updated successfully'}), 200
+    except DuplicateKeyError:
+        return jsonify({'error': 'Platform already exists'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @streaming.route('/platforms/<platform_id>', methods=['DELETE'])
+@collection_versions.bumps('streaming_platforms_list')
 def delete_platform(platform_id):
     """Delete a streaming platform"""
     try:
@@ -99,6 +104,7 @@ def delete_platform(platform_id):
         
         if result.deleted_count == 0:
             return jsonify({'error': 'Platform not found'}), 404
+        platform_names.forget_id(ObjectId(platform_id))
             
         return jsonify({'message': 'Platform deleted successfully'}), 200
     except Exception as e:
@@ -118,9 +124,6 @@ def search_platforms():
             {'name': {'$regex': name, '$options': 'i'}},
             {'name': 1, 'active': 1, 'created_at': 1}
         ))
-
-        for platform in platforms:
-            platform['_id'] = str(platform['_id'])
             
         return jsonify(platforms), 200
     except Exception as e:
@@ -0,0 +1,236 @@
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlencode
+from flask import make_response, request
+from api.utils.compression import compression
+from api.utils.versions import collection_versions
+import logging
+import pickle
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth replaying on a cache hit
+_STORED_HEADERS = ('Content-Type', 'Cache-Control', 'Vary')
+
+
+class MemoryCache:
+    """
+    In-process LRU cache with per-entry TTL and tag-based invalidation.
+    Each gunicorn worker holds its own copy, so invalidations only reach the
+    worker that handled the write; use RedisCache to share entries.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, tags, value = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, timeout: int, tags: Iterable[str] = ()):
+        with self._lock:
+            self._drop(key)
+            tags = tuple(tags)
+            self._entries[key] = (time.monotonic() + timeout, tags, value)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCache:
+    """
+    Cache shared by every worker through Redis 7+ (or any server speaking its protocol).
+    Tags are Redis sets of the keys they cover, kept alive as long as the
+    longest-lived of them; LRU eviction is left to the server's
+    maxmemory-policy (allkeys-lru).
+    """
+
+    def __init__(self, url: str, prefix: str = 'movie-api:cache:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self._redis.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value, timeout: int, tags: Iterable[str] = ()):
+        pipe = self._redis.pipeline()
+        pipe.set(self.prefix + key, pickle.dumps(value), ex=timeout)
+        for tag in tags:
+            tag_key = f'{self.prefix}tag:{tag}'
+            pipe.sadd(tag_key, self.prefix + key)
+            # Only ever extend the tag's TTL: NX sets it on a new tag, GT lengthens
+            # it, so a short-lived entry can't expire the tag before longer ones
+            pipe.expire(tag_key, timeout, nx=True)
+            pipe.expire(tag_key, timeout, gt=True)
+        pipe.execute()
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        for tag in tags:
+            tag_key = f'{self.prefix}tag:{tag}'
+            keys = self._redis.smembers(tag_key)
+            self._redis.delete(tag_key, *keys)
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(self.prefix + '*'))
+        if keys:
+            self._redis.delete(*keys)
+
+
+class NullCache:
+    """Cache that stores nothing, for CACHE_BACKEND=null."""
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value, timeout: int, tags: Iterable[str] = ()):
+        pass
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        pass
+
+    def clear(self):
+        pass
+
+
+class ResponseCache:
+    """
+    Caches whole GET responses keyed on path and normalized query arguments.
+    Bodies worth compressing are stored with a copy per enabled encoding, so a
+    hot entry is compressed once when it is stored rather than on every hit.
+    """
+
+    def __init__(self):
+        self.backend = MemoryCache()
+        self.default_timeout = 60
+        self.max_entry_bytes = 1024 * 1024
+
+    def init_app(self, app):
+        """Pick the backend configured for the app."""
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'])
+        elif backend == 'null':
+            self.backend = NullCache()
+        else:
+            self.backend = MemoryCache(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        self.default_timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', self.default_timeout)
+        self.max_entry_bytes = app.config.get('CACHE_MAX_ENTRY_BYTES', self.max_entry_bytes)
+
+    @staticmethod
+    def make_key(tags: Iterable[str] = ()) -> str:
+        """
+        Route plus query arguments in a canonical order, so ?a=1&b=2 and ?b=2&a=1
+        share an entry. The versions of the tagged collections are part of the
+        key, so a write seen by any worker retires every worker's stale entries.
+        """
+        args = sorted(request.args.items(multi=True))
+        key = f'{request.path}?{urlencode(args)}'
+        versions = collection_versions.current(tags) if tags else None
+        if versions:
+            key += '|' + ','.join(f'{name}={version}' for name, version in sorted(versions.items()))
+        return key
+
+    def cached(self, tags: Iterable[str], timeout: Optional[int] = None):
+        """Serve a GET view from the cache, storing successful responses tagged with `tags`."""
+        tags = tuple(tags)
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                key = self.make_key(tags)
+                try:
+                    hit = self.backend.get(key)
+                except Exception as e:
+                    logger.warning(f"Response cache read failed: {str(e)}")
+                    hit = None
+                if hit is not None:
+                    # Entries stored before compressed variants were kept have none
+                    body, status, headers, *variants = hit
+                    response = make_response(body, status, headers)
+                    compression.serve_variant(response, variants[0] if variants else {})
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    body = response.get_data()
+                    if len(body) <= self.max_entry_bytes:
+                        headers = [(name, response.headers[name]) for name in _STORED_HEADERS
+                                   if name in response.headers]
+                        variants = compression.variants(body, response.mimetype)
+                        # The cap covers the whole stored entry, compressed copies included
+                        if len(body) + sum(len(variant) for variant in variants.values()) <= self.max_entry_bytes:
+                            try:
+                                self.backend.set(key, (body, 200, headers, variants),
+                                                 timeout or self.default_timeout, tags)
+                            except Exception as e:
+                                logger.warning(f"Response cache write failed: {str(e)}")
+                        compression.serve_variant(response, variants)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated_function
+        return decorator
+
+    def invalidates(self, *tags: str):
+        """Drop every cached response tagged with `tags` once a write view succeeds."""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                response = make_response(f(*args, **kwargs))
+                if response.status_code < 400:
+                    self.invalidate(*tags)
+                return response
+            return decorated_function
+        return decorator
+
+    def invalidate(self, *tags: str):
+        try:
+            self.backend.invalidate_tags(tags)
+        except Exception as e:
+            logger.error(f"Response cache invalidation failed: {str(e)}")
+
+
+# Shared by every blueprint; configured in create_app
+response_cache = ResponseCache()
@@ -0,0 +1,161 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from flask import request
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Compression levels per encoding: (per response, once per cached entry).
+# Cached entries are compressed once and served many times, so they get more effort.
+LEVELS = {
+    'br': (4, 9),
+    'zstd': (3, 12),
+    'gzip': (6, 9),
+}
+
+# Media types worth compressing besides text/*
+_COMPRESSIBLE = {'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml'}
+
+
+def _gzip(level: int) -> Tuple[Callable, Callable]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _brotli(level: int) -> Tuple[Callable, Callable]:
+    import brotli
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.finish
+
+
+def _zstd(level: int) -> Tuple[Callable, Callable]:
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return compressor.compress, compressor.flush
+
+
+# Each returns (feed, finish) for one compressed stream
+_ENCODERS = {'br': _brotli, 'zstd': _zstd, 'gzip': _gzip}
+
+
+def available_encodings() -> List[str]:
+    """Encodings this install can produce: gzip always, br and zstd when their packages are installed."""
+    encodings = []
+    for encoding, module in (('br', 'brotli'), ('zstd', 'zstandard')):
+        try:
+            __import__(module)
+            encodings.append(encoding)
+        except ImportError:
+            pass
+    return encodings + ['gzip']
+
+
+class Compressor:
+    """
+    Compresses responses for clients that accept it, as an after_request hook.
+
+    The encoding is the client's most preferred one by Accept-Encoding
+    quality, ties going to the order of `encodings` (the server's
+    preference). Bodies under `min_bytes` and non-text media types are left
+    alone; streamed responses are compressed as they are produced. Responses
+    that already carry a Content-Encoding, such as cached ones stored
+    precompressed (see variants()), are passed through untouched.
+    """
+
+    def __init__(self, min_bytes: int = 1024):
+        self.min_bytes = min_bytes
+        self.encodings = available_encodings()
+
+    def init_app(self, app):
+        self.min_bytes = app.config.get('COMPRESS_MIN_BYTES', self.min_bytes)
+        wanted = app.config.get('COMPRESS_ENCODINGS', 'br,zstd,gzip')
+        available = available_encodings()
+        self.encodings = [encoding.strip() for encoding in wanted.split(',') if encoding.strip() in available]
+        logger.info(f"Response compression: {', '.join(self.encodings) or 'off'}")
+        app.after_request(self.after_request)
+
+    @staticmethod
+    def compressible(mimetype: Optional[str]) -> bool:
+        return bool(mimetype) and (mimetype.startswith('text/') or mimetype in _COMPRESSIBLE
+                                   or mimetype.endswith('+json'))
+
+    def negotiate(self, encodings: Optional[Iterable[str]] = None) -> Optional[str]:
+        """The encoding to answer this request with, or None to send it as is."""
+        encodings = list(self.encodings if encodings is None else encodings)
+        if not encodings:
+            return None
+        # identity competes too, so "gzip;q=0.5, identity" is answered uncompressed
+        best = request.accept_encodings.best_match(encodings + ['identity'])
+        return best if best in encodings else None
+
+    @staticmethod
+    def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+        feed, finish = _ENCODERS[encoding](LEVELS[encoding][0] if level is None else level)
+        return feed(data) + finish()
+
+    def variants(self, body: bytes, mimetype: Optional[str]) -> Dict[str, bytes]:
+        """The body compressed once with every enabled encoding, for storing alongside it."""
+        if len(body) < self.min_bytes or not self.compressible(mimetype):
+            return {}
+        return {encoding: self.compress(body, encoding, LEVELS[encoding][1]) for encoding in self.encodings}
+
+    def serve_variant(self, response, variants: Dict[str, bytes]):
+        """Answer with the stored variant this request accepts, if any; the rest is left to after_request."""
+        if not variants:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate(variants)
+        if encoding is not None:
+            response.set_data(variants[encoding])
+            self._mark(response, encoding)
+        return response
+
+    def after_request(self, response):
+        if not self.encodings or not self.compressible(response.mimetype):
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers or response.direct_passthrough):
+            return response
+
+        if response.is_streamed:
+            encoding = self.negotiate()
+            if encoding is None:
+                return response
+            response.response = self._stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_bytes:
+                return response
+            encoding = self.negotiate()
+            if encoding is None:
+                return response
+            response.set_data(self.compress(data, encoding))
+        self._mark(response, encoding)
+        return response
+
+    @staticmethod
+    def _stream(chunks: Iterable, encoding: str):
+        feed, finish = _ENCODERS[encoding](LEVELS[encoding][0])
+        try:
+            for chunk in chunks:
+                compressed = feed(chunk.encode() if isinstance(chunk, str) else chunk)
+                if compressed:
+                    yield compressed
+            yield finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    @staticmethod
+    def _mark(response, encoding: str):
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag names exact bytes, so each encoding needs its own
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+
+
+# Shared by every blueprint; configured in create_app
+compression = Compressor()
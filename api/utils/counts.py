@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from bson import json_util
+from api.utils.versions import collection_versions
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CountService:
+    """
+    Totals for paginated listings, without a count_documents on every page.
+
+    Exact counts are cached per (collection, filter) and stamped with the
+    collection's version, so the first read after any write through the API
+    recounts; entries also expire after `ttl` seconds to catch writes made
+    outside it. When the version store can't be read, counts aren't cached.
+
+    Approximate counts never touch the filter's documents: an empty filter
+    uses the collection metadata (estimated_document_count), otherwise the
+    caller's maintained estimate or the last cached count is returned, and
+    only when there is neither is an exact count taken.
+    """
+
+    def __init__(self, ttl: int = 300, max_entries: int = 4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('COUNT_CACHE_TTL', self.ttl)
+
+    @staticmethod
+    def _key(collection: str, filter: Dict) -> Tuple[str, str]:
+        return collection, json_util.dumps(filter, sort_keys=True)
+
+    def _cached(self, key, version: Optional[str]) -> Tuple[Optional[int], bool]:
+        """The cached count for key, if any, and whether it is still current for version."""
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None:
+                return None, False
+            self._counts.move_to_end(key)
+            entry_version, expires_at, count = entry
+            return count, entry_version == version and expires_at >= time.monotonic()
+
+    def _remember(self, key, version: str, count: int):
+        with self._lock:
+            self._counts[key] = (version, time.monotonic() + self.ttl, count)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def exact(self, db, collection: str, filter: Optional[Dict] = None) -> int:
+        """Exact number of documents matching filter, cached until the collection changes."""
+        filter = filter or {}
+        versions = collection_versions.current([collection])
+        if versions is None:
+            return db[collection].count_documents(filter)
+
+        key = self._key(collection, filter)
+        count, current = self._cached(key, versions[collection])
+        if not current:
+            count = db[collection].count_documents(filter)
+            self._remember(key, versions[collection], count)
+        return count
+
+    def count(self, db, collection: str, filter: Optional[Dict] = None,
+              approx: bool = False, estimate: Optional[int] = None) -> Tuple[int, bool]:
+        """
+        Returns (total, exact). With approx, `estimate` (e.g. a counter the
+        writes maintain) is preferred over counting the filter's documents.
+        """
+        filter = filter or {}
+        if approx:
+            if not filter:
+                return db[collection].estimated_document_count(), False
+            if estimate is not None:
+                return estimate, False
+            versions = collection_versions.current([collection])
+            count, current = self._cached(self._key(collection, filter), versions and versions[collection])
+            if count is not None:
+                return count, current
+        return self.exact(db, collection, filter), True
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+# Shared by every blueprint; configured in create_app
+counts = CountService()
@@ -5,6 +5,7 @@ import os
 import logging
 import certifi
 import dns.resolver
+from api.utils.metrics import mongo_listeners
 
 load_dotenv()
 
@@ -29,7 +30,8 @@ def get_db():
             serverSelectionTimeoutMS=5000,  # 5 second timeout
             connectTimeoutMS=10000,
             retryWrites=True,
-            w='majority'
+            w='majority',
+            event_listeners=mongo_listeners()  # Command and pool checkout timings for /metrics
         )
         
         # Test the connection
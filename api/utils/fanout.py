@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, List, Optional
+import threading
+
+
+class QueryFanOut:
+    """
+    Runs a request's independent MongoDB calls at the same time.
+
+    pymongo's client is thread-safe and pools its connections, so the calls
+    go to a shared thread pool rather than an event loop: the routes stay
+    plain Flask views under gunicorn, and a request costs roughly its
+    slowest query instead of the sum of all of them.
+    """
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Size the pool from the app config; 0 runs every call inline."""
+        self.max_workers = app.config.get('DB_FANOUT_WORKERS', self.max_workers)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Created lazily so gunicorn forks before any thread is started
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='db-fanout'
+                    )
+        return self._executor
+
+    def gather(self, *calls: Callable) -> List:
+        """
+        Call each zero-argument callable concurrently and return their results
+        in order. The first call runs on the caller's thread. Every call is
+        waited for before the first exception, if any, is re-raised.
+        Cursors must be consumed inside the call (e.g. wrapped in list()).
+        """
+        if len(calls) < 2 or self.max_workers < 1:
+            return [call() for call in calls]
+
+        futures = [self._pool().submit(call) for call in calls[1:]]
+        try:
+            first = calls[0]()
+        finally:
+            wait(futures)
+        return [first] + [future.result() for future in futures]
+
+
+# Shared by every blueprint; configured in create_app
+fan_out = QueryFanOut()
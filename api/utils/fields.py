@@ -0,0 +1,79 @@
+from typing import Dict, Iterable, List, Optional, Union
+from flask import request
+
+
+class InvalidFields(ValueError):
+    """Raised when ?fields= names a field the collection doesn't offer."""
+
+
+# Stored fields a client may ask for with ?fields=, per collection
+FIELDS = {
+    'movies': {
+        '_id', 'movie_id', 'title', 'year', 'runtime', 'created_at', 'streaming_platforms'
+    },
+    'movie_details': {
+        '_id', 'movie_id', 'title', 'year', 'ua', 'rating', 'is_featured', 'is_latest', 'runtime',
+        'description', 'director', 'writers', 'studio', 'cast_members', 'created_at', 'genres',
+        'streaming_platforms', 'quality', 'trailerUrl'
+    },
+}
+
+
+class Fieldset:
+    """
+    The fields a request asked for. `projection` is what to send to MongoDB:
+    the route's default when no fields were asked for, otherwise just the
+    requested stored fields plus the identifying ones. Routes check wants()
+    before computing a derived field and trim() documents they had to read
+    extra fields for.
+    """
+
+    def __init__(self, fields: Optional[set], projection: Optional[Dict]):
+        self.fields = fields
+        self.projection = projection
+
+    def wants(self, field: str) -> bool:
+        return self.fields is None or field in self.fields
+
+    def projection_with(self, *fields: str) -> Optional[Dict]:
+        """The projection, also reading `fields` (e.g. the sort key a cursor is built from)."""
+        if self.projection is None or self.fields is None:
+            return self.projection
+        return {**self.projection, **{field: 1 for field in fields}}
+
+    def trim(self, doc: Dict) -> Dict:
+        """Drop whatever was read but not asked for."""
+        if self.fields is None:
+            return doc
+        return {name: value for name, value in doc.items() if name in self.fields}
+
+
+def parse_fields(collection: str, default: Optional[Dict] = None, computed: Iterable[str] = (),
+                 always: Iterable[str] = ('movie_id',), value: Optional[Union[str, List[str]]] = None) -> Fieldset:
+    """
+    Fieldset for a comma-separated fields value (?fields= unless `value` is
+    given; a JSON body may give a list of names instead), validated against the collection's stored fields plus the
+    route's `computed` ones. `always` fields are returned regardless, so
+    results stay identifiable; _id only when asked for.
+    """
+    if value is None:
+        value = request.args.get('fields')
+    if not value:
+        return Fieldset(None, default)
+
+    computed = set(computed)
+    if isinstance(value, str):
+        value = value.split(',')
+    elif not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise InvalidFields('fields must be a comma-separated string or a list of names')
+    names = [name.strip() for name in value if name.strip()]
+    unknown = [name for name in names if name not in FIELDS[collection] and name not in computed]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+    if not names:
+        raise InvalidFields('No fields given')
+
+    fields = set(names) | set(always)
+    projection = {name: 1 for name in fields if name not in computed}
+    projection.setdefault('_id', 0)
+    return Fieldset(fields, projection)
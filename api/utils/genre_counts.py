@@ -0,0 +1,114 @@
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+from pymongo import UpdateOne
+import logging
+import threading
+
+from api.utils.indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+
+def genre_ids(detail: Optional[dict]) -> List:
+    """Distinct genre ids referenced by a movie_details document."""
+    if not detail:
+        return []
+    return list(dict.fromkeys(g['id'] for g in detail.get('genres') or [] if g.get('id')))
+
+
+# MongoClient -> whether its deployment supports multi-document transactions
+_transaction_support: Dict = {}
+
+
+def supports_transactions(db) -> bool:
+    """
+    Whether db's deployment is a replica set or sharded cluster, the only
+    topologies with transactions. Asked with `hello` once per client.
+    """
+    client = db.client
+    supported = _transaction_support.get(client)
+    if supported is None:
+        reply = client.admin.command('hello')
+        supported = bool(reply.get('setName')) or reply.get('msg') == 'isdbgrid'
+        if not supported:
+            logger.warning("MongoDB is a standalone server without transactions; writes and genre "
+                           "counts are applied one after the other (run `flask reconcile-genre-counts` "
+                           "if a write fails between them)")
+        _transaction_support[client] = supported
+    return supported
+
+
+def run_in_transaction(db, callback: Callable):
+    """
+    Run callback(session) in a multi-document transaction, retrying on
+    transient errors. A standalone server (such as the default local
+    mongodb://localhost) has no transactions, so there callback(None) runs
+    its writes in order without one.
+    """
+    if not supports_transactions(db):
+        return callback(None)
+    with db.client.start_session() as session:
+        return session.with_transaction(callback)
+
+
+def apply_genre_delta(db, added: Iterable = (), removed: Iterable = (), session=None):
+    """Adjust genres.movie_count for a movie gaining and losing genres."""
+    delta = Counter()
+    for genre_id in added:
+        delta[genre_id] += 1
+    for genre_id in removed:
+        delta[genre_id] -= 1
+    operations = [
+        UpdateOne({'_id': genre_id}, {'$inc': {'movie_count': change}})
+        for genre_id, change in delta.items() if change
+    ]
+    if operations:
+        db.genres.bulk_write(operations, ordered=False, session=session)
+
+
+def reconcile_genre_counts(db) -> int:
+    """
+    Recompute every genre's movie_count from movie_details.
+    Returns the number of genres whose stored count was wrong.
+    """
+    ensure_indexes(db, ['genres'])
+    counts = {
+        row['_id']: row['count']
+        for row in db.movie_details.aggregate([
+            {'$unwind': '$genres'},
+            {'$group': {'_id': {'movie': '$_id', 'genre': '$genres.id'}}},
+            {'$group': {'_id': '$_id.genre', 'count': {'$sum': 1}}}
+        ])
+    }
+
+    operations = []
+    for genre in db.genres.find({}, {'movie_count': 1}):
+        count = counts.get(genre['_id'], 0)
+        if genre.get('movie_count') != count:
+            operations.append(UpdateOne({'_id': genre['_id']}, {'$set': {'movie_count': count}}))
+    if operations:
+        db.genres.bulk_write(operations, ordered=False)
+
+    logger.info(f"Reconciled movie counts, {len(operations)} genres corrected")
+    return len(operations)
+
+
+def backfill_genre_counts(db) -> int:
+    """
+    Count movies for genres created before movie_count was maintained.
+    A single find_one once every genre has a count.
+    """
+    if db.genres.find_one({'movie_count': {'$exists': False}}, {'_id': 1}) is None:
+        return 0
+    return reconcile_genre_counts(db)
+
+
+def backfill_genre_counts_in_background(get_db: Callable):
+    """Run backfill_genre_counts on a daemon thread, logging instead of raising on failure."""
+    def run():
+        try:
+            backfill_genre_counts(get_db())
+        except Exception as e:
+            logger.error(f"Failed to backfill genre movie counts: {str(e)}")
+
+    threading.Thread(target=run, name='backfill-genre-counts', daemon=True).start()
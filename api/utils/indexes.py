@@ -0,0 +1,204 @@
+from typing import Callable, Dict, Iterable, List, Optional
+from bson import ObjectId
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Every index the routes rely on, per collection
+INDEXES: Dict[str, List[IndexModel]] = {
+    'movies': [
+        IndexModel([('movie_id', ASCENDING)], name='movie_id'),
+        IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)], name='created_at_id'),
+    ],
+    'movie_details': [
+        IndexModel([('movie_id', ASCENDING)], name='movie_id'),
+        IndexModel([('genres.id', ASCENDING), ('rating', DESCENDING), ('year', DESCENDING)],
+                   name='genre_id_rating_year'),
+        # One per sort offered by /genres/<genre_name>/movies, with _id as the keyset tie-breaker
+        IndexModel([('genres.id', ASCENDING), ('rating', DESCENDING), ('_id', DESCENDING)],
+                   name='genre_id_rating_id'),
+        IndexModel([('genres.id', ASCENDING), ('title', ASCENDING), ('_id', ASCENDING)],
+                   name='genre_id_title_id'),
+        IndexModel([('genres.id', ASCENDING), ('year', DESCENDING), ('_id', DESCENDING)],
+                   name='genre_id_year_id'),
+        IndexModel([('genres.id', ASCENDING), ('runtime', DESCENDING), ('_id', DESCENDING)],
+                   name='genre_id_runtime_id'),
+        IndexModel([('is_featured', ASCENDING), ('created_at', DESCENDING)], name='featured_created_at'),
+        IndexModel([('rating', DESCENDING)], name='rating'),
+        IndexModel([('created_at', DESCENDING)], name='created_at'),
+        # Export filtered by platform
+        IndexModel([('streaming_platforms.platform_id', ASCENDING)], name='platform_id'),
+    ],
+    'genres': [
+        IndexModel([('name', ASCENDING)], name='name', unique=True),
+        IndexModel([('movie_count', DESCENDING), ('_id', ASCENDING)], name='movie_count_id'),
+    ],
+    'streaming_platforms_list': [
+        IndexModel([('name', ASCENDING)], name='name', unique=True),
+    ],
+    'similar_movies': [
+        IndexModel([('movie_id', ASCENDING)], name='movie_id', unique=True),
+        IndexModel([('neighbours.movie_id', ASCENDING)], name='neighbours_movie_id'),
+        IndexModel([('updated_at', ASCENDING)], name='updated_at'),
+        # Candidate lookups when a movie's similar movies are refreshed, by normalized feature
+        IndexModel([('keys', ASCENDING), ('rating', DESCENDING)], name='keys_rating'),
+    ],
+    'similar_movies_queue': [
+        IndexModel([('queued_at', ASCENDING)], name='queued_at'),
+    ],
+    'movie_search': [
+        IndexModel([('movie_id', ASCENDING)], name='movie_id', unique=True),
+        # _id orders each token's and word's postings, so search reads only its newest candidates
+        IndexModel([('tokens', ASCENDING), ('_id', DESCENDING)], name='tokens'),
+        IndexModel([('words', ASCENDING), ('_id', DESCENDING)], name='words'),
+    ],
+}
+
+# Representative query shapes issued by the routes, checked against the planner
+QUERY_SHAPES = [
+    {'name': 'GET /movies', 'collection': 'movies',
+     'filter': {}, 'sort': {'created_at': -1, '_id': -1}, 'limit': 21},
+    {'name': 'GET /movies/latest', 'collection': 'movies',
+     'filter': {}, 'sort': {'created_at': -1}, 'limit': 10},
+    {'name': 'GET /movies/<movie_id>', 'collection': 'movies',
+     'filter': {'movie_id': 'X'}},
+    {'name': 'GET /movie-details/<movie_id>', 'collection': 'movie_details',
+     'filter': {'movie_id': 'X'}},
+    {'name': 'GET /movies/featured', 'collection': 'movie_details',
+     'filter': {'is_featured': True}, 'sort': {'created_at': -1}, 'limit': 5},
+    {'name': 'GET /genres/top-movies (per genre)', 'collection': 'movie_details',
+     'filter': {'genres.id': ObjectId()}, 'sort': {'rating': -1}, 'limit': 15},
+    {'name': 'GET /genres/with-movies (per genre)', 'collection': 'movie_details',
+     'filter': {'genres.id': ObjectId()}, 'sort': {'rating': -1, 'year': -1}, 'limit': 10},
+    {'name': 'GET /genres/<genre_name>/movies', 'collection': 'movie_details',
+     'filter': {'genres.id': ObjectId()}, 'sort': {'rating': -1, '_id': -1}, 'limit': 21},
+    {'name': 'GET /genres/<genre_name>/movies?sort_by=title&cursor=', 'collection': 'movie_details',
+     'filter': {'genres.id': ObjectId(), '$or': [{'title': {'$gt': 'M'}},
+                                                 {'title': 'M', '_id': {'$gt': ObjectId()}}]},
+     'sort': {'title': 1, '_id': 1}, 'limit': 21},
+    {'name': 'GET /movie-details/similar', 'collection': 'similar_movies',
+     'filter': {'movie_id': 'X'}},
+    {'name': 'similar movies refresh (by feature)', 'collection': 'similar_movies',
+     'filter': {'keys': 'cast:x', 'movie_id': {'$ne': 'X'}}, 'sort': {'rating': -1}, 'limit': 1000},
+    {'name': 'similar movies refresh (listed by)', 'collection': 'similar_movies',
+     'filter': {'neighbours.movie_id': 'X'}},
+    {'name': 'GET /export/movie-details?genre=', 'collection': 'movie_details',
+     'filter': {'genres.id': ObjectId()}},
+    {'name': 'GET /export/movie-details?platform=', 'collection': 'movie_details',
+     'filter': {'streaming_platforms.platform_id': ObjectId()}},
+    {'name': 'GET /export/movie-details?since=', 'collection': 'movie_details',
+     'filter': {'created_at': {'$gte': datetime(2024, 1, 1)}}},
+    {'name': 'GET /genres/with-movies', 'collection': 'genres',
+     'filter': {}, 'sort': {'movie_count': -1, '_id': 1}, 'limit': 20},
+    {'name': 'POST /movies/complete (genre by name)', 'collection': 'genres',
+     'filter': {'name': 'Drama'}},
+    {'name': 'POST /movies/complete (platform by name)', 'collection': 'streaming_platforms_list',
+     'filter': {'name': 'Prime'}},
+    {'name': 'GET /movies/search (whole words)', 'collection': 'movie_search',
+     'filter': {'words': {'$all': ['dark']}}, 'sort': {'_id': -1}, 'limit': 1000},
+    {'name': 'GET /movies/search (prefixes)', 'collection': 'movie_search',
+     'filter': {'tokens': {'$all': ['dark']}}, 'sort': {'_id': -1}, 'limit': 1000},
+]
+
+
+def _has_duplicates(collection, keys) -> bool:
+    """Whether any two documents share the values of `keys`, which would fail a unique index build."""
+    group_id = {field.replace('.', '_'): f'${field}' for field in keys}
+    duplicates = collection.aggregate([
+        {'$group': {'_id': group_id, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}},
+        {'$limit': 1}
+    ], allowDiskUse=True)
+    return next(iter(duplicates), None) is not None
+
+
+def ensure_indexes(db, collections: Optional[Iterable[str]] = None,
+                   rebuild: bool = False) -> Dict[str, List[str]]:
+    """
+    Create the declared indexes. Existing indexes with the same definition are
+    left alone, so this is safe to run on every start. An index whose key or
+    uniqueness no longer matches its declaration is only reported, unless
+    `rebuild` is set: then it is dropped and rebuilt, except when it is to
+    become unique and the collection holds duplicates, in which case the
+    existing index is kept. Rebuilds are for one process at a time (the
+    ensure-indexes command or the gunicorn master), never for every worker.
+    Indexes are created one at a time, so one that fails is logged and the
+    rest are still created.
+    Returns the names of the indexes in place per collection.
+    """
+    created = {}
+    for collection in collections or INDEXES:
+        existing = db[collection].index_information()
+        created[collection] = []
+        for model in INDEXES[collection]:
+            spec = model.document
+            current = existing.get(spec['name'])
+            if current and (list(current['key']) != list(spec['key'].items())
+                            or current.get('unique', False) != spec.get('unique', False)):
+                if not rebuild:
+                    logger.warning(f"Index {spec['name']} on {collection} differs from its declaration; "
+                                   f"run `flask ensure-indexes` to rebuild it")
+                    continue
+                if spec.get('unique') and _has_duplicates(db[collection], spec['key']):
+                    logger.error(f"Not rebuilding index {spec['name']} on {collection} as unique: it has "
+                                 f"duplicate values (see `flask merge-duplicate-names`)")
+                    continue
+                logger.info(f"Rebuilding index {spec['name']} on {collection}")
+                db[collection].drop_index(spec['name'])
+            try:
+                created[collection] += db[collection].create_indexes([model])
+            except PyMongoError as e:
+                logger.error(f"Failed to create index {spec['name']} on {collection}: {str(e)}")
+        logger.info(f"Ensured indexes on {collection}: {', '.join(created[collection])}")
+    return created
+
+
+def ensure_indexes_in_background(get_db: Callable):
+    """Create missing indexes on a daemon thread, logging instead of raising on failure."""
+    def run():
+        try:
+            ensure_indexes(get_db())
+        except Exception as e:
+            logger.error(f"Failed to ensure indexes: {str(e)}")
+
+    threading.Thread(target=run, name='ensure-indexes', daemon=True).start()
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of a winning plan tree."""
+    stages = [plan['stage']] if 'stage' in plan else []
+    for child_key in ('inputStage', 'queryPlan'):
+        if child_key in plan:
+            stages += _plan_stages(plan[child_key])
+    for child in plan.get('inputStages', []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def explain_shape(db, shape: dict) -> List[str]:
+    """Ask the planner how it would run a query shape and return the winning plan's stages."""
+    command = {'find': shape['collection'], 'filter': shape['filter']}
+    if shape.get('sort'):
+        command['sort'] = shape['sort']
+    if shape.get('limit'):
+        command['limit'] = shape['limit']
+    explained = db.command('explain', command, verbosity='queryPlanner')
+    return _plan_stages(explained['queryPlanner']['winningPlan'])
+
+
+def check_indexes(db) -> List[dict]:
+    """Explain every declared query shape and flag the ones the planner would answer with a COLLSCAN."""
+    report = []
+    for shape in QUERY_SHAPES:
+        stages = explain_shape(db, shape)
+        report.append({
+            'name': shape['name'],
+            'collection': shape['collection'],
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages
+        })
+    return report
@@ -0,0 +1,61 @@
+from flask.json.provider import DefaultJSONProvider
+from bson import ObjectId, Decimal128
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def bson_default(obj: Any) -> Any:
+    """
+    Serialize the BSON types MongoDB hands back that the JSON encoder does not know.
+    Only called for values the encoder cannot handle natively, so plain
+    strings, numbers, lists and dicts never pay for it.
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class BSONJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes MongoDB documents as they come off the cursor.
+
+    ObjectIds become strings and datetimes become ISO 8601 strings in the same
+    single pass that encodes the rest of the document, so routes can hand raw
+    documents to jsonify. Uses orjson when it is installed and falls back to
+    the standard library encoder otherwise.
+    """
+
+    ensure_ascii = False
+    sort_keys = False
+
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+    _COMPACT = (',', ':')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as JSON, taking the orjson fast path when no formatting is requested."""
+        if orjson is not None and kwargs.get('separators', self._COMPACT) == self._COMPACT \
+                and set(kwargs) <= {'separators'}:
+            options = self._ORJSON_OPTIONS
+            if self.sort_keys:
+                options |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=bson_default, option=options).decode()
+
+        kwargs.setdefault('default', bson_default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
@@ -0,0 +1,195 @@
+from typing import Dict, Tuple
+from flask import Response, g, request
+from pymongo import monitoring
+import os
+import threading
+import time
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# Request latencies from a cache hit (~1 ms) up to the slowest aggregations
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# MongoDB commands and pool checkouts are usually well under a millisecond
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to handle a request, up to the first byte of streamed bodies',
+    ['blueprint', 'route', 'method'], buckets=REQUEST_BUCKETS
+)
+REQUESTS = Counter(
+    'http_requests_total', 'Requests handled, by response status',
+    ['blueprint', 'route', 'method', 'status']
+)
+IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'Requests being handled right now',
+    ['blueprint', 'route'], multiprocess_mode='livesum'
+)
+MONGO_LATENCY = Histogram(
+    'mongodb_command_duration_seconds', 'Time MongoDB commands took, as seen by the driver',
+    ['command', 'collection'], buckets=MONGO_BUCKETS
+)
+MONGO_FAILURES = Counter(
+    'mongodb_command_failures_total', 'MongoDB commands that failed',
+    ['command', 'collection']
+)
+POOL_WAIT = Histogram(
+    'mongodb_pool_checkout_wait_seconds', 'Time spent waiting for a pooled MongoDB connection',
+    buckets=MONGO_BUCKETS
+)
+POOL_FAILURES = Counter(
+    'mongodb_pool_checkout_failures_total', 'Connection checkouts that failed, by reason',
+    ['reason']
+)
+
+# Labelled children by (metric, labels); labels() takes a lock and validates on every call
+_children: Dict[Tuple, object] = {}
+
+
+def _child(metric, *labels):
+    child = _children.get((metric, labels))
+    if child is None:
+        child = _children[metric, labels] = metric.labels(*labels)
+    return child
+
+
+class CommandTimer(monitoring.CommandListener):
+    """
+    Times every MongoDB command by name and collection. Only the started
+    event carries the command document, so its collection is remembered
+    under the request id until the command finishes.
+    """
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+
+    @staticmethod
+    def _collection(event) -> str:
+        target = event.command.get(event.command_name)
+        # getMore and killCursors name the cursor id first and the collection separately
+        return target if isinstance(target, str) else str(event.command.get('collection', ''))
+
+    def started(self, event):
+        self._collections[event.request_id, event.connection_id] = self._collection(event)
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.request_id, event.connection_id), '')
+        _child(MONGO_LATENCY, event.command_name, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.request_id, event.connection_id), '')
+        _child(MONGO_LATENCY, event.command_name, collection).observe(event.duration_micros / 1e6)
+        _child(MONGO_FAILURES, event.command_name, collection).inc()
+
+
+class PoolTimer(monitoring.ConnectionPoolListener):
+    """
+    Times how long threads wait to check a connection out of the pool. The
+    driver reports the wait itself from pymongo 4.7; before that it is
+    measured from the checkout-started event on the same thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = getattr(event, 'duration', None)
+        if wait is None:
+            wait = time.perf_counter() - getattr(self._local, 'started', time.perf_counter())
+        POOL_WAIT.observe(wait)
+
+    def connection_check_out_failed(self, event):
+        POOL_FAILURES.labels(str(event.reason)).inc()
+
+    # The rest of the pool's events aren't measured
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+def mongo_listeners():
+    """Listeners to pass to MongoClient(event_listeners=...)."""
+    return [CommandTimer(), PoolTimer()]
+
+
+def _labels() -> Tuple[str, str]:
+    """(blueprint, route template) for the current request; unmatched URLs share one label."""
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    return request.blueprint or '', route
+
+
+class Metrics:
+    """
+    Request metrics recorded by Flask hooks, and the /metrics endpoint.
+
+    With gunicorn, each worker writes its samples to files under
+    PROMETHEUS_MULTIPROC_DIR (set by gunicorn.conf.py, which also empties it
+    when the server starts and drops exited workers' live gauges) and /metrics
+    merges every worker's files, so any worker answers for all of them. Without that
+    variable, e.g. under `flask run`, the process's own metrics are served.
+    """
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        app.add_url_rule('/metrics', 'metrics', self.export)
+
+    @staticmethod
+    def _before():
+        g.metrics_labels = _labels()
+        g.metrics_started = time.perf_counter()
+        _child(IN_PROGRESS, *g.metrics_labels).inc()
+
+    @staticmethod
+    def _after(response):
+        labels = g.get('metrics_labels')
+        if labels is not None:
+            _child(REQUEST_LATENCY, *labels, request.method).observe(time.perf_counter() - g.metrics_started)
+            _child(REQUESTS, *labels, request.method, str(response.status_code)).inc()
+        return response
+
+    @staticmethod
+    def _teardown(exc):
+        labels = g.pop('metrics_labels', None)
+        if labels is not None:
+            _child(IN_PROGRESS, *labels).dec()
+
+    @staticmethod
+    def export():
+        """Metrics in the Prometheus text format"""
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+# Shared by every blueprint; configured in create_app
+metrics = Metrics()
@@ -0,0 +1,37 @@
+from typing import Any, Callable, Iterator, Optional, Tuple
+import json
+
+# Default cap on a single NDJSON line; longer lines are reported and skipped
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def iter_ndjson(stream, loads: Callable = json.loads,
+                max_line_bytes: int = MAX_LINE_BYTES) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """
+    Parse newline-delimited JSON from a binary stream one line at a time,
+    so the whole body never sits in memory.
+
+    Yields (line_number, value, error) for every non-blank line; exactly one
+    of value and error is set. Line numbers start at 1 and count blank lines.
+    """
+    line_number = 0
+    while True:
+        raw = stream.readline(max_line_bytes + 1)
+        if not raw:
+            return
+        line_number += 1
+
+        if len(raw) > max_line_bytes and not raw.endswith(b'\n'):
+            # Drain the rest of the oversized line before moving on
+            while raw and not raw.endswith(b'\n'):
+                raw = stream.readline(max_line_bytes + 1)
+            yield line_number, None, f'Line exceeds {max_line_bytes} bytes'
+            continue
+
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            yield line_number, loads(raw), None
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {str(e)}'
@@ -0,0 +1,66 @@
+from bson import ObjectId
+from datetime import datetime
+from typing import Optional
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(value, last_id: ObjectId, sort: Optional[str] = None) -> str:
+    """
+    Encode the sort value and _id of the last row of a page into an opaque token.
+    Datetimes are tagged so they round-trip back to datetimes. Routes offering
+    several orderings pass `sort` so a token can't be replayed under another.
+    """
+    if isinstance(value, datetime):
+        value = {'$date': value.isoformat()}
+    state = {'v': value, 'i': str(last_id)}
+    if sort:
+        state['s'] = sort
+    payload = json.dumps(state, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str, sort: Optional[str] = None):
+    """Decode a token produced by encode_cursor into (sort value, ObjectId)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = payload['v']
+        if isinstance(value, dict) and '$date' in value:
+            value = datetime.fromisoformat(value['$date'])
+        last_id = ObjectId(payload['i'])
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+    if payload.get('s') != sort:
+        raise InvalidCursor('Cursor does not match the requested sort')
+    return value, last_id
+
+
+def keyset_filter(field: str, value, last_id: ObjectId, direction: int = -1) -> dict:
+    """
+    Build the filter selecting rows strictly after (value, last_id) when sorting
+    by [(field, direction), ('_id', direction)].
+
+    Documents where the field is missing or null sort before every other value
+    in MongoDB, so they are handled explicitly on both ends of the ordering.
+    """
+    op = '$lt' if direction < 0 else '$gt'
+    if value is None:
+        if direction < 0:
+            return {field: None, '_id': {op: last_id}}
+        return {'$or': [
+            {field: None, '_id': {op: last_id}},
+            {field: {'$ne': None}}
+        ]}
+
+    clauses = [
+        {field: {op: value}},
+        {field: value, '_id': {op: last_id}}
+    ]
+    if direction < 0:
+        clauses.append({field: None})
+    return {'$or': clauses}
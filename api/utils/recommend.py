@@ -0,0 +1,266 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How much each kind of feature counts. Within a kind the weight is shared
+# between a movie's values, so a long cast list doesn't drown out its genres.
+FEATURE_WEIGHTS = {
+    'genre': 1.0,
+    'cast': 0.6,
+    'director': 0.8,
+    'writer': 0.5,
+    'studio': 0.4,
+    'decade': 0.3,
+}
+
+# Weight of the single numeric column holding the rating scaled to 0-1
+RATING_WEIGHT = 0.3
+
+FIELDS = {'movie_id': 1, 'genres': 1, 'cast_members': 1, 'director': 1,
+          'writers': 1, 'studio': 1, 'year': 1, 'rating': 1}
+
+# Arrays in a snapshot directory, each memory-mapped on load
+_ARRAYS = ('indptr', 'indices', 'data', 'col_indptr', 'col_rows', 'col_data', 'movie_ids', 'id_order')
+_META = 'meta.json'
+
+
+def _names(values) -> List[str]:
+    if isinstance(values, str):
+        values = [values]
+    return [value.strip().lower() for value in values or [] if isinstance(value, str) and value.strip()]
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(str(value).strip()[:4]) if isinstance(value, str) else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def movie_tokens(doc: Dict) -> Dict[str, List[str]]:
+    """A movie_details document's categorical features, per kind."""
+    year = _number(doc.get('year'))
+    return {
+        'genre': [str(genre.get('id') or genre.get('name')) for genre in doc.get('genres') or []
+                  if isinstance(genre, dict) and (genre.get('id') or genre.get('name'))],
+        'cast': _names(doc.get('cast_members')),
+        'director': _names(doc.get('director')),
+        'writer': _names(doc.get('writers')),
+        'studio': _names(doc.get('studio')),
+        'decade': [str(int(year) // 10 * 10)] if year else [],
+    }
+
+
+class FeatureMatrix:
+    """
+    Row-normalized sparse movie x feature matrix, kept as plain NumPy arrays
+    so a snapshot can be memory-mapped and shared by workers.
+
+    Rows are stored in CSR form (indptr/indices/data) to read a seed's
+    features, and again column by column (col_indptr/col_rows/col_data) so
+    scoring only touches the movies sharing a feature with the seeds, in one
+    np.bincount. `movie_ids` holds each row's id and `id_order` the rows in
+    id order, so seeds are found with a binary search rather than a
+    per-worker dict.
+    """
+
+    def __init__(self, indptr, indices, data, col_indptr, col_rows, col_data, movie_ids, id_order, features: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.col_indptr = col_indptr
+        self.col_rows = col_rows
+        self.col_data = col_data
+        self.movie_ids = movie_ids
+        self.id_order = id_order
+        self.features = features
+
+    @property
+    def size(self) -> int:
+        return len(self.indptr) - 1
+
+    @classmethod
+    def build(cls, docs: Iterable[Dict]) -> 'FeatureMatrix':
+        """Build the matrix from movie_details documents (see FIELDS)."""
+        vocabulary: Dict[Tuple[str, str], int] = {}
+        indptr, indices, data, ids = [0], [], [], []
+        rating_column = None
+
+        for doc in docs:
+            if not doc.get('movie_id'):
+                continue
+            row = {}
+            for kind, values in movie_tokens(doc).items():
+                values = list(dict.fromkeys(values))
+                for value in values:
+                    column = vocabulary.setdefault((kind, value), len(vocabulary))
+                    row[column] = FEATURE_WEIGHTS[kind] / math.sqrt(len(values))
+            rating = _number(doc.get('rating'))
+            if rating is not None:
+                if rating_column is None:
+                    rating_column = vocabulary.setdefault(('rating', ''), len(vocabulary))
+                row[rating_column] = RATING_WEIGHT * min(max(rating, 0.0), 10.0) / 10.0
+
+            norm = math.sqrt(sum(value * value for value in row.values())) or 1.0
+            indices.extend(row)
+            data.extend(value / norm for value in row.values())
+            indptr.append(len(indices))
+            ids.append(str(doc['movie_id']))
+
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(data, dtype=np.float32)
+        rows = np.repeat(np.arange(len(ids), dtype=np.int32), np.diff(indptr))
+        by_column = np.argsort(indices, kind='stable')
+        movie_ids = np.asarray(ids, dtype=str)
+        return cls(
+            indptr=indptr,
+            indices=indices,
+            data=data,
+            col_indptr=np.concatenate(([0], np.cumsum(np.bincount(indices, minlength=len(vocabulary))))),
+            col_rows=rows[by_column],
+            col_data=data[by_column],
+            movie_ids=movie_ids,
+            id_order=np.argsort(movie_ids, kind='stable').astype(np.int32),
+            features=len(vocabulary),
+        )
+
+    def row_numbers(self, movie_ids: Iterable[str]) -> np.ndarray:
+        """Rows of the given ids, leaving out unknown ones."""
+        wanted = np.asarray(list(movie_ids), dtype=str)
+        if not len(wanted) or not len(self.movie_ids):
+            return np.empty(0, dtype=np.int32)
+        positions = np.searchsorted(self.movie_ids, wanted, sorter=self.id_order)
+        rows = self.id_order[np.minimum(positions, len(self.id_order) - 1)]
+        return np.unique(rows[self.movie_ids[rows] == wanted])
+
+    def profile(self, rows: np.ndarray) -> np.ndarray:
+        """Dense unit vector averaging the given rows."""
+        vector = np.zeros(self.features, dtype=np.float32)
+        for row in rows:
+            start, end = self.indptr[row], self.indptr[row + 1]
+            np.add.at(vector, self.indices[start:end], self.data[start:end])
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def scores(self, vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every movie to a unit vector, reading only the vector's columns."""
+        columns = np.flatnonzero(vector)
+        starts = self.col_indptr[columns]
+        lengths = self.col_indptr[columns + 1] - starts
+        # Positions of every stored value in those columns, gathered without a Python loop
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        positions = np.arange(lengths.sum()) + offsets
+        weights = self.col_data[positions] * np.repeat(vector[columns], lengths)
+        return np.bincount(self.col_rows[positions], weights=weights, minlength=self.size).astype(np.float32)
+
+    def most_similar(self, movie_ids: Iterable[str], k: int) -> List[Tuple[str, float]]:
+        """The k movies most like the given ones combined, best first, never the seeds themselves."""
+        seeds = self.row_numbers(movie_ids)
+        if not len(seeds):
+            return []
+        scores = self.scores(self.profile(seeds))
+        scores[seeds] = -np.inf
+        k = min(k, self.size - len(seeds))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(str(self.movie_ids[row]), float(scores[row])) for row in top if scores[row] > 0]
+
+    def save(self, path: str, built_at: Optional[datetime] = None):
+        """
+        Write the snapshot to directory `path`, replacing any previous one.
+        The new files are written next to it and swapped in with renames;
+        workers still mapping the old files keep reading them until reload.
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        staging = f'{path}.tmp-{os.getpid()}'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in _ARRAYS:
+            np.save(os.path.join(staging, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(staging, _META), 'w') as f:
+            json.dump({
+                'movies': self.size,
+                'features': self.features,
+                'nnz': int(len(self.data)),
+                'built_at': (built_at or datetime.utcnow()).isoformat()
+            }, f)
+
+        retired = f'{path}.old-{os.getpid()}'
+        if os.path.exists(path):
+            os.replace(path, retired)
+        os.replace(staging, path)
+        shutil.rmtree(retired, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str) -> 'FeatureMatrix':
+        """Memory-map a snapshot written by save()."""
+        with open(os.path.join(path, _META)) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS}
+        return cls(features=meta['features'], **arrays)
+
+
+def build_recommendations(db, path: str) -> int:
+    """Build the feature matrix from movie_details and write it to `path`. Returns the number of movies."""
+    matrix = FeatureMatrix.build(db.movie_details.find({}, FIELDS).batch_size(5000))
+    matrix.save(path)
+    logger.info(f"Built recommendations for {matrix.size} movies ({matrix.features} features) at {path}")
+    return matrix.size
+
+
+class Recommender:
+    """
+    The snapshot a worker answers recommendations from. It is mapped on first
+    use and re-mapped when a rebuild replaces it, checked at most every
+    `reload_seconds`; the OS page cache shares the mapped pages between workers.
+    """
+
+    def __init__(self, path: str = 'data/recommendations', reload_seconds: int = 60):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._matrix: Optional[FeatureMatrix] = None
+        self._loaded_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('RECOMMENDATIONS_PATH', self.path)
+        self.reload_seconds = app.config.get('RECOMMENDATIONS_RELOAD_SECONDS', self.reload_seconds)
+
+    def matrix(self) -> Optional[FeatureMatrix]:
+        """The current snapshot, or None if none has been built."""
+        now = time.monotonic()
+        if self._matrix is not None and now - self._checked_at < self.reload_seconds:
+            return self._matrix
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(os.path.join(self.path, _META)).st_mtime
+            except FileNotFoundError:
+                return self._matrix
+            if mtime != self._loaded_mtime:
+                try:
+                    self._matrix = FeatureMatrix.load(self.path)
+                    self._loaded_mtime = mtime
+                    logger.info(f"Loaded recommendations snapshot with {self._matrix.size} movies")
+                except Exception as e:
+                    logger.error(f"Failed to load recommendations snapshot: {str(e)}")
+            return self._matrix
+
+
+# Shared by every blueprint; configured in create_app
+recommender = Recommender()
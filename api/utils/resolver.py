@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class NameResolver:
+    """
+    Per-process name -> ObjectId map for a lookup collection keyed by a unique name.
+
+    resolve() answers known names from memory, looks the rest up with one $in
+    query, and creates whatever is still missing with one unordered batch of
+    upserts. The unique index on name makes concurrent creates of the same
+    name converge on a single document. Entries expire after `ttl` seconds so
+    renames and deletes made by other workers are picked up; the routes that
+    rename or delete in this worker drop the entry straight away.
+    """
+
+    def __init__(self, collection_name: str, defaults: Callable[[datetime], Dict],
+                 ttl: int = 300, max_entries: int = 10000):
+        self.collection_name = collection_name
+        self.defaults = defaults
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._ids: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('NAME_CACHE_TTL', self.ttl)
+
+    def _cached(self, names: Iterable[str]) -> Dict:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for name in names:
+                entry = self._ids.get(name)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    del self._ids[name]
+                    continue
+                self._ids.move_to_end(name)
+                found[name] = entry[1]
+        return found
+
+    def _remember(self, ids: Dict):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for name, id in ids.items():
+                self._ids[name] = (expires_at, id)
+                self._ids.move_to_end(name)
+            while len(self._ids) > self.max_entries:
+                self._ids.popitem(last=False)
+
+    def _find(self, collection, names) -> Dict:
+        return {doc['name']: doc['_id'] for doc in collection.find({'name': {'$in': names}}, {'name': 1})}
+
+    def resolve(self, db, names: Iterable[str]) -> Dict:
+        """Ids for every name, creating the ones that don't exist yet."""
+        names = list(dict.fromkeys(names))
+        ids = self._cached(names)
+        missing = [name for name in names if name not in ids]
+        if not missing:
+            return ids
+
+        collection = db[self.collection_name]
+        found = self._find(collection, missing)
+        to_create = [name for name in missing if name not in found]
+        if to_create:
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne({'name': name}, {'$setOnInsert': {'name': name, **self.defaults(now)}}, upsert=True)
+                for name in to_create
+            ]
+            try:
+                result = collection.bulk_write(operations, ordered=False)
+                upserted = result.upserted_ids
+            except BulkWriteError as e:
+                # Lost a race to another writer; its document is found below
+                if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+                    raise
+                upserted = {op['index']: op['_id'] for op in e.details.get('upserted', [])}
+            found.update({to_create[index]: id for index, id in upserted.items()})
+            raced = [name for name in to_create if name not in found]
+            if raced:
+                found.update(self._find(collection, raced))
+
+        self._remember(found)
+        ids.update(found)
+        return ids
+
+    def forget_id(self, id):
+        """Drop whatever name maps to `id`, after a rename or delete."""
+        with self._lock:
+            for name in [name for name, entry in self._ids.items() if entry[1] == id]:
+                del self._ids[name]
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+def merge_duplicate_names(db, collection_name: str, references: Dict[str, str]) -> int:
+    """
+    Fold documents sharing a name into the oldest one, repointing references
+    first, so the unique index on name can be built. `references` maps each
+    referencing collection to the array-of-documents field holding the id,
+    e.g. {'movie_details': 'genres.id'}. Returns the number of documents removed.
+    """
+    removed = 0
+    duplicates = db[collection_name].aggregate([
+        {'$sort': {'_id': 1}},
+        {'$group': {'_id': '$name', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ])
+    for group in duplicates:
+        keep, extras = group['ids'][0], group['ids'][1:]
+        for referencing, path in references.items():
+            array, field = path.split('.', 1)
+            db[referencing].update_many(
+                {path: {'$in': extras}},
+                {'$set': {f'{array}.$[ref].{field}': keep}},
+                array_filters=[{f'ref.{field}': {'$in': extras}}]
+            )
+        removed += db[collection_name].delete_many({'_id': {'$in': extras}}).deleted_count
+        logger.info(f"Merged {len(extras)} duplicate {collection_name} named {group['_id']!r}")
+    return removed
+
+
+# Shared by every blueprint; configured in create_app
+genre_names = NameResolver('genres', lambda now: {'movie_count': 0, 'created_at': now})
+platform_names = NameResolver('streaming_platforms_list', lambda now: {'active': True, 'created_at': now})
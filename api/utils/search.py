@@ -0,0 +1,197 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+import logging
+import re
+import unicodedata
+
+from api.utils.indexes import ensure_indexes
+from api.utils.pagination import encode_cursor, keyset_filter
+
+logger = logging.getLogger(__name__)
+
+# Collection holding one posting document per movie: its title tokens and words
+SEARCH_COLLECTION = 'movie_search'
+
+# Longer word prefixes are not indexed; query words are truncated to match
+MAX_TOKEN_LENGTH = 20
+
+# Postings read per query and per kind of match (whole words, word prefixes):
+# the newest ones, in index order, so a one-letter query never sorts its whole
+# posting list in memory
+MAX_SEARCH_CANDIDATES = 1000
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase a title, strip accents and collapse punctuation to single spaces."""
+    decomposed = unicodedata.normalize('NFKD', title or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(_WORD_RE.findall(stripped.casefold()))
+
+
+def title_words(title: str) -> List[str]:
+    """Split a title into its distinct normalized words, in order."""
+    return list(dict.fromkeys(normalize_title(title).split()))
+
+
+def title_tokens(title: str) -> List[str]:
+    """
+    Build the edge n-grams indexed for a title.
+    Every prefix of every word is a token, so a partially typed word still
+    hits the index with an exact match instead of a regex scan.
+    """
+    tokens = set()
+    for word in title_words(title):
+        for end in range(1, min(len(word), MAX_TOKEN_LENGTH) + 1):
+            tokens.add(word[:end])
+    return sorted(tokens)
+
+
+def _posting_update(movie_id: str, title: str) -> UpdateOne:
+    return UpdateOne(
+        {'movie_id': movie_id},
+        {'$set': {
+            'movie_id': movie_id,
+            'tokens': title_tokens(title),
+            'words': title_words(title)
+        }},
+        upsert=True
+    )
+
+
+def index_movie_title(db, movie_id: str, title: str):
+    """Insert or refresh the search postings for a movie."""
+    index_movie_titles(db, [(movie_id, title)])
+
+
+def index_movie_titles(db, movies: Iterable[Tuple[str, str]]):
+    """Insert or refresh the postings for many (movie_id, title) pairs in one bulk write."""
+    operations = [_posting_update(movie_id, title) for movie_id, title in movies]
+    if operations:
+        db[SEARCH_COLLECTION].bulk_write(operations, ordered=False)
+
+
+def remove_movie_title(db, movie_id: str):
+    """Drop the search postings for a deleted movie."""
+    db[SEARCH_COLLECTION].delete_many({'movie_id': movie_id})
+
+
+def rebuild_search_index(db, batch_size: int = 1000) -> int:
+    """Re-index every movie title from scratch. Returns the number of titles indexed."""
+    ensure_indexes(db, [SEARCH_COLLECTION], rebuild=True)
+    indexed = 0
+    batch = []
+    for movie in db.movies.find({}, {'movie_id': 1, 'title': 1}).batch_size(batch_size):
+        if not movie.get('movie_id'):
+            continue
+        batch.append(_posting_update(movie['movie_id'], movie.get('title')))
+        if len(batch) >= batch_size:
+            db[SEARCH_COLLECTION].bulk_write(batch, ordered=False)
+            indexed += len(batch)
+            batch = []
+    if batch:
+        db[SEARCH_COLLECTION].bulk_write(batch, ordered=False)
+        indexed += len(batch)
+
+    # Postings whose movie no longer exists
+    live_ids = db.movies.distinct('movie_id')
+    db[SEARCH_COLLECTION].delete_many({'movie_id': {'$nin': live_ids}})
+
+    logger.info(f"Indexed {indexed} movie titles")
+    return indexed
+
+
+def _query_terms(query: str) -> Tuple[List[str], List[str]]:
+    """A query's distinct words, and their tokens, longest (most selective) first."""
+    words = title_words(query)
+    tokens = sorted({word[:MAX_TOKEN_LENGTH] for word in words}, key=len, reverse=True)
+    return words, tokens
+
+
+def search_candidates(db, query: str) -> List:
+    """
+    _ids of the postings a query ranks. The newest MAX_SEARCH_CANDIDATES
+    titles having every query word as a whole word come first, so the best
+    scoring titles are ranked however old they are. They are followed by the
+    newest MAX_SEARCH_CANDIDATES titles where every query word only needs to
+    prefix a title word. Both lists come straight off an index, (words, _id)
+    or (tokens, _id).
+    """
+    words, tokens = _query_terms(query)
+    candidates = {}
+    for query_filter in ({'words': {'$all': words}}, {'tokens': {'$all': tokens}}):
+        postings = db[SEARCH_COLLECTION].find(query_filter, {'_id': 1}).sort('_id', -1).limit(MAX_SEARCH_CANDIDATES)
+        for posting in postings:
+            candidates[posting['_id']] = None
+    return list(candidates)
+
+
+def build_search_pipeline(query: str, candidates: List, limit: int, after: Optional[tuple] = None,
+                          projection: Optional[Dict] = None) -> List[Dict]:
+    """
+    Build the aggregation run against the search collection for a query.
+
+    The `candidates` found by search_candidates are ranked by how many query
+    words match a title word exactly, and fetched one page at a time,
+    keyset-paginated on (score, _id). `projection` limits the movie fields
+    returned.
+    """
+    words, _ = _query_terms(query)
+
+    pipeline = [
+        {'$match': {'_id': {'$in': candidates}}},
+        {'$addFields': {'score': {'$size': {
+            '$filter': {'input': '$words', 'cond': {'$in': ['$$this', words]}}
+        }}}}
+    ]
+    if after:
+        score, last_id = after
+        pipeline.append({'$match': keyset_filter('score', score, last_id)})
+    pipeline += [
+        {'$sort': {'score': -1, '_id': -1}},
+        {'$limit': limit + 1},
+        {'$lookup': {
+            'from': 'movies',
+            'localField': 'movie_id',
+            'foreignField': 'movie_id',
+            'as': 'movie'
+        }},
+        {'$unwind': '$movie'},
+    ]
+    if projection:
+        pipeline.append({'$project': {'score': 1, **{
+            f'movie.{field}': 1 for field, included in projection.items() if included
+        }}})
+    else:
+        pipeline.append({'$project': {'score': 1, 'movie': 1}})
+    return pipeline
+
+
+def search_titles(db, query: str, limit: int, after: Optional[tuple] = None,
+                  projection: Optional[Dict] = None):
+    """
+    Run a ranked title search.
+    Returns the page of movie documents and the cursor for the next page.
+    """
+    if not title_words(query):
+        return [], None
+
+    candidates = search_candidates(db, query)
+    if not candidates:
+        return [], None
+
+    hits = list(db[SEARCH_COLLECTION].aggregate(build_search_pipeline(query, candidates, limit, after, projection)))
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(hits[-1]['score'], hits[-1]['_id'])
+
+    movies = []
+    for hit in hits:
+        movie = hit['movie']
+        movie['score'] = hit['score']
+        movies.append(movie)
+    return movies, next_cursor
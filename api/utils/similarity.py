@@ -0,0 +1,346 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from pymongo import ASCENDING, ReplaceOne, UpdateOne
+import heapq
+import logging
+import threading
+import time
+
+from api.utils.indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_COLLECTION = 'similar_movies'
+
+# Movies whose lists are due a refresh after a write, keyed by movie_id
+QUEUE_COLLECTION = 'similar_movies_queue'
+
+# Neighbours kept per movie
+TOP_K = 20
+
+# How much each kind of overlap counts; each contributes weight * Jaccard similarity
+WEIGHTS = {'genre': 3.0, 'cast': 1.5, 'director': 2.0, 'studio': 1.0}
+
+# Movies sharing a feature that are considered as candidates, best rated first,
+# so a genre shared by half the catalog doesn't make every pair a candidate
+MAX_CANDIDATES_PER_FEATURE = 1000
+
+# Stored with each neighbour so the endpoint needs no second query
+NEIGHBOUR_FIELDS = ['movie_id', 'title', 'description', 'year', 'rating', 'runtime',
+                    'director', 'cast_members', 'genres', 'is_featured', 'created_at']
+
+# Fields that change a movie's neighbours or how it is shown as one
+SIMILARITY_FIELDS = set(NEIGHBOUR_FIELDS) | {'studio'}
+
+_PROJECTION = {field: 1 for field in SIMILARITY_FIELDS}
+_NEIGHBOUR_PROJECTION = {'_id': 0, **{field: 1 for field in NEIGHBOUR_FIELDS}}
+
+WRITE_BATCH_SIZE = 1000
+
+
+def _rating(doc: Dict) -> float:
+    try:
+        return float(doc.get('rating'))
+    except (TypeError, ValueError):
+        return float('-inf')
+
+
+def _normalized(value) -> Optional[str]:
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+def movie_features(doc: Dict) -> Dict[str, Set]:
+    """The genres, cast, director and studio of a movie_details document, per kind."""
+    genres = {str(genre.get('id') or genre.get('name')) for genre in doc.get('genres') or []
+              if isinstance(genre, dict) and (genre.get('id') or genre.get('name'))}
+    cast = {name for name in map(_normalized, doc.get('cast_members') or []) if name}
+    director = _normalized(doc.get('director'))
+    studio = _normalized(doc.get('studio'))
+    return {
+        'genre': genres,
+        'cast': cast,
+        'director': {director} if director else set(),
+        'studio': {studio} if studio else set()
+    }
+
+
+def feature_keys(features: Dict[str, Set]) -> List[str]:
+    """Features flattened to 'kind:value' strings, as stored and indexed on similar_movies."""
+    return sorted(f'{kind}:{value}' for kind, values in features.items() for value in values)
+
+
+def features_from_keys(keys: Iterable[str]) -> Dict[str, Set]:
+    """The inverse of feature_keys."""
+    features = {kind: set() for kind in WEIGHTS}
+    for key in keys:
+        kind, _, value = key.partition(':')
+        features[kind].add(value)
+    return features
+
+
+def similarity(a: Dict[str, Set], b: Dict[str, Set]) -> float:
+    """Weighted sum of the per-kind Jaccard similarities of two movies' features."""
+    score = 0.0
+    for kind, weight in WEIGHTS.items():
+        if a[kind] and b[kind]:
+            shared = len(a[kind] & b[kind])
+            if shared:
+                score += weight * shared / len(a[kind] | b[kind])
+    return score
+
+
+def _neighbour(doc: Dict, score: float) -> Dict:
+    entry = {field: doc.get(field) for field in NEIGHBOUR_FIELDS}
+    entry['score'] = round(score, 4)
+    return entry
+
+
+def _best(movie_id: str, features: Dict[str, Set], candidates: Iterable[Tuple[Dict, Dict[str, Set]]],
+          k: int) -> List[Tuple[float, Dict]]:
+    """(score, candidate) for the k best-scoring candidates, higher rating first on a tie."""
+    scored = (
+        (score, _rating(doc), doc['movie_id'], doc)
+        for doc, candidate_features in candidates
+        if doc['movie_id'] != movie_id
+        for score in (similarity(features, candidate_features),) if score > 0
+    )
+    return [(score, doc) for score, _, _, doc in heapq.nlargest(k, scored, key=lambda item: item[:3])]
+
+
+def _top_neighbours(movie: Dict, features: Dict[str, Set], candidates: Iterable[Tuple[Dict, Dict[str, Set]]],
+                    k: int) -> List[Dict]:
+    """The k best-scoring candidates as neighbour entries."""
+    return [_neighbour(doc, score) for score, doc in _best(movie['movie_id'], features, candidates, k)]
+
+
+def _similar_document(movie: Dict, features: Dict[str, Set], neighbours: List[Dict], now: datetime) -> Dict:
+    """
+    A movie's similar_movies document: its neighbours, plus its normalized
+    features and rating, which candidate lookups for other movies query.
+    """
+    rating = _rating(movie)
+    return {
+        'movie_id': movie['movie_id'],
+        'keys': feature_keys(features),
+        'rating': rating if rating != float('-inf') else None,
+        'neighbours': neighbours,
+        'updated_at': now
+    }
+
+
+def rebuild_similar_movies(db, k: int = TOP_K) -> int:
+    """
+    Recompute every movie's top-k neighbours from movie_details in memory and
+    replace the similar_movies collection's contents. Candidates for a movie
+    are the best-rated MAX_CANDIDATES_PER_FEATURE movies sharing each of its
+    features, found through an inverted index, so the work grows with the
+    catalog rather than with every pair in it. Returns the number of movies.
+    """
+    ensure_indexes(db, [SIMILAR_COLLECTION, QUEUE_COLLECTION], rebuild=True)
+    built_at = datetime.utcnow()
+    movies = sorted(db.movie_details.find({'movie_id': {'$exists': True}}, _PROJECTION),
+                    key=_rating, reverse=True)
+    features = [movie_features(movie) for movie in movies]
+
+    # Postings are in rating order because movies are
+    postings = defaultdict(list)
+    for position, movie_feature in enumerate(features):
+        for kind, values in movie_feature.items():
+            for value in values:
+                postings[kind, value].append(position)
+
+    operations = []
+    for position, movie in enumerate(movies):
+        candidates = set()
+        for kind, values in features[position].items():
+            for value in values:
+                candidates.update(postings[kind, value][:MAX_CANDIDATES_PER_FEATURE])
+        candidates.discard(position)
+        neighbours = _top_neighbours(movie, features[position],
+                                     ((movies[i], features[i]) for i in candidates), k)
+        operations.append(ReplaceOne(
+            {'movie_id': movie['movie_id']},
+            _similar_document(movie, features[position], neighbours, built_at),
+            upsert=True
+        ))
+        if len(operations) >= WRITE_BATCH_SIZE:
+            db[SIMILAR_COLLECTION].bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        db[SIMILAR_COLLECTION].bulk_write(operations, ordered=False)
+
+    # Anything not rewritten belongs to a movie that no longer exists, and
+    # refreshes queued before the rebuild read movie_details are covered by it
+    db[SIMILAR_COLLECTION].delete_many({'updated_at': {'$lt': built_at}})
+    db[QUEUE_COLLECTION].delete_many({'queued_at': {'$lt': built_at}})
+    logger.info(f"Rebuilt similar movies for {len(movies)} movies")
+    return len(movies)
+
+
+def _candidates(db, movie_id: str, features: Dict[str, Set]) -> List[Tuple[Dict, Dict[str, Set]]]:
+    """
+    (movie, features) for movies sharing a feature with a movie, best rated
+    first per feature as in the rebuild. Read from the normalized keys stored
+    on similar_movies, so "Tom Hanks" and "tom hanks " find each other here too.
+    """
+    found = {}
+    for key in feature_keys(features):
+        for doc in db[SIMILAR_COLLECTION].find(
+            {'keys': key, 'movie_id': {'$ne': movie_id}}, {'_id': 0, 'movie_id': 1, 'keys': 1, 'rating': 1}
+        ).sort('rating', -1).limit(MAX_CANDIDATES_PER_FEATURE):
+            found.setdefault(doc['movie_id'], doc)
+    return [(doc, features_from_keys(doc['keys'])) for doc in found.values()]
+
+
+def _scored_neighbours(db, movie: Dict, features: Dict[str, Set],
+                       candidates: List[Tuple[Dict, Dict[str, Set]]], k: int) -> List[Dict]:
+    """The top k candidates as neighbour entries, their fields read from movie_details."""
+    best = _best(movie['movie_id'], features, candidates, k)
+    details = {doc['movie_id']: doc for doc in db.movie_details.find(
+        {'movie_id': {'$in': [doc['movie_id'] for _, doc in best]}}, _NEIGHBOUR_PROJECTION
+    )}
+    return [_neighbour(details[doc['movie_id']], score) for score, doc in best if doc['movie_id'] in details]
+
+
+def compute_similar_movies(db, movie_id: str, k: int = TOP_K) -> List[Dict]:
+    """A movie's neighbours worked out now, without storing anything; [] if it has no details."""
+    movie = db.movie_details.find_one({'movie_id': movie_id}, _PROJECTION)
+    if movie is None:
+        return []
+    features = movie_features(movie)
+    return _scored_neighbours(db, movie, features, _candidates(db, movie_id, features), k)
+
+
+def update_similar_movies(db, movie_id: str, k: int = TOP_K) -> Optional[List[Dict]]:
+    """
+    Refresh one movie after its details changed: recompute its own neighbours,
+    then add it to, move it within or drop it from the lists of the movies it
+    now scores against or was listed by. A movie that drops out of a list
+    leaves a gap until the next rebuild. Returns the movie's neighbours, or
+    None if it has no details.
+    """
+    movie = db.movie_details.find_one({'movie_id': movie_id}, _PROJECTION)
+    if movie is None:
+        remove_similar_movies(db, movie_id)
+        return None
+
+    features = movie_features(movie)
+    candidates = _candidates(db, movie_id, features)
+    neighbours = _scored_neighbours(db, movie, features, candidates, k)
+    now = datetime.utcnow()
+    operations = [ReplaceOne(
+        {'movie_id': movie_id},
+        _similar_document(movie, features, neighbours, now),
+        upsert=True
+    )]
+
+    # Similarity is symmetric, so each candidate's score for this movie is known already
+    scores = {doc['movie_id']: similarity(features, candidate_features)
+              for doc, candidate_features in candidates}
+    affected = db[SIMILAR_COLLECTION].find(
+        {'$or': [
+            {'movie_id': {'$in': [other for other, score in scores.items() if score > 0]}},
+            {'neighbours.movie_id': movie_id}
+        ]},
+        {'movie_id': 1, 'neighbours': 1}
+    )
+    for other in affected:
+        if other['movie_id'] == movie_id:
+            continue
+        current = [entry for entry in other['neighbours'] if entry['movie_id'] != movie_id]
+        score = scores.get(other['movie_id'], 0)
+        if score > 0:
+            current.append(_neighbour(movie, score))
+            current.sort(key=lambda entry: (entry['score'], _rating(entry), entry['movie_id']), reverse=True)
+            current = current[:k]
+        if current != other['neighbours']:
+            operations.append(UpdateOne(
+                {'_id': other['_id']},
+                {'$set': {'neighbours': current, 'updated_at': now}}
+            ))
+
+    db[SIMILAR_COLLECTION].bulk_write(operations, ordered=False)
+    return neighbours
+
+
+def remove_similar_movies(db, movie_id: str):
+    """Drop a deleted movie's neighbours and take it out of every other list."""
+    db[SIMILAR_COLLECTION].delete_one({'movie_id': movie_id})
+    db[SIMILAR_COLLECTION].update_many(
+        {'neighbours.movie_id': movie_id},
+        {'$pull': {'neighbours': {'movie_id': movie_id}}}
+    )
+
+
+def queue_similar_movies(db, movie_ids: Iterable[str]):
+    """
+    Queue movies for update_similar_movies after a write, logging instead of
+    raising so a write never fails on it. Queuing a movie again only moves it
+    back; it is refreshed once.
+    """
+    now = datetime.utcnow()
+    operations = [UpdateOne({'_id': movie_id}, {'$set': {'queued_at': now}}, upsert=True)
+                  for movie_id in dict.fromkeys(movie_ids)]
+    if not operations:
+        return
+    try:
+        db[QUEUE_COLLECTION].bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to queue similar movies refresh: {str(e)}")
+
+
+def drain_similar_movies(db, limit: Optional[int] = None) -> int:
+    """
+    Run update_similar_movies for queued movies, oldest first, until the queue
+    is empty or `limit` have been refreshed. Each movie is claimed by deleting
+    its entry, so workers draining at once never refresh the same one twice;
+    one that fails is queued again. Returns the number refreshed.
+    """
+    refreshed = 0
+    failed = []
+    while limit is None or refreshed < limit:
+        claimed = db[QUEUE_COLLECTION].find_one_and_delete({}, sort=[('queued_at', ASCENDING)])
+        if claimed is None:
+            break
+        try:
+            update_similar_movies(db, claimed['_id'])
+            refreshed += 1
+        except Exception as e:
+            logger.error(f"Failed to update similar movies for {claimed['_id']}: {str(e)}")
+            failed.append(claimed['_id'])
+    queue_similar_movies(db, failed)
+    return refreshed
+
+
+class SimilarMoviesRefresher:
+    """
+    Drains the similar movies queue every `interval` seconds on a daemon
+    thread, so writes only queue their movies and never wait for the
+    refresh. Every worker runs one; claims keep them from overlapping.
+    """
+
+    def __init__(self, interval: float = 5):
+        self.interval = interval
+        self._get_db: Optional[Callable] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app, get_db: Callable):
+        """Configure from the app and start draining, unless SIMILAR_MOVIES_REFRESH_SECONDS is 0."""
+        self.interval = app.config.get('SIMILAR_MOVIES_REFRESH_SECONDS', self.interval)
+        self._get_db = get_db
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='similar-movies-refresh', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                drain_similar_movies(self._get_db())
+            except Exception as e:
+                logger.error(f"Failed to drain the similar movies queue: {str(e)}")
+
+
+# Per-worker queue drainer; configured in create_app
+similar_movies_refresher = SimilarMoviesRefresher()
@@ -0,0 +1,361 @@
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import heapq
+import logging
+import threading
+import time
+
+from api.utils.search import normalize_title
+
+logger = logging.getLogger(__name__)
+
+# Most suggestions a single lookup can return
+MAX_SUGGESTIONS = 20
+
+# Each title is reachable from the start of at most this many of its words
+MAX_WORDS_PER_TITLE = 6
+
+# Longest indexed key; typing past this still matches on the first characters
+MAX_KEY_LENGTH = 40
+
+# Prefixes up to this long match much of the catalog, so their top lists are
+# computed at build time and kept up to date instead of scanned on demand
+SHORT_PREFIX_LENGTH = 2
+
+# Most index keys a lookup scans; longer prefixes matching more than this at
+# build time are precomputed like the short ones
+MAX_SCAN_KEYS = 2000
+
+_SEPARATOR = '\x00'
+_HIGHEST = '\U0010ffff'
+
+
+def _rating_value(rating) -> float:
+    """Ratings are stored loosely; anything non-numeric ranks last."""
+    try:
+        return float(rating)
+    except (TypeError, ValueError):
+        return float('-inf')
+
+
+def _title_keys(title: str) -> List[str]:
+    """Normalized keys for a title: the full title and each later word onwards."""
+    words = normalize_title(title).split()[:MAX_WORDS_PER_TITLE]
+    keys = []
+    for start in range(len(words)):
+        key = ' '.join(words[start:])[:MAX_KEY_LENGTH]
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+class TitleSuggestIndex:
+    """
+    In-memory sorted-array prefix index over movie_details titles.
+
+    Every title is stored under a few normalized keys (the whole title and the
+    title from each later word on), kept in one sorted list. A prefix lookup is
+    two binary searches plus a top-k by rating over the matching slice, run
+    outside the lock on a copy of at most MAX_SCAN_KEYS keys; the top results
+    for hot prefixes are memoized in a bounded LRU that writes patch in place
+    rather than flush. Broad prefixes are never scanned on a request: the top
+    lists of one- and two-character prefixes, and of any longer prefix
+    matching more than MAX_SCAN_KEYS keys, are computed when the index is
+    built and patched the same way. A prefix that grows past the cap after
+    the build is ranked from its first MAX_SCAN_KEYS keys until the next one.
+    The index holds at most `max_titles` titles, dropping the lowest-rated
+    when a write adds one more. Until the first build finishes, in the
+    background, lookups return nothing.
+    """
+
+    def __init__(self, max_titles: int = 200000, refresh_seconds: int = 300, cache_size: int = 4096):
+        self.max_titles = max_titles
+        self.refresh_seconds = refresh_seconds
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._loader: Optional[Callable] = None
+        self._refreshing = False
+        self._reset()
+
+    def _reset(self):
+        self._keys: List[str] = []
+        self._movies: Dict[str, tuple] = {}
+        self._cache: OrderedDict = OrderedDict()
+        self._precomputed: Dict[str, tuple] = {}
+        # Bumped by every write, so a lookup scanned outside the lock knows whether its result can be cached
+        self._generation = 0
+        # Min-heap of (rank, movie_id) for eviction; entries of re-ranked or removed movies are skipped
+        self._by_rank: List[tuple] = []
+        self.loaded_at: Optional[float] = None
+
+    def init_app(self, app, get_db: Callable):
+        """Configure from the app and start building the index in the background."""
+        self.max_titles = app.config.get('SUGGEST_MAX_TITLES', self.max_titles)
+        self.refresh_seconds = app.config.get('SUGGEST_REFRESH_SECONDS', self.refresh_seconds)
+        self._loader = get_db
+        if app.config.get('SUGGEST_WARM_ON_STARTUP', True):
+            self._refresh_in_background()
+
+    def build(self, db):
+        """Rebuild the index from movie_details, keeping the highest-rated titles."""
+        started = time.perf_counter()
+        pairs = []
+        movies = {}
+        cursor = db.movie_details.find(
+            {'title': {'$type': 'string'}},
+            {'_id': 0, 'movie_id': 1, 'title': 1, 'rating': 1}
+        ).sort('rating', -1).limit(self.max_titles).batch_size(5000)
+        for doc in cursor:
+            movie_id = doc.get('movie_id')
+            if not movie_id:
+                continue
+            keys = _title_keys(doc['title'])
+            movies[movie_id] = (doc['title'], doc.get('rating'), keys)
+            pairs.extend(f'{key}{_SEPARATOR}{movie_id}' for key in keys)
+        pairs.sort()
+        by_rank = [(_rating_value(rating), movie_id) for movie_id, (_, rating, _) in movies.items()]
+        heapq.heapify(by_rank)
+        precomputed = self._precomputed_entries(pairs, movies)
+
+        with self._lock:
+            self._keys = pairs
+            self._movies = movies
+            self._cache = OrderedDict()
+            self._precomputed = precomputed
+            self._by_rank = by_rank
+            self._generation += 1
+            self.loaded_at = time.time()
+        logger.info(f"Built title suggestions for {len(movies)} movies in "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+    @classmethod
+    def _precomputed_entries(cls, pairs: List[str], movies: Dict[str, tuple]) -> Dict[str, tuple]:
+        """
+        Cache entries for every prefix of up to SHORT_PREFIX_LENGTH characters
+        and every longer one matching more than MAX_SCAN_KEYS keys. Prefixes
+        are walked depth first over the sorted keys, jumping from one child
+        prefix to the next with a binary search.
+        """
+        entries = {}
+        stack = [('', 0, len(pairs))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            depth = len(prefix)
+            i = lo
+            while i < hi:
+                key = pairs[i]
+                if key.index(_SEPARATOR) <= depth:
+                    # The key is the prefix itself
+                    i += 1
+                    continue
+                child = key[:depth + 1]
+                j = bisect_left(pairs, child + _HIGHEST, i, hi)
+                if depth < SHORT_PREFIX_LENGTH or j - i > MAX_SCAN_KEYS:
+                    entries[child] = cls._scan(pairs[i:j], movies)
+                    stack.append((child, i, j))
+                i = j
+        return entries
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._loader is None or self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.build(self._loader())
+            except Exception as e:
+                logger.error(f"Failed to build title suggestions: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='title-suggest-refresh', daemon=True).start()
+
+    def _ensure_loaded(self) -> bool:
+        """
+        Whether the index can answer yet. The first build, and refreshes once
+        the index goes stale, run in the background, never on a request.
+        """
+        if self.loaded_at is None:
+            self._refresh_in_background()
+            return False
+        if self.refresh_seconds and time.time() - self.loaded_at > self.refresh_seconds:
+            self._refresh_in_background()
+        return True
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Return up to `limit` titles starting with `prefix` at a word boundary, best rated first."""
+        if not self._ensure_loaded():
+            return []
+        query = normalize_title(prefix)[:MAX_KEY_LENGTH]
+        if not query:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+
+        with self._lock:
+            entry = self._precomputed.get(query)
+            if entry is None and len(query) <= SHORT_PREFIX_LENGTH:
+                # No title has a word starting this way
+                return []
+            if entry is None and query in self._cache:
+                entry = self._cache[query]
+                self._cache.move_to_end(query)
+            if entry is not None:
+                return self._results(entry[0][:limit])
+            lo = bisect_left(self._keys, query)
+            hi = bisect_left(self._keys, query + _HIGHEST, lo)
+            keys = self._keys[lo:min(hi, lo + MAX_SCAN_KEYS)]
+            generation = self._generation
+
+        # Ranked without the lock, so other lookups and writes don't wait on the scan
+        entry = self._scan(keys, self._movies)
+        with self._lock:
+            if self._generation == generation:
+                self._cache[query] = entry
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return self._results(entry[0][:limit])
+
+    def _results(self, top: List[str]) -> List[Dict]:
+        return [
+            {'movie_id': movie_id, 'title': self._movies[movie_id][0], 'rating': self._movies[movie_id][1]}
+            for movie_id in top if movie_id in self._movies
+        ]
+
+    def _rank(self, movie_id: str) -> tuple:
+        return (_rating_value(self._movies[movie_id][1]), movie_id)
+
+    @staticmethod
+    def _scan(keys: List[str], movies: Dict[str, tuple]) -> tuple:
+        """
+        The cached entry for a slice of index keys: its best-ranked movie
+        ids, and whether that list holds every match. Twice the page size is
+        kept so that removals can be absorbed without recomputing.
+        """
+        candidates = set()
+        for key in keys:
+            movie_id = key.rsplit(_SEPARATOR, 1)[1]
+            # Titles removed since the keys were copied are skipped
+            if movie_id in movies:
+                candidates.add(movie_id)
+        capacity = 2 * MAX_SUGGESTIONS
+        top = heapq.nlargest(
+            capacity, candidates, key=lambda movie_id: (_rating_value(movies.get(movie_id, (None, None))[1]), movie_id)
+        )
+        return top, len(candidates) <= capacity
+
+    def _top_for_prefix(self, query: str) -> tuple:
+        """Recompute a precomputed prefix's entry from the whole index."""
+        lo = bisect_left(self._keys, query)
+        hi = bisect_left(self._keys, query + _HIGHEST, lo)
+        return self._scan(self._keys[lo:hi], self._movies)
+
+    @staticmethod
+    def _prefixes(keys: List[str]) -> set:
+        return {key[:end] for key in keys for end in range(1, len(key) + 1)}
+
+    def _entries(self, prefix: str) -> Dict:
+        """Where a prefix's entry lives: the precomputed prefixes or the LRU."""
+        if len(prefix) <= SHORT_PREFIX_LENGTH or prefix in self._precomputed:
+            return self._precomputed
+        return self._cache
+
+    def _patch_added(self, movie_id: str, keys: List[str]):
+        """Merge a newly indexed title into every cached prefix it matches."""
+        rank = self._rank(movie_id)
+        for prefix in self._prefixes(keys):
+            entries = self._entries(prefix)
+            entry = entries.get(prefix)
+            if entry is None:
+                if entries is self._precomputed:
+                    # The first title with a word starting this way
+                    self._precomputed[prefix] = ([movie_id], True)
+                continue
+            top, complete = entry
+            # A truncated list is only exact down to its last element
+            if not complete and top and rank < self._rank(top[-1]):
+                continue
+            position = 0
+            while position < len(top) and self._rank(top[position]) > rank:
+                position += 1
+            top.insert(position, movie_id)
+            if len(top) > 2 * MAX_SUGGESTIONS:
+                top.pop()
+                entry = (top, False)
+            entries[prefix] = entry
+
+    def _patch_removed(self, movie_id: str, keys: List[str]):
+        """
+        Drop a title from cached prefixes. LRU lists that run short are
+        forgotten; precomputed lists are recomputed, once the title's own
+        keys are gone, by _remove_locked.
+        """
+        stale = []
+        for prefix in self._prefixes(keys):
+            entries = self._entries(prefix)
+            entry = entries.get(prefix)
+            if entry is None or movie_id not in entry[0]:
+                continue
+            top, complete = entry
+            top.remove(movie_id)
+            if not complete and len(top) < MAX_SUGGESTIONS:
+                if entries is self._precomputed:
+                    stale.append(prefix)
+                else:
+                    del self._cache[prefix]
+        return stale
+
+    def upsert(self, movie_id: str, title: str, rating=None):
+        """Add a title, or re-index it after its title or rating changed."""
+        if not movie_id or not isinstance(title, str):
+            return
+        with self._lock:
+            if self.loaded_at is None:
+                return
+            self._remove_locked(movie_id)
+            self._generation += 1
+            keys = _title_keys(title)
+            self._movies[movie_id] = (title, rating, keys)
+            for key in keys:
+                insort(self._keys, f'{key}{_SEPARATOR}{movie_id}')
+            self._patch_added(movie_id, keys)
+            heapq.heappush(self._by_rank, self._rank(movie_id))
+            self._evict_locked()
+
+    def _evict_locked(self):
+        """Drop the lowest-rated titles while the index holds more than max_titles."""
+        while len(self._movies) > self.max_titles and self._by_rank:
+            rank, movie_id = heapq.heappop(self._by_rank)
+            if movie_id in self._movies and self._rank(movie_id) == (rank, movie_id):
+                self._remove_locked(movie_id)
+        # Re-ranked and removed titles leave stale heap entries behind
+        if len(self._by_rank) > 2 * len(self._movies) + 1024:
+            self._by_rank = [self._rank(movie_id) for movie_id in self._movies]
+            heapq.heapify(self._by_rank)
+
+    def remove(self, movie_id: str):
+        """Drop a title from the index."""
+        with self._lock:
+            self._remove_locked(movie_id)
+
+    def _remove_locked(self, movie_id: str):
+        existing = self._movies.get(movie_id)
+        if not existing:
+            return
+        keys = existing[2]
+        stale = self._patch_removed(movie_id, keys)
+        self._generation += 1
+        del self._movies[movie_id]
+        for key in keys:
+            entry = f'{key}{_SEPARATOR}{movie_id}'
+            i = bisect_left(self._keys, entry)
+            if i < len(self._keys) and self._keys[i] == entry:
+                del self._keys[i]
+        for prefix in stale:
+            self._precomputed[prefix] = self._top_for_prefix(prefix)
+
+
+# Per-worker index shared by every request
+title_suggestions = TitleSuggestIndex()
@@ -0,0 +1,199 @@
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional
+from flask import g, make_response, request
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class MemoryVersionStore:
+    """
+    Per-process counters, only correct with a single worker (e.g. the dev server).
+    Versions are prefixed with a boot id so a restart never reuses an old ETag.
+    """
+
+    def __init__(self):
+        self._boot = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, name: str):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, str]:
+        return {name: f'{self._boot}.{self._versions.get(name, 0)}' for name in names}
+
+
+class MongoVersionStore:
+    """Counters kept in a small collection_versions collection, shared by every worker."""
+
+    def __init__(self, get_db: Callable):
+        self._get_db = get_db
+
+    def bump(self, name: str):
+        self._get_db().collection_versions.update_one(
+            {'_id': name},
+            {'$inc': {'version': 1}},
+            upsert=True
+        )
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, str]:
+        names = list(names)
+        found = {
+            doc['_id']: doc['version']
+            for doc in self._get_db().collection_versions.find({'_id': {'$in': names}})
+        }
+        return {name: str(found.get(name, 0)) for name in names}
+
+
+class CachedVersionStore:
+    """
+    Remembers another store's versions for `ttl` seconds, so a burst of
+    revalidations costs one read per worker instead of one per request.
+    This worker's own bumps drop its copy straight away; other workers'
+    writes are seen within `ttl`.
+    """
+
+    def __init__(self, store, ttl: float = 1.0):
+        self.store = store
+        self.ttl = ttl
+        self._versions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, name: str):
+        try:
+            self.store.bump(name)
+        finally:
+            with self._lock:
+                self._versions.pop(name, None)
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, str]:
+        names = list(names)
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for name in names:
+                entry = self._versions.get(name)
+                if entry is not None and entry[0] > now:
+                    found[name] = entry[1]
+        missing = [name for name in names if name not in found]
+        if missing:
+            fetched = self.store.get_many(missing)
+            expires_at = time.monotonic() + self.ttl
+            with self._lock:
+                for name, version in fetched.items():
+                    self._versions[name] = (expires_at, version)
+            found.update(fetched)
+        return {name: found[name] for name in names}
+
+
+class RedisVersionStore:
+    """Counters kept in Redis, so revalidation never reaches MongoDB."""
+
+    def __init__(self, url: str, prefix: str = 'movie-api:version:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("VERSION_BACKEND=redis requires the 'redis' package")
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def bump(self, name: str):
+        self._redis.incr(self.prefix + name)
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, str]:
+        names = list(names)
+        values = self._redis.mget([self.prefix + name for name in names])
+        return {name: (value or b'0').decode() for name, value in zip(names, values)}
+
+
+class CollectionVersions:
+    """
+    Monotonic per-collection version counters bumped by the write routes.
+
+    Read routes derive a weak ETag from the versions of the collections they
+    read plus their query arguments, so a client revalidating with a matching
+    If-None-Match gets a 304 before the view runs.
+    """
+
+    def __init__(self):
+        self.store = MemoryVersionStore()
+
+    def init_app(self, app, get_db: Callable):
+        """Pick the store configured for the app."""
+        backend = app.config.get('VERSION_BACKEND', 'mongo')
+        if backend == 'redis':
+            self.store = RedisVersionStore(app.config['CACHE_REDIS_URL'])
+        elif backend == 'memory':
+            self.store = MemoryVersionStore()
+        else:
+            self.store = MongoVersionStore(get_db)
+            ttl = app.config.get('VERSION_CACHE_SECONDS', 1.0)
+            if ttl > 0:
+                self.store = CachedVersionStore(self.store, ttl)
+
+    def bump(self, *names: str):
+        for name in names:
+            try:
+                self.store.bump(name)
+            except Exception as e:
+                logger.error(f"Failed to bump version of {name}: {str(e)}")
+
+    def current(self, names: Iterable[str]) -> Optional[Dict[str, str]]:
+        """Versions for this request, read once and shared by the ETag and the response cache."""
+        names = tuple(sorted(names))
+        memo = g.setdefault('_collection_versions', {})
+        if names not in memo:
+            try:
+                memo[names] = self.store.get_many(names)
+            except Exception as e:
+                logger.warning(f"Failed to read collection versions: {str(e)}")
+                memo[names] = None
+        return memo[names]
+
+    def etag(self, *names: str):
+        """Answer If-None-Match with 304 when none of `names` changed since the client's copy."""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                versions = self.current(names)
+                if versions is None:
+                    return f(*args, **kwargs)
+
+                args_key = sorted(request.args.items(multi=True))
+                digest = hashlib.blake2b(
+                    f'{request.path}|{args_key}|{sorted(versions.items())}'.encode(),
+                    digest_size=12
+                ).hexdigest()
+
+                if request.if_none_match.contains_weak(digest):
+                    response = make_response('', 304)
+                    response.set_etag(digest, weak=True)
+                    return response
+
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200:
+                    response.set_etag(digest, weak=True)
+                return response
+            return decorated_function
+        return decorator
+
+    def bumps(self, *names: str):
+        """Bump the versions of `names` once a write view succeeds."""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                response = make_response(f(*args, **kwargs))
+                if response.status_code < 400:
+                    self.bump(*names)
+                return response
+            return decorated_function
+        return decorator
+
+
+# Shared by every blueprint; configured in create_app
+collection_versions = CollectionVersions()
@@ -0,0 +1,128 @@
+"""
+Benchmark: /genres/<genre_name>/movies query latency under concurrent load,
+page and count run one after another vs. fanned out with QueryFanOut.
+
+Seeds a scratch database with synthetic genres and movie_details, then has
+several client threads issue the endpoint's queries (one page of a genre plus
+its total count) as fast as they can, both ways, reporting per-request
+latency percentiles and throughput. Needs a MongoDB server; the scratch
+database is dropped afterwards. Against a remote cluster the gap widens with
+the network round trip.
+
+Usage:
+    MONGODB_URI=mongodb://localhost:27017 python benchmarks/bench_fanout.py \\
+        [--clients 1,8,32] [--requests 200] [--movies 50000] [--genres 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.utils.fanout import QueryFanOut  # noqa: E402
+
+PROJECTION = {
+    'movie_id': 1,
+    'title': 1,
+    'year': 1,
+    'rating': 1,
+    'runtime': 1,
+    'director': 1,
+    'description': 1
+}
+
+
+def seed(db, genre_count, movie_count):
+    db.genres.drop()
+    db.movie_details.drop()
+    genre_ids = [ObjectId() for _ in range(genre_count)]
+    db.genres.insert_many([
+        {'_id': genre_id, 'name': f'Genre {i}'} for i, genre_id in enumerate(genre_ids)
+    ])
+    batch = []
+    for i in range(movie_count):
+        picked = random.sample(genre_ids, k=min(3, genre_count))
+        batch.append({
+            'movie_id': f'{i:026X}',
+            'title': f'Movie {i}',
+            'year': random.randint(1950, 2024),
+            'rating': round(random.uniform(1, 10), 1),
+            'runtime': '120 min',
+            'director': 'Someone',
+            'description': 'A synopsis. ' * 10,
+            'genres': [{'id': genre_id, 'name': 'x'} for genre_id in picked]
+        })
+        if len(batch) == 5000:
+            db.movie_details.insert_many(batch)
+            batch = []
+    if batch:
+        db.movie_details.insert_many(batch)
+    db.movie_details.create_index([('genres.id', ASCENDING), ('rating', DESCENDING)])
+    return genre_ids
+
+
+def page_queries(db, genre_id):
+    return (
+        lambda: list(db.movie_details.find({'genres.id': genre_id}, PROJECTION)
+                     .sort('rating', -1).skip(40).limit(20)),
+        lambda: db.movie_details.count_documents({'genres.id': genre_id})
+    )
+
+
+def sequential(db, genre_id):
+    return [call() for call in page_queries(db, genre_id)]
+
+
+def fanned_out(fan_out, db, genre_id):
+    return fan_out.gather(*page_queries(db, genre_id))
+
+
+def load(fn, genre_ids, clients, requests):
+    """Run `requests` calls from `clients` threads; return per-call latencies and throughput."""
+    def one(_):
+        started = time.perf_counter()
+        fn(random.choice(genre_ids))
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        samples = sorted(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1], requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', default='1,8,32')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--movies', type=int, default=50000)
+    parser.add_argument('--genres', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'), maxPoolSize=200)
+    db = client['bench_fanout']
+    fan_out = QueryFanOut(max_workers=args.workers)
+    try:
+        genre_ids = seed(db, args.genres, args.movies)
+        assert sequential(db, genre_ids[0]) == fanned_out(fan_out, db, genre_ids[0])
+        print(f'{"clients":>7} | {"sequential p50":>14} {"p95":>9} {"req/s":>7} | '
+              f'{"fan-out p50":>11} {"p95":>9} {"req/s":>7}')
+        for clients in (int(c) for c in args.clients.split(',')):
+            old = load(lambda g: sequential(db, g), genre_ids, clients, args.requests)
+            new = load(lambda g: fanned_out(fan_out, db, g), genre_ids, clients, args.requests)
+            print(f'{clients:>7} | {old[0]:>12.1f}ms {old[1]:>7.1f}ms {old[2]:>7.0f} | '
+                  f'{new[0]:>9.1f}ms {new[1]:>7.1f}ms {new[2]:>7.0f}')
+    finally:
+        client.drop_database('bench_fanout')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Microbenchmark: BSONJSONProvider vs. the per-route conversion loops it replaced.
+
+Builds realistic movie_details documents (ObjectIds and datetimes nested in
+genres and streaming_platforms) and times serializing a page of them both ways.
+
+Usage:
+    python benchmarks/bench_json_provider.py [--docs 100] [--repeat 200]
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.utils.json_provider import BSONJSONProvider  # noqa: E402
+
+
+def make_movie_detail(i):
+    now = datetime.utcnow()
+    return {
+        '_id': ObjectId(),
+        'movie_id': f'{i:026X}',
+        'title': f'Movie number {i}',
+        'year': random.randint(1950, 2024),
+        'ua': 'U/A 13+',
+        'rating': round(random.uniform(1, 10), 1),
+        'is_featured': i % 10 == 0,
+        'is_latest': i % 7 == 0,
+        'runtime': f'{random.randint(80, 180)} min',
+        'description': 'A reasonably long synopsis of the movie. ' * 6,
+        'director': 'Some Director',
+        'writers': ['Writer One', 'Writer Two'],
+        'studio': 'Big Studio',
+        'cast_members': [f'Actor {n}' for n in range(8)],
+        'created_at': now,
+        'genres': [{'id': ObjectId(), 'name': name} for name in ('Action', 'Drama', 'Thriller')],
+        'streaming_platforms': [
+            {
+                'platform_id': ObjectId(),
+                'platform_name': name,
+                'available_until': now + timedelta(days=90),
+                'added_date': now,
+            }
+            for name in ('Prime', 'Netflix')
+        ],
+    }
+
+
+def legacy_convert(detail):
+    """The conversion loop every route used to run before jsonify."""
+    detail['_id'] = str(detail['_id'])
+    if detail.get('created_at'):
+        detail['created_at'] = detail['created_at'].isoformat()
+    for genre in detail.get('genres', []):
+        if genre.get('id'):
+            genre['id'] = str(genre['id'])
+    for platform in detail.get('streaming_platforms', []):
+        if platform.get('platform_id'):
+            platform['platform_id'] = str(platform['platform_id'])
+        if platform.get('available_until'):
+            platform['available_until'] = platform['available_until'].isoformat()
+        if platform.get('added_date'):
+            platform['added_date'] = platform['added_date'].isoformat()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=100, help='documents per response')
+    parser.add_argument('--repeat', type=int, default=200, help='responses per measurement')
+    args = parser.parse_args()
+
+    docs = [make_movie_detail(i) for i in range(args.docs)]
+
+    legacy_app = Flask('legacy')
+    legacy_app.json = DefaultJSONProvider(legacy_app)
+    bson_app = Flask('bson')
+    bson_app.json = BSONJSONProvider(bson_app)
+
+    def legacy():
+        # Documents come fresh off the cursor on every request
+        page = copy.deepcopy(docs)
+        for detail in page:
+            legacy_convert(detail)
+        with legacy_app.app_context():
+            legacy_app.json.response(page)
+
+    def provider():
+        page = copy.deepcopy(docs)
+        with bson_app.app_context():
+            bson_app.json.response(page)
+
+    # Both sides pay the same deepcopy, so measure it and subtract it
+    baseline = min(timeit.repeat(lambda: copy.deepcopy(docs), number=args.repeat, repeat=5))
+    results = {}
+    for name, fn in (('legacy loops + jsonify', legacy), ('BSONJSONProvider', provider)):
+        best = min(timeit.repeat(fn, number=args.repeat, repeat=5))
+        results[name] = (best - baseline) / args.repeat * 1000
+
+    print(f'{args.docs} movie_details documents per response')
+    for name, ms in results.items():
+        print(f'  {name:<24} {ms:8.3f} ms/response')
+    legacy_ms, provider_ms = results.values()
+    print(f'  speedup: {legacy_ms / provider_ms:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
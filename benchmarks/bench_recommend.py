@@ -0,0 +1,130 @@
+"""
+Benchmark: /recommendations scoring over 10k/100k/1M-title catalogs,
+vectorized NumPy vs. a per-document Python loop.
+
+Generates a synthetic catalog (genres, cast, director, writers, studio, year
+and rating drawn with realistic skew), builds the feature matrix, writes and
+memory-maps the snapshot, then times "more like these" queries of a few seed
+movies both ways. The Python loop scores the same normalized feature rows
+one movie at a time and is skipped above --python-max titles, where it takes
+too long to be worth waiting for. No database is needed.
+
+Usage:
+    python benchmarks/bench_recommend.py [--sizes 10000,100000,1000000] \\
+        [--queries 50] [--seeds 3] [--k 20] [--python-max 100000]
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.utils.recommend import FeatureMatrix  # noqa: E402
+
+
+def synthetic_catalog(size, rng):
+    """Yield movie_details-shaped documents; popular values are reused far more often."""
+    genres = [f'genre-{i}' for i in range(25)]
+    for i in range(size):
+        yield {
+            'movie_id': f'm{i:07d}',
+            'genres': [{'id': genre} for genre in rng.sample(genres, rng.randint(1, 3))],
+            'cast_members': [f'actor-{int(rng.paretovariate(1.2) * 10) % (size // 2 + 1)}'
+                             for _ in range(rng.randint(3, 8))],
+            'director': f'director-{int(rng.paretovariate(1.1) * 5) % (size // 10 + 1)}',
+            'writers': [f'writer-{rng.randrange(size // 5 + 1)}' for _ in range(rng.randint(1, 2))],
+            'studio': f'studio-{int(rng.paretovariate(1.0)) % 200}',
+            'year': str(rng.randint(1950, 2024)),
+            'rating': round(rng.uniform(1, 10), 1),
+        }
+
+
+def python_rows(matrix):
+    """The matrix as one {column: weight} dict per movie, as a loop-based engine would hold it."""
+    return [
+        dict(zip(matrix.indices[start:end].tolist(), matrix.data[start:end].tolist()))
+        for start, end in zip(matrix.indptr[:-1].tolist(), matrix.indptr[1:].tolist())
+    ]
+
+
+def python_most_similar(rows, seeds, k):
+    """Score every movie against the seeds' averaged profile, one document at a time."""
+    profile = {}
+    for seed in seeds:
+        for column, weight in rows[seed].items():
+            profile[column] = profile.get(column, 0.0) + weight
+    norm = sum(weight * weight for weight in profile.values()) ** 0.5 or 1.0
+    seed_set = set(seeds)
+    scored = []
+    for row, features in enumerate(rows):
+        if row in seed_set:
+            continue
+        score = sum(weight * profile.get(column, 0.0) for column, weight in features.items()) / norm
+        scored.append((score, row))
+    return heapq.nlargest(k, scored)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {label:<22} median {statistics.median(samples):9.2f} ms   p95 {p95:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--python-max', type=int, default=100000)
+    args = parser.parse_args()
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        rng = random.Random(size)
+        print(f"\n{size} titles")
+
+        start = time.perf_counter()
+        built = FeatureMatrix.build(synthetic_catalog(size, rng))
+        print(f"  build                  {time.perf_counter() - start:9.2f} s   "
+              f"({built.features} features, {len(built.data)} non-zeros)")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recommendations')
+            start = time.perf_counter()
+            built.save(path)
+            print(f"  save snapshot          {time.perf_counter() - start:9.2f} s")
+            start = time.perf_counter()
+            matrix = FeatureMatrix.load(path)
+            print(f"  memory-map snapshot    {(time.perf_counter() - start) * 1000:9.2f} ms")
+
+            queries = [[str(matrix.movie_ids[rng.randrange(size)]) for _ in range(args.seeds)]
+                       for _ in range(args.queries)]
+            remaining = iter(queries * 2)
+            report('numpy (mmap)', timed(lambda: matrix.most_similar(next(remaining), args.k), args.queries))
+
+            if size <= args.python_max:
+                rows = python_rows(built)
+                seed_rows = iter([matrix.row_numbers(query).tolist() for query in queries])
+                repeat = max(1, min(args.queries, 5_000_000 // size))
+                report('python loop', timed(lambda: python_most_similar(rows, next(seed_rows), args.k), repeat))
+            else:
+                print(f"  python loop            skipped (above --python-max)")
+            del matrix
+
+
+if __name__ == '__main__':
+    main()
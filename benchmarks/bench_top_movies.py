@@ -0,0 +1,127 @@
+"""
+Benchmark: /genres/top-movies latency vs. genre count, N+1 queries vs. one pipeline.
+
+Seeds a scratch database with synthetic genres and movie_details, then times
+the per-genre find loop the endpoint used to run against the single $lookup
+aggregation it runs now. Needs a MongoDB 5.0+ server; the scratch database is
+dropped afterwards.
+
+Usage:
+    MONGODB_URI=mongodb://localhost:27017 python benchmarks/bench_top_movies.py \\
+        [--genres 10,25,50,100,200] [--movies 20000] [--limit 15] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+PROJECTION = {
+    'movie_id': 1,
+    'title': 1,
+    'year': 1,
+    'rating': 1,
+    'runtime': 1,
+    'director': 1,
+    'description': 1
+}
+
+
+def seed(db, genre_count, movie_count):
+    db.genres.drop()
+    db.movie_details.drop()
+    genre_ids = [ObjectId() for _ in range(genre_count)]
+    db.genres.insert_many([
+        {'_id': genre_id, 'name': f'Genre {i}'} for i, genre_id in enumerate(genre_ids)
+    ])
+    batch = []
+    for i in range(movie_count):
+        picked = random.sample(genre_ids, k=min(3, genre_count))
+        batch.append({
+            'movie_id': f'{i:026X}',
+            'title': f'Movie {i}',
+            'year': random.randint(1950, 2024),
+            'rating': round(random.uniform(1, 10), 1),
+            'runtime': '120 min',
+            'director': 'Someone',
+            'description': 'A synopsis. ' * 10,
+            'genres': [{'id': genre_id, 'name': 'x'} for genre_id in picked]
+        })
+        if len(batch) == 5000:
+            db.movie_details.insert_many(batch)
+            batch = []
+    if batch:
+        db.movie_details.insert_many(batch)
+    db.movie_details.create_index([('genres.id', ASCENDING), ('rating', DESCENDING)])
+
+
+def n_plus_one(db, limit, quality='720'):
+    result = {}
+    for genre in db.genres.find({}, {'name': 1}):
+        movies = list(db.movie_details.find(
+            {'genres.id': genre['_id']}, PROJECTION
+        ).sort('rating', -1).limit(limit))
+        for movie in movies:
+            movie['image_url'] = f"https://imgcdn.media/pv/{quality}/{movie['movie_id']}.jpg"
+        result[genre['name']] = movies
+    return result
+
+
+def single_pipeline(db, limit, quality='720'):
+    genres = db.genres.aggregate([
+        {'$project': {'name': 1}},
+        {'$lookup': {
+            'from': 'movie_details',
+            'localField': '_id',
+            'foreignField': 'genres.id',
+            'pipeline': [
+                {'$sort': {'rating': -1}},
+                {'$limit': limit},
+                {'$project': {
+                    **PROJECTION,
+                    'image_url': {'$concat': [f'https://imgcdn.media/pv/{quality}/', '$movie_id', '.jpg']}
+                }}
+            ],
+            'as': 'movies'
+        }}
+    ])
+    return {genre['name']: genre['movies'] for genre in genres}
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), sorted(samples)[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--genres', default='10,25,50,100,200')
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    db = client['bench_top_movies']
+    try:
+        print(f'{"genres":>6} | {"N+1 p50":>9} {"p95":>9} | {"pipeline p50":>12} {"p95":>9} | speedup')
+        for genre_count in (int(g) for g in args.genres.split(',')):
+            seed(db, genre_count, args.movies)
+            assert n_plus_one(db, args.limit).keys() == single_pipeline(db, args.limit).keys()
+            old_p50, old_p95 = measure(lambda: n_plus_one(db, args.limit), args.repeat)
+            new_p50, new_p95 = measure(lambda: single_pipeline(db, args.limit), args.repeat)
+            print(f'{genre_count:>6} | {old_p50:>7.1f}ms {old_p95:>7.1f}ms | '
+                  f'{new_p50:>10.1f}ms {new_p95:>7.1f}ms | {old_p50 / new_p50:>6.1f}x')
+    finally:
+        client.drop_database('bench_top_movies')
+
+
+if __name__ == '__main__':
+    main()
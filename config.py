@@ -38,3 +38,58 @@ class Config:
     # Rate limiting
     RATELIMIT_DEFAULT = "200 per day"
     RATELIMIT_STORAGE_URL = "memory://"
+    
+    # Threads per worker running a request's independent queries concurrently (0 runs them inline)
+    DB_FANOUT_WORKERS = int(os.getenv('DB_FANOUT_WORKERS', 16))
+    
+    # NDJSON bulk ingestion (/movies/complete/bulk)
+    BULK_INGEST_BATCH_SIZE = int(os.getenv('BULK_INGEST_BATCH_SIZE', 1000))
+    BULK_INGEST_MAX_LINE_BYTES = int(os.getenv('BULK_INGEST_MAX_LINE_BYTES', 1024 * 1024))
+    
+    # Documents read from MongoDB and written to the client per chunk by /export endpoints
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+    
+    # Seconds a worker trusts its cached genre/platform name -> id entries
+    NAME_CACHE_TTL = int(os.getenv('NAME_CACHE_TTL', 300))
+    
+    # Seconds a worker may reuse an exact listing total before recounting, absent any write
+    COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 300))
+    
+    # Recommendations snapshot written by `flask build-recommendations`, and how
+    # often workers check for a newer one (seconds)
+    RECOMMENDATIONS_PATH = os.getenv('RECOMMENDATIONS_PATH', 'data/recommendations')
+    RECOMMENDATIONS_RELOAD_SECONDS = int(os.getenv('RECOMMENDATIONS_RELOAD_SECONDS', 60))
+    
+    # Create missing indexes on startup (rebuilding changed ones once, in the gunicorn master)
+    ENSURE_INDEXES_ON_STARTUP = os.getenv('ENSURE_INDEXES_ON_STARTUP', 'True').lower() == 'true'
+    
+    # Fill in genres.movie_count for genres created before it was maintained
+    BACKFILL_GENRE_COUNTS_ON_STARTUP = os.getenv('BACKFILL_GENRE_COUNTS_ON_STARTUP', 'True').lower() == 'true'
+    
+    # Seconds between each worker's passes over the similar movies refresh queue (0 = only `flask refresh-similar-movies`)
+    SIMILAR_MOVIES_REFRESH_SECONDS = float(os.getenv('SIMILAR_MOVIES_REFRESH_SECONDS', 5))
+    
+    # Title suggestions (per-worker in-memory index)
+    SUGGEST_MAX_TITLES = int(os.getenv('SUGGEST_MAX_TITLES', 200000))
+    SUGGEST_REFRESH_SECONDS = int(os.getenv('SUGGEST_REFRESH_SECONDS', 300))
+    SUGGEST_WARM_ON_STARTUP = os.getenv('SUGGEST_WARM_ON_STARTUP', 'True').lower() == 'true'
+    
+    # Response cache: 'memory' (per worker), 'redis' (shared) or 'null'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 60))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    CACHE_MAX_ENTRY_BYTES = int(os.getenv('CACHE_MAX_ENTRY_BYTES', 1024 * 1024))
+    
+    # Response compression: encodings in order of preference (br and zstd need the
+    # brotli and zstandard packages), and the smallest body worth compressing
+    COMPRESS_ENCODINGS = os.getenv('COMPRESS_ENCODINGS', 'br,zstd,gzip')
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+    
+    # Record request and MongoDB metrics and serve them on /metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # Where per-collection versions behind ETags live: 'mongo', 'redis' or 'memory' (single worker only)
+    VERSION_BACKEND = os.getenv('VERSION_BACKEND', 'mongo')
+    # Seconds each worker reuses versions read from the mongo backend (0 reads them on every request)
+    VERSION_CACHE_SECONDS = float(os.getenv('VERSION_CACHE_SECONDS', 1))
@@ -0,0 +1,50 @@
+import os
+import shutil
+
+# Workers record metrics to files here so /metrics can merge them (see api/utils/metrics.py)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/movie-api-metrics')
+
+
+def _prepare_database(server):
+    """
+    Apply index changes and backfill genre counts once, in the master, so
+    workers don't race to drop and rebuild. The master uses a client of its
+    own and closes it before forking; workers open theirs after.
+    """
+    from config import Config
+    if not (Config.ENSURE_INDEXES_ON_STARTUP or Config.BACKFILL_GENRE_COUNTS_ON_STARTUP):
+        return
+    import certifi
+    from pymongo import MongoClient
+    from api.utils.genre_counts import backfill_genre_counts
+    from api.utils.indexes import ensure_indexes
+
+    client = MongoClient(os.getenv('MONGODB_URI'), tlsCAFile=certifi.where(), serverSelectionTimeoutMS=5000)
+    try:
+        db = client[os.getenv('DB_NAME', 'movies_database')]
+        if Config.ENSURE_INDEXES_ON_STARTUP:
+            ensure_indexes(db, rebuild=True)
+            # Workers fork from this process, so they see this and skip it
+            Config.ENSURE_INDEXES_ON_STARTUP = False
+        if Config.BACKFILL_GENRE_COUNTS_ON_STARTUP:
+            backfill_genre_counts(db)
+            Config.BACKFILL_GENRE_COUNTS_ON_STARTUP = False
+    except Exception as e:
+        # Each worker then creates missing indexes itself, as under `flask run`
+        server.log.error(f"Failed to prepare the database: {str(e)}")
+    finally:
+        client.close()
+
+
+def on_starting(server):
+    """Start from an empty metrics directory, dropping a previous run's samples, and prepare the database."""
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    _prepare_database(server)
+
+
+def child_exit(server, worker):
+    """Stop counting an exited worker's in-progress requests."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,208 @@
+"""
+Crawler engine used by search_movies.py.
+
+Queries are fetched by a bounded pool of worker threads sharing one pooled
+HTTP session and a token-bucket rate limit. Transient failures (connection
+errors, timeouts, 429 and 5xx) are retried with exponential backoff. Results
+are handed to a sink on the calling thread, which writes them in batches.
+An optional expand callback turns a finished query into follow-up queries,
+so the crawl can grow adaptively. A checkpoint file records finished and
+queued queries so an interrupted run picks up where it left off.
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import quote
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, blocking until one is available."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            self._sleep(wait_for)
+
+
+class Checkpoint:
+    """
+    Finished queries, and queries queued but not yet finished, persisted as
+    JSON and replaced atomically on every save.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done = set()
+        self.frontier: List[str] = []
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.done = set(state.get('done', []))
+            self.frontier = state.get('frontier', [])
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'done': sorted(self.done), 'frontier': self.frontier}, f)
+        os.replace(tmp_path, self.path)
+
+
+class FetchError(Exception):
+    pass
+
+
+class SearchCrawler:
+    """Runs search queries against `url` (a format string with a {query} field)."""
+
+    def __init__(self, url: str, workers: int = 8, rate: float = 5.0, burst: Optional[float] = None,
+                 max_retries: int = 5, backoff: float = 0.5, max_backoff: float = 30.0, timeout: float = 10.0):
+        self.url = url
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate, burst)
+        self.stats = {'queries': 0, 'failed': 0, 'new_titles': 0}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        # Full jitter keeps workers that failed together from retrying together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def fetch(self, query: str) -> List[Dict]:
+        """Search results for one query, retrying transient failures."""
+        url = self.url.format(query=quote(query))
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            response = None
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json().get('searchResult') or []
+                error = f'HTTP {response.status_code}'
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            except (requests.RequestException, ValueError) as e:
+                raise FetchError(f'{query!r}: {str(e)}')
+            if attempt < self.max_retries:
+                time.sleep(self._delay(attempt, response))
+        raise FetchError(f'{query!r}: gave up after {self.max_retries + 1} attempts ({error})')
+
+    def crawl(self, queries: Iterable[str], sink, checkpoint: Optional[Checkpoint] = None,
+              checkpoint_every: int = 50, expand: Optional[Callable] = None) -> Dict:
+        """
+        Fetch every query not already in the checkpoint and pass its results to
+        sink.add(query, results), which returns how many titles were new.
+        If given, expand(query, results, new) returns follow-up queries, which
+        are fetched before any further seed query.
+
+        Queries are only checkpointed after sink.flush() has stored their
+        results, and queued follow-ups are saved with them, so a crash never
+        skips unsaved work. Returns counts of queries issued, failed, expanded
+        and pruned and of new titles found, also kept on self.stats so they
+        survive an interrupted run.
+        """
+        checkpoint = checkpoint or Checkpoint(None)
+        stats = self.stats = {'queries': 0, 'failed': 0, 'new_titles': 0, 'expanded': 0, 'pruned': 0}
+        unsaved = []
+        failed = []
+        pending = {}
+        frontier = deque(checkpoint.frontier)
+        seen = checkpoint.done | set(frontier)
+        seeds = iter(queries)
+
+        def next_query():
+            if frontier:
+                return frontier.popleft()
+            for query in seeds:
+                if query not in seen:
+                    seen.add(query)
+                    return query
+            return None
+
+        def save():
+            sink.flush()
+            checkpoint.done.update(unsaved)
+            # Anything started but not stored, including failures, is retried on resume
+            checkpoint.frontier = list(pending.values()) + failed + list(frontier)
+            checkpoint.save()
+            unsaved.clear()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crawler') as pool:
+            try:
+                while True:
+                    # Keep the pool busy without reading the whole query stream up front
+                    while len(pending) < self.workers * 2:
+                        query = next_query()
+                        if query is None:
+                            break
+                        pending[pool.submit(self.fetch, query)] = query
+                    if not pending:
+                        break
+
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        query = pending.pop(future)
+                        stats['queries'] += 1
+                        try:
+                            results = future.result()
+                        except FetchError as e:
+                            stats['failed'] += 1
+                            failed.append(query)
+                            logger.warning(f"Search failed for {e}")
+                            continue
+                        new = sink.add(query, results)
+                        stats['new_titles'] += new
+                        unsaved.append(query)
+                        if expand is not None:
+                            children = [child for child in expand(query, results, new) if child not in seen]
+                            seen.update(children)
+                            frontier.extend(children)
+                            stats['expanded' if children else 'pruned'] += 1
+                    if len(unsaved) >= checkpoint_every:
+                        save()
+            finally:
+                for future in pending:
+                    future.cancel()
+                save()
+        return stats
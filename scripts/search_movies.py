@@ -1,132 +1,183 @@
-import requests
-import json
+"""
+Crawl the PCMirror search API for movie titles and store new ones in MongoDB.
+
+By default the crawl is adaptive: it starts from every --min-length prefix of
+letters and digits and only extends a prefix by another character when its
+results look truncated or still turned up unseen titles, up to --max-length.
+--strategy exhaustive searches every combination up to --max-length instead.
+Progress is checkpointed, so an interrupted run resumes where it stopped
+when started again with the same --checkpoint file.
+
+Usage:
+    python scripts/search_movies.py [--strategy adaptive] [--min-length 1] [--max-length 4] \\
+        [--workers 8] [--rate 5] [--checkpoint search_movies.checkpoint.json] [--batch-size 500]
+"""
+import argparse
+import logging
 import os
-import time
+import string
+import sys
 from datetime import datetime
-from urllib.parse import quote
 from itertools import product
-import string
-from supabase import create_client
+
 from dotenv import load_dotenv
+from flask import Flask
+from pymongo import UpdateOne
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.utils.search import index_movie_titles  # noqa: E402
+from api.utils.versions import collection_versions  # noqa: E402
+from config import Config  # noqa: E402
+from scripts.crawler import Checkpoint, SearchCrawler  # noqa: E402
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+SEARCH_URL = 'https://pcmirror.cc/pv/search.php?s={query}'
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Please set SUPABASE_URL and SUPABASE_KEY in .env file")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+class MovieSink:
+    """Collects titles not seen before and upserts them into movies in batches."""
 
-def search_movies(query):
-    """
-    Search movies using the PCMirror API
-    """
-    # URL encode the query
-    encoded_query = quote(query)
-    url = f"https://pcmirror.cc/pv/search.php?s={encoded_query}"
-    
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        return {"error": f"API request failed: {str(e)}", "searchResult": []}
+    def __init__(self, db, batch_size: int = 500):
+        self.db = db
+        self.batch_size = batch_size
+        self.seen = {doc['movie_id'] for doc in db.movies.find({}, {'_id': 0, 'movie_id': 1}) if doc.get('movie_id')}
+        self._buffer = []
+
+    def add(self, query, results) -> int:
+        """Queue the unseen titles from one query's results; returns how many there were."""
+        new = 0
+        for movie in results:
+            movie_id = movie.get('id')
+            if not movie_id or movie_id in self.seen:
+                continue
+            self.seen.add(movie_id)
+            self._buffer.append({
+                'movie_id': movie_id,
+                'title': movie.get('t'),
+                'year': movie.get('y'),
+                'runtime': movie.get('r'),
+                'created_at': datetime.utcnow(),
+                'streaming_platforms': []
+            })
+            new += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        return new
+
+    def flush(self):
+        """Write the queued titles; upserting on movie_id keeps re-runs idempotent."""
+        if not self._buffer:
+            return
+        self.db.movies.bulk_write([
+            UpdateOne({'movie_id': doc['movie_id']}, {'$setOnInsert': doc}, upsert=True)
+            for doc in self._buffer
+        ], ordered=False)
+        index_movie_titles(self.db, [(doc['movie_id'], doc['title']) for doc in self._buffer])
+        print(f"Stored {len(self._buffer)} new movies")
+        self._buffer = []
+
+
+# Character set searched (a-z, 0-9)
+SEARCH_CHARS = string.ascii_lowercase + string.digits
 
-def load_existing_movies():
-    """
-    Load existing movies from Supabase to prevent duplicates
-    """
-    try:
-        response = supabase.table('movies').select('movie_id').execute()
-        existing_ids = {item['movie_id'] for item in response.data}
-        return existing_ids
-    except Exception as e:
-        print(f"Error loading existing movies: {e}")
-        return set()
-
-def save_to_supabase(movie):
-    """
-    Save a single movie to Supabase
-    """
-    try:
-        movie_data = {
-            'movie_id': movie['id'],
-            'title': movie['t'],
-            'year': movie['y'],
-            'runtime': movie['r'],
-            'created_at': datetime.now().isoformat()
-        }
-        
-        supabase.table('movies').insert(movie_data).execute()
-        return True
-    except Exception as e:
-        print(f"Error saving movie {movie['t']}: {e}")
-        return False
-
-def save_results(new_results, existing_movie_ids):
-    """
-    Save unique search results to Supabase
-    """
-    added_count = 0
-    
-    for movie in new_results.get('searchResult', []):
-        if movie['id'] not in existing_movie_ids:
-            if save_to_supabase(movie):
-                existing_movie_ids.add(movie['id'])
-                added_count += 1
-    
-    if added_count > 0:
-        print(f"Added {added_count} new unique movies to Supabase")
-    
-    return added_count
 
 def generate_search_queries(min_length=1, max_length=3):
     """
     Generate combinations of letters and numbers for searching
     """
-    # Create character set (a-z, 0-9)
-    chars = string.ascii_lowercase + string.digits
-    
     for length in range(min_length, max_length + 1):
-        for combo in product(chars, repeat=length):
+        for combo in product(SEARCH_CHARS, repeat=length):
             yield ''.join(combo)
 
+
+class PrefixExpander:
+    """
+    Decides which prefixes are worth extending by one more character.
+
+    A prefix is expanded when its result list looks truncated, i.e. it is as
+    long as the API's page (`truncated_at`, or the longest list seen so far
+    when not given, but never under MIN_PAGE_SIZE), since longer prefixes can
+    surface titles cut from it; or when it still found at least `min_new`
+    unseen titles. Anything else is pruned along with every longer prefix
+    beneath it.
+    """
+
+    MIN_PAGE_SIZE = 10
+
+    def __init__(self, max_length: int, truncated_at: int = 0, min_new: int = 1, chars: str = SEARCH_CHARS):
+        self.max_length = max_length
+        self.truncated_at = truncated_at
+        self.min_new = min_new
+        self.chars = chars
+        self._largest = 0
+
+    def __call__(self, query, results, new):
+        self._largest = max(self._largest, len(results))
+        if len(query) >= self.max_length:
+            return []
+        page_size = self.truncated_at or max(self._largest, self.MIN_PAGE_SIZE)
+        truncated = bool(results) and len(results) >= page_size
+        if truncated or new >= self.min_new:
+            return [query + char for char in self.chars]
+        return []
+
+
 def main():
-    print("Starting automatic movie search...")
-    existing_movie_ids = load_existing_movies()
-    print(f"Loaded {len(existing_movie_ids)} existing movies from Supabase")
-    
-    total_searches = 0
-    total_new_movies = 0
-    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--strategy', choices=['adaptive', 'exhaustive'], default='adaptive')
+    parser.add_argument('--min-length', type=int, default=1, help='length of the first prefixes searched')
+    parser.add_argument('--max-length', type=int, default=None,
+                        help='longest prefix searched (default: 4 adaptive, 2 exhaustive)')
+    parser.add_argument('--truncated-at', type=int, default=0,
+                        help='result count meaning a list was cut off (default: the longest seen)')
+    parser.add_argument('--min-new', type=int, default=1,
+                        help='unseen titles a prefix must find to be expanded when not truncated')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    parser.add_argument('--rate', type=float, default=5.0, help='requests per second across all workers')
+    parser.add_argument('--checkpoint', default='search_movies.checkpoint.json')
+    parser.add_argument('--batch-size', type=int, default=500, help='movies per database write')
+    parser.add_argument('--url', default=SEARCH_URL, help='search URL with a {query} placeholder')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from api.utils.db import get_db
+
+    db = get_db()
+    # The version store the API is configured with (VERSION_BACKEND), for the bump below
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    collection_versions.init_app(app, lambda: db)
+    sink = MovieSink(db, args.batch_size)
+    checkpoint = Checkpoint(args.checkpoint)
+    print(f"Loaded {len(sink.seen)} existing movies, {len(checkpoint.done)} queries already done")
+
+    crawler = SearchCrawler(args.url, workers=args.workers, rate=args.rate)
+    if args.strategy == 'adaptive':
+        max_length = args.max_length or 4
+        queries = generate_search_queries(args.min_length, args.min_length)
+        expand = PrefixExpander(max_length, args.truncated_at, args.min_new)
+    else:
+        queries = generate_search_queries(args.min_length, args.max_length or 2)
+        expand = None
     try:
-        for query in generate_search_queries(min_length=1, max_length=2):
-            print(f"\nSearching for: {query}")
-            results = search_movies(query)
-            
-            if results.get("error"):
-                print(f"Error: {results['error']}")
-                continue
-            
-            new_movies = save_results(results, existing_movie_ids)
-            total_new_movies += new_movies
-            total_searches += 1
-            
-            # Add a small delay to avoid overwhelming the API
-            time.sleep(1)
-            
-            print(f"Progress: Completed {total_searches} searches, Found {total_new_movies} new movies")
-            
+        crawler.crawl(queries, sink, checkpoint, expand=expand)
     except KeyboardInterrupt:
-        print("\nSearch interrupted by user")
+        print("\nSearch interrupted; run again with the same --checkpoint to resume")
     finally:
+        # Let the API's ETags and cached responses see the new movies
+        collection_versions.bump('movies')
         print(f"\nSearch completed:")
-        print(f"Total searches performed: {total_searches}")
-        print(f"Total unique movies found: {total_new_movies}")
+        stats = crawler.stats
+        print(f"Total searches performed: {stats['queries']} ({stats['failed']} failed)")
+        print(f"Total unique movies found: {stats['new_titles']}")
+        if stats['queries']:
+            print(f"New titles per search: {stats['new_titles'] / stats['queries']:.2f}")
+        if expand is not None:
+            print(f"Prefixes expanded: {stats['expanded']}, pruned: {stats['pruned']}")
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -13,4 +13,40 @@ def event_loop():
     import asyncio
     loop = asyncio.get_event_loop_policy().new_event_loop()
     yield loop
-    loop.close() 
\ No newline at end of file
+    loop.close() 
+@pytest.fixture
+def mongo_app(monkeypatch):
+    """The app wired to an in-memory mongomock database: yields (app, db)."""
+    mongomock = pytest.importorskip('mongomock')
+    import sys
+    from collections import OrderedDict
+    from config import Config
+    import api.utils.db
+    from api.utils import genre_counts
+    from api.utils.counts import counts
+    from api.utils.resolver import genre_names, platform_names
+    from api.utils.suggest import title_suggestions
+    from api.utils.versions import MemoryVersionStore, collection_versions
+
+    db = mongomock.MongoClient()['movie_app_test']
+    monkeypatch.setattr(api.utils.db, 'get_db', lambda: db)
+    for setting, value in (('ENSURE_INDEXES_ON_STARTUP', False), ('SUGGEST_WARM_ON_STARTUP', False),
+                           ('BACKFILL_GENRE_COUNTS_ON_STARTUP', False), ('SIMILAR_MOVIES_REFRESH_SECONDS', 0),
+                           ('VERSION_BACKEND', 'memory'), ('CACHE_BACKEND', 'null')):
+        monkeypatch.setattr(Config, setting, value)
+
+    from api import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    # Blueprints bound get_db at import time
+    for name, module in list(sys.modules.items()):
+        if name.startswith('api.') and getattr(module, 'get_db', None) is not None:
+            monkeypatch.setattr(module, 'get_db', lambda: db)
+    monkeypatch.setattr(collection_versions, 'store', MemoryVersionStore())
+    monkeypatch.setattr(title_suggestions, '_loader', lambda: db)
+    # mongomock has neither `hello` nor sessions, like a standalone server
+    monkeypatch.setattr(genre_counts, 'supports_transactions', lambda db: False)
+    # Process-wide caches mustn't carry ids between tests' databases
+    for cache, attribute in ((genre_names, '_ids'), (platform_names, '_ids'), (counts, '_counts')):
+        monkeypatch.setattr(cache, attribute, OrderedDict())
+    yield app, db
@@ -0,0 +1,124 @@
+import pytest
+from flask import Flask, jsonify
+from api.utils import cache as cache_module
+from api.utils.cache import MemoryCache, ResponseCache
+
+def test_memory_cache_evicts_least_recently_used():
+    """The oldest untouched entry goes first once the cache is full."""
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1, timeout=60)
+    cache.set('b', 2, timeout=60)
+    assert cache.get('a') == 1
+    cache.set('c', 3, timeout=60)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+def test_memory_cache_expires_entries(monkeypatch):
+    """Entries are not served past their TTL."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    cache = MemoryCache()
+    cache.set('a', 1, timeout=10)
+    now[0] += 9
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a') is None
+
+def test_memory_cache_invalidates_by_tag():
+    """Invalidating a tag drops exactly the entries carrying it."""
+    cache = MemoryCache()
+    cache.set('genres', 1, timeout=60, tags=['genres'])
+    cache.set('top', 2, timeout=60, tags=['genres', 'movie_details'])
+    cache.set('latest', 3, timeout=60, tags=['movies'])
+    cache.invalidate_tags(['movie_details'])
+    assert cache.get('genres') == 1
+    assert cache.get('top') is None
+    assert cache.get('latest') == 3
+
+@pytest.fixture
+def app():
+    """A bare app with one cached read route and one invalidating write route."""
+    app = Flask(__name__)
+    app.config.update(CACHE_MAX_ENTRY_BYTES=64)
+    response_cache = ResponseCache()
+    response_cache.init_app(app)
+    calls = {'count': 0}
+
+    @app.route('/items', methods=['GET'])
+    @response_cache.cached(tags=['items'])
+    def get_items():
+        calls['count'] += 1
+        return jsonify({'calls': calls['count']}), 200
+
+    @app.route('/big', methods=['GET'])
+    @response_cache.cached(tags=['items'])
+    def get_big():
+        calls['count'] += 1
+        return jsonify({'padding': 'x' * 100}), 200
+
+    @app.route('/items', methods=['POST'])
+    @response_cache.invalidates('items')
+    def create_item():
+        return jsonify({'message': 'created'}), 201
+
+    app.calls = calls
+    return app
+
+def test_cached_route_normalizes_query_args(app):
+    """Argument order does not split the cache; different values do."""
+    client = app.test_client()
+    first = client.get('/items?a=1&b=2')
+    assert first.headers['X-Cache'] == 'MISS'
+    second = client.get('/items?b=2&a=1')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    assert client.get('/items?a=2&b=2').headers['X-Cache'] == 'MISS'
+
+def test_write_route_invalidates_tagged_responses(app):
+    """A successful write forces the next read to hit the view again."""
+    client = app.test_client()
+    client.get('/items')
+    assert client.get('/items').headers['X-Cache'] == 'HIT'
+    client.post('/items')
+    response = client.get('/items')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json() == {'calls': 2}
+
+def test_oversized_responses_are_not_cached(app):
+    """Bodies above CACHE_MAX_ENTRY_BYTES always go to the view."""
+    client = app.test_client()
+    client.get('/big')
+    assert client.get('/big').headers['X-Cache'] == 'MISS'
+    assert app.calls['count'] == 2
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    """A RedisCache talking to fakeredis instead of a server."""
+    fakeredis = pytest.importorskip('fakeredis')
+    import redis
+    server = fakeredis.FakeRedis()
+    monkeypatch.setattr(redis.Redis, 'from_url', staticmethod(lambda url: server))
+    return cache_module.RedisCache('redis://cache'), server
+
+def test_redis_cache_round_trips_and_invalidates_by_tag(redis_cache):
+    """Entries come back unpickled, and a tag drops exactly the entries carrying it."""
+    cache, server = redis_cache
+    cache.set('genres', ('body', 200, {}), timeout=60, tags=['genres'])
+    cache.set('top', {'Drama': []}, timeout=60, tags=['genres', 'movie_details'])
+    cache.set('latest', [1, 2], timeout=60, tags=['movie_details'])
+    assert cache.get('genres') == ('body', 200, {})
+
+    cache.invalidate_tags(['genres'])
+    assert cache.get('genres') is None and cache.get('top') is None
+    assert cache.get('latest') == [1, 2]
+    cache.clear()
+    assert server.keys('*') == []
+
+def test_redis_tag_ttl_is_only_extended(redis_cache):
+    """A short-lived entry never shortens the life of a tag covering a longer-lived one."""
+    cache, server = redis_cache
+    cache.set('long', 1, timeout=600, tags=['genres'])
+    cache.set('short', 2, timeout=5, tags=['genres'])
+    assert server.ttl(f'{cache.prefix}tag:genres') > 500
+    cache.set('longer', 3, timeout=900, tags=['genres'])
+    assert server.ttl(f'{cache.prefix}tag:genres') > 600
@@ -0,0 +1,92 @@
+import gzip
+from flask import Flask, Response, jsonify
+from api.utils.cache import ResponseCache
+from api.utils.compression import Compressor, compression
+
+def make_app():
+    """A bare app with gzip compression, one large and one small route."""
+    app = Flask(__name__)
+    app.config.update(COMPRESS_ENCODINGS='gzip', COMPRESS_MIN_BYTES=100)
+    Compressor().init_app(app)
+
+    @app.route('/big')
+    def big():
+        return jsonify({'padding': 'x' * 1000})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'{i}\n' for i in range(1000)), mimetype='application/x-ndjson')
+
+    return app
+
+def test_large_bodies_are_compressed_for_clients_that_accept_it():
+    """Accept-Encoding decides; small bodies and identity-preferring clients get plain JSON."""
+    client = make_app().test_client()
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == client.get('/big').data
+
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/big', headers={'Accept-Encoding': 'br'}).headers
+    assert 'Content-Encoding' not in client.get('/big', headers={'Accept-Encoding': 'gzip;q=0.5, identity'}).headers
+
+def test_streamed_responses_are_compressed_as_they_go():
+    """A streamed body decompresses to the same lines."""
+    client = make_app().test_client()
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == ''.join(f'{i}\n' for i in range(1000)).encode()
+
+def test_cached_responses_are_stored_precompressed(monkeypatch):
+    """A cache hit serves the stored gzip copy without compressing again."""
+    monkeypatch.setattr(compression, 'encodings', ['gzip'])
+    monkeypatch.setattr(compression, 'min_bytes', 100)
+    app = Flask(__name__)
+    response_cache = ResponseCache()
+    response_cache.init_app(app)
+
+    @app.route('/items')
+    @response_cache.cached(tags=['items'])
+    def items():
+        return jsonify({'padding': 'x' * 1000})
+
+    calls = []
+    original = Compressor.compress
+    monkeypatch.setattr(Compressor, 'compress', staticmethod(
+        lambda *args: calls.append(args[1]) or original(*args)))
+
+    client = app.test_client()
+    first = client.get('/items', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/items', headers={'Accept-Encoding': 'gzip'})
+    plain = client.get('/items')
+    assert (first.headers['X-Cache'], second.headers['X-Cache']) == ('MISS', 'HIT')
+    assert second.headers['Content-Encoding'] == 'gzip' and 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(second.data) == plain.data
+    assert calls == ['gzip']
+
+def test_compressed_copies_count_towards_the_entry_cap(monkeypatch):
+    """A body under CACHE_MAX_ENTRY_BYTES isn't cached when its compressed copies take the entry over."""
+    monkeypatch.setattr(compression, 'encodings', ['gzip'])
+    monkeypatch.setattr(compression, 'min_bytes', 100)
+    app = Flask(__name__)
+    with app.app_context():
+        body_size = len(jsonify({'padding': 'x' * 1000}).get_data())
+    app.config.update(CACHE_MAX_ENTRY_BYTES=body_size + 5)
+    response_cache = ResponseCache()
+    response_cache.init_app(app)
+
+    @app.route('/items')
+    @response_cache.cached(tags=['items'])
+    def items():
+        return jsonify({'padding': 'x' * 1000})
+
+    client = app.test_client()
+    first = client.get('/items', headers={'Accept-Encoding': 'gzip'})
+    assert len(client.get('/items').data) == body_size
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert client.get('/items', headers={'Accept-Encoding': 'gzip'}).headers['X-Cache'] == 'MISS'
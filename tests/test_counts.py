@@ -0,0 +1,45 @@
+from flask import Flask
+from api.utils.counts import CountService
+from api.utils.versions import MemoryVersionStore, collection_versions
+
+class FakeCollection:
+    """Counts its count_documents calls and returns a settable total."""
+    def __init__(self, total):
+        self.total = total
+        self.calls = 0
+    def count_documents(self, filter):
+        self.calls += 1
+        return self.total
+    def estimated_document_count(self):
+        return self.total + 1
+
+def test_exact_counts_are_reused_until_the_collection_changes(monkeypatch):
+    """Repeat pages skip the count; a write's version bump forces a recount."""
+    monkeypatch.setattr(collection_versions, 'store', MemoryVersionStore())
+    details = FakeCollection(5)
+    db = {'movie_details': details}
+    service = CountService()
+    app = Flask(__name__)
+
+    with app.test_request_context():
+        assert service.count(db, 'movie_details', {'genres.id': 1}) == (5, True)
+    with app.test_request_context():
+        assert service.count(db, 'movie_details', {'genres.id': 1}) == (5, True)
+    assert details.calls == 1
+
+    details.total = 6
+    collection_versions.bump('movie_details')
+    with app.test_request_context():
+        # approx still serves the last count, flagged as no longer exact
+        assert service.count(db, 'movie_details', {'genres.id': 1}, approx=True) == (5, False)
+        assert service.count(db, 'movie_details', {'genres.id': 1}) == (6, True)
+    assert details.calls == 2
+
+def test_approx_counts_never_count_documents():
+    """Unfiltered totals come from collection metadata; filtered ones from the caller's estimate."""
+    genres = FakeCollection(20)
+    service = CountService()
+    with Flask(__name__).test_request_context():
+        assert service.count({'genres': genres}, 'genres', approx=True) == (21, False)
+        assert service.count({'genres': genres}, 'genres', {'name': 'x'}, approx=True, estimate=3) == (3, False)
+    assert genres.calls == 0
@@ -0,0 +1,119 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from scripts.crawler import Checkpoint, SearchCrawler, TokenBucket
+from scripts.search_movies import PrefixExpander
+
+CATALOG = {
+    'a': [{'id': 'A1', 't': 'Alien'}, {'id': 'A2', 't': 'Amelie'}],
+    'b': [{'id': 'B1', 't': 'Brazil'}, {'id': 'A2', 't': 'Amelie'}],
+    'c': [],
+}
+
+# Searched by title prefix for any other query, two results at most
+LIBRARY = [
+    {'id': 'X1', 't': 'xaa'},
+    {'id': 'X2', 't': 'xab'},
+    {'id': 'X3', 't': 'xba'},
+    {'id': 'Y1', 't': 'yaa'},
+]
+PAGE_SIZE = 2
+
+@pytest.fixture
+def stub_server():
+    """A local search API that fails each query's first request with a 503."""
+    requests_seen = []
+    failed_once = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)['s'][0]
+            requests_seen.append(query)
+            if query not in failed_once:
+                failed_once.add(query)
+                self.send_response(503)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            if query in CATALOG:
+                results = CATALOG[query]
+            else:
+                results = [movie for movie in LIBRARY if movie['t'].startswith(query)][:PAGE_SIZE]
+            body = json.dumps({'searchResult': results}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/search.php?s={{query}}', requests_seen
+    server.shutdown()
+
+class ListSink:
+    """Records new titles in memory the way the MongoDB sink does."""
+    def __init__(self):
+        self.seen = set()
+        self.stored = []
+        self._buffer = []
+    def add(self, query, results):
+        new = [movie for movie in results if movie['id'] not in self.seen]
+        self.seen.update(movie['id'] for movie in new)
+        self._buffer.extend(new)
+        return len(new)
+    def flush(self):
+        self.stored.extend(self._buffer)
+        self._buffer = []
+
+def test_crawl_retries_and_stores_each_title_once(stub_server):
+    """Transient 503s are retried, and duplicate titles across queries are stored once."""
+    url, requests_seen = stub_server
+    sink = ListSink()
+    stats = SearchCrawler(url, workers=3, rate=1000, backoff=0).crawl(['a', 'b', 'c'], sink)
+    assert stats == {'queries': 3, 'failed': 0, 'new_titles': 3, 'expanded': 0, 'pruned': 0}
+    assert sorted(movie['id'] for movie in sink.stored) == ['A1', 'A2', 'B1']
+    assert sorted(requests_seen) == ['a', 'a', 'b', 'b', 'c', 'c']
+
+def test_crawl_resumes_from_checkpoint(stub_server, tmp_path):
+    """Queries recorded in the checkpoint are not fetched again."""
+    url, requests_seen = stub_server
+    path = str(tmp_path / 'checkpoint.json')
+    crawler = SearchCrawler(url, workers=2, rate=1000, backoff=0)
+    crawler.crawl(['a', 'b'], ListSink(), Checkpoint(path))
+    assert Checkpoint(path).done == {'a', 'b'}
+
+    requests_seen.clear()
+    stats = crawler.crawl(['a', 'b', 'c'], ListSink(), Checkpoint(path))
+    assert stats['queries'] == 1
+    assert requests_seen == ['c', 'c']
+
+def test_token_bucket_paces_after_the_burst():
+    """Once the burst is spent, each acquisition waits 1/rate seconds."""
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=4, capacity=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+    assert waits == [0.25, 0.25]
+
+def test_adaptive_crawl_prunes_prefixes_that_find_nothing_new(stub_server):
+    """Only truncated or still-productive prefixes are extended, yet every title is found."""
+    url, requests_seen = stub_server
+    sink = ListSink()
+    expand = PrefixExpander(max_length=3, truncated_at=PAGE_SIZE, min_new=2, chars='ab')
+    stats = SearchCrawler(url, workers=2, rate=1000, backoff=0).crawl(['x', 'y'], sink, expand=expand)
+    assert sorted(movie['id'] for movie in sink.stored) == ['X1', 'X2', 'X3', 'Y1']
+    # x and xa came back full; y, xb and the longest prefixes were pruned
+    assert stats == {'queries': 6, 'failed': 0, 'new_titles': 4, 'expanded': 2, 'pruned': 4}
+    assert sorted(set(requests_seen)) == ['x', 'xa', 'xaa', 'xab', 'xb', 'y']
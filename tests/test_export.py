@@ -0,0 +1,33 @@
+import csv
+import io
+import json
+from datetime import datetime
+from bson import ObjectId
+from flask import Flask
+from api.routes.export import _stream_csv, _stream_ndjson
+from api.utils.json_provider import BSONJSONProvider
+
+DOCS = [
+    {'movie_id': f'm{i}', 'title': f'Movie {i}', 'cast_members': ['A', 'B'],
+     'genres': [{'id': ObjectId(), 'name': 'Drama'}], 'created_at': datetime(2024, 1, i + 1)}
+    for i in range(5)
+]
+
+def test_csv_export_flattens_and_chunks_by_batch():
+    """Lists become '|'-joined names, and rows come out one batch per chunk."""
+    chunks = list(_stream_csv(iter(DOCS), ['movie_id', 'cast_members', 'genres', 'created_at'], batch_size=2))
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO(''.join(chunks))))
+    assert rows[0] == ['movie_id', 'cast_members', 'genres', 'created_at']
+    assert rows[1] == ['m0', 'A|B', 'Drama', '2024-01-01T00:00:00']
+    assert len(rows) == 6
+
+def test_ndjson_export_writes_one_document_per_line():
+    """Each line parses back to its document, with BSON types serialized."""
+    app = Flask(__name__)
+    app.json = BSONJSONProvider(app)
+    with app.app_context():
+        chunks = list(_stream_ndjson(iter(DOCS), batch_size=2))
+    assert len(chunks) == 3
+    lines = ''.join(chunks).splitlines()
+    assert [json.loads(line)['movie_id'] for line in lines] == [doc['movie_id'] for doc in DOCS]
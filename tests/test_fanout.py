@@ -0,0 +1,39 @@
+import threading
+import time
+import pytest
+from api.utils.fanout import QueryFanOut
+
+def test_gather_returns_results_in_call_order():
+    """Results line up with the calls regardless of which finishes first."""
+    fan_out = QueryFanOut(max_workers=4)
+    results = fan_out.gather(
+        lambda: time.sleep(0.05) or 'slow',
+        lambda: 'fast',
+        lambda: 3
+    )
+    assert results == ['slow', 'fast', 3]
+
+def test_gather_runs_calls_concurrently():
+    """Independent calls overlap instead of adding up."""
+    fan_out = QueryFanOut(max_workers=4)
+    barrier = threading.Barrier(3, timeout=2)
+    # Would time out if the calls ran one after another
+    assert fan_out.gather(barrier.wait, barrier.wait, barrier.wait) is not None
+
+def test_gather_reraises_after_every_call_finished():
+    """A failing call surfaces its exception once the others are done."""
+    fan_out = QueryFanOut(max_workers=4)
+    finished = []
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        fan_out.gather(fail, lambda: time.sleep(0.05) or finished.append(True))
+    assert finished == [True]
+
+def test_gather_runs_inline_without_workers():
+    """With no workers configured every call runs on the caller's thread."""
+    fan_out = QueryFanOut(max_workers=0)
+    caller = threading.get_ident()
+    assert fan_out.gather(threading.get_ident, threading.get_ident) == [caller, caller]
@@ -0,0 +1,27 @@
+import pytest
+from flask import Flask
+from api.utils.fields import InvalidFields, parse_fields
+
+def test_fields_projection_and_trim():
+    """Asked-for fields are projected with movie_id; extra fields read for a cursor are trimmed."""
+    app = Flask(__name__)
+    with app.test_request_context('/?fields=title,rating,image_url'):
+        fieldset = parse_fields('movie_details', computed=['image_url'])
+
+    assert fieldset.projection == {'title': 1, 'rating': 1, 'movie_id': 1, '_id': 0}
+    assert fieldset.wants('image_url') and not fieldset.wants('description')
+    assert fieldset.projection_with('_id') == {'title': 1, 'rating': 1, 'movie_id': 1, '_id': 1}
+    assert fieldset.trim({'_id': 1, 'movie_id': 'm1', 'title': 'Heat', 'year': '1995'}) == {
+        'movie_id': 'm1', 'title': 'Heat'
+    }
+
+def test_fields_default_and_unknown():
+    """Without ?fields= the route's default applies; unknown names are rejected."""
+    app = Flask(__name__)
+    with app.test_request_context('/'):
+        fieldset = parse_fields('movies', default={'title': 1})
+    assert fieldset.projection == {'title': 1} and fieldset.wants('anything')
+
+    with app.test_request_context('/?fields=title,password'):
+        with pytest.raises(InvalidFields):
+            parse_fields('movies')
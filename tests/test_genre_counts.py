@@ -0,0 +1,68 @@
+import pytest
+from api.utils import genre_counts
+from api.utils.genre_counts import (apply_genre_delta, backfill_genre_counts, reconcile_genre_counts,
+                                    run_in_transaction, supports_transactions)
+
+mongomock = pytest.importorskip('mongomock')
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()['movie_app_test']
+
+def test_genre_delta_nets_added_against_removed(db):
+    """A genre both added and removed is left alone; the others move by one."""
+    db.genres.insert_many([{'_id': name, 'movie_count': 5} for name in ('drama', 'crime', 'comedy')])
+    apply_genre_delta(db, added=['drama', 'crime'], removed=['crime', 'comedy'])
+    assert {genre['_id']: genre['movie_count'] for genre in db.genres.find()} == {
+        'drama': 6, 'crime': 5, 'comedy': 4
+    }
+
+def test_reconcile_corrects_wrong_and_missing_counts(db):
+    """Counts come from movie_details, a genre listed twice on a movie counting once."""
+    db.genres.insert_many([
+        {'_id': 'drama', 'name': 'Drama', 'movie_count': 7},
+        {'_id': 'crime', 'name': 'Crime', 'movie_count': 1},
+        {'_id': 'western', 'name': 'Western'},
+    ])
+    db.movie_details.insert_many([
+        {'movie_id': 'a', 'genres': [{'id': 'drama'}, {'id': 'crime'}, {'id': 'drama'}]},
+        {'movie_id': 'b', 'genres': [{'id': 'drama'}]},
+    ])
+    assert backfill_genre_counts(db) == 2
+    assert {genre['_id']: genre['movie_count'] for genre in db.genres.find()} == {
+        'drama': 2, 'crime': 1, 'western': 0
+    }
+    assert backfill_genre_counts(db) == 0
+
+    db.genres.update_one({'_id': 'crime'}, {'$set': {'movie_count': 9}})
+    assert reconcile_genre_counts(db) == 1
+    assert db.genres.find_one({'_id': 'crime'})['movie_count'] == 1
+
+class FakeAdmin:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+    def command(self, name):
+        self.calls += 1
+        return self.reply
+
+class FakeClient:
+    def __init__(self, reply):
+        self.admin = FakeAdmin(reply)
+    def start_session(self):
+        raise AssertionError('standalone servers have no sessions')
+
+class FakeDB:
+    def __init__(self, reply):
+        self.client = FakeClient(reply)
+
+def test_transactions_detected_once_per_client(monkeypatch):
+    """Replica sets and mongos have transactions; a standalone runs the writes without a session."""
+    monkeypatch.setattr(genre_counts, '_transaction_support', {})
+    assert supports_transactions(FakeDB({'setName': 'rs0'}))
+    assert supports_transactions(FakeDB({'msg': 'isdbgrid'}))
+
+    standalone = FakeDB({'isWritablePrimary': True})
+    assert run_in_transaction(standalone, lambda session: session) is None
+    assert run_in_transaction(standalone, lambda session: 'done') == 'done'
+    assert standalone.client.admin.calls == 1
@@ -0,0 +1,59 @@
+def run_lookups_per_genre(db):
+    """
+    mongomock can't run $lookup with both localField and a pipeline (MongoDB
+    5.0+), so genres.aggregate runs the joined pipeline once per genre instead.
+    """
+    def aggregate(pipeline):
+        project, lookup = pipeline
+        join = lookup['$lookup']
+        for genre in db.genres.find({}, project['$project']):
+            match = {'$match': {join['foreignField']: genre[join['localField']]}}
+            genre[join['as']] = list(db[join['from']].aggregate([match] + join['pipeline']))
+            yield genre
+    return aggregate
+
+def test_top_movies_by_genre_are_ranked_and_limited(mongo_app, monkeypatch):
+    """Each genre lists its highest-rated movies, best first, cut to ?limit=."""
+    app, db = mongo_app
+    db.genres.insert_many([{'_id': 'crime', 'name': 'Crime'}, {'_id': 'drama', 'name': 'Drama'}])
+    db.movie_details.insert_many([
+        {'movie_id': 'heat', 'title': 'Heat', 'rating': 8.3, 'genres': [{'id': 'crime'}, {'id': 'drama'}]},
+        {'movie_id': 'ronin', 'title': 'Ronin', 'rating': 7.2, 'genres': [{'id': 'crime'}]},
+        {'movie_id': 'thief', 'title': 'Thief', 'rating': 7.4, 'genres': [{'id': 'crime'}]},
+        {'movie_id': 'ali', 'title': 'Ali', 'rating': 6.8, 'genres': [{'id': 'drama'}]},
+    ])
+    monkeypatch.setattr(db.genres, 'aggregate', run_lookups_per_genre(db))
+    client = app.test_client()
+
+    top = client.get('/api/v1/genres/top-movies?limit=2&quality=480').get_json()
+    assert {name: [movie['movie_id'] for movie in movies] for name, movies in top.items()} == {
+        'Crime': ['heat', 'thief'], 'Drama': ['heat', 'ali']
+    }
+    assert top['Crime'][0]['image_url'] == 'https://imgcdn.media/pv/480/heat.jpg'
+    sparse = client.get('/api/v1/genres/top-movies?limit=1&fields=title,image_url').get_json()
+    assert set(sparse['Drama'][0]) == {'movie_id', 'title', 'image_url'}
+
+    assert len(client.get('/api/v1/genres/top-movies').get_json()['Crime']) == 3
+    assert client.get('/api/v1/genres/top-movies?limit=0').status_code == 400
+
+def test_genre_page_and_total_are_fetched_together(mongo_app, monkeypatch):
+    """With a total the page and count go to fan_out together; cursor pages skip the count."""
+    from api.routes import genres as genres_routes
+    app, db = mongo_app
+    db.genres.insert_one({'_id': 'crime', 'name': 'Crime'})
+    db.movie_details.insert_many([
+        {'movie_id': movie_id, 'title': movie_id.title(), 'rating': rating, 'genres': [{'id': 'crime'}]}
+        for movie_id, rating in (('heat', 8.3), ('thief', 7.4), ('ronin', 7.2))
+    ])
+    gathered = []
+    original = genres_routes.fan_out.gather
+    monkeypatch.setattr(genres_routes.fan_out, 'gather', lambda *calls: gathered.append(len(calls)) or original(*calls))
+    client = app.test_client()
+
+    body = client.get('/api/v1/genres/crime/movies?per_page=2&fields=title').get_json()
+    assert [movie['movie_id'] for movie in body['movies']] == ['heat', 'thief']
+    assert (body['total_movies'], body['total_pages'], body['total_exact']) == (3, 2, True)
+
+    body = client.get(f"/api/v1/genres/crime/movies?per_page=2&fields=title&cursor={body['next']}").get_json()
+    assert [movie['movie_id'] for movie in body['movies']] == ['ronin'] and 'total_movies' not in body
+    assert gathered == [2, 1]
@@ -0,0 +1,50 @@
+import pytest
+from api.utils.indexes import INDEXES, QUERY_SHAPES, _plan_stages, ensure_indexes
+
+def test_every_query_shape_targets_a_declared_collection():
+    """Shapes are only checked against collections the registry manages."""
+    for shape in QUERY_SHAPES:
+        assert shape['collection'] in INDEXES, shape['name']
+
+def test_plan_stages_walks_nested_plans():
+    """Stages are collected from single, multiple and SBE-style child plans."""
+    plan = {
+        'stage': 'LIMIT',
+        'inputStage': {
+            'stage': 'FETCH',
+            'inputStage': {'stage': 'OR', 'inputStages': [
+                {'stage': 'IXSCAN'},
+                {'stage': 'COLLSCAN'}
+            ]}
+        }
+    }
+    assert _plan_stages(plan) == ['LIMIT', 'FETCH', 'OR', 'IXSCAN', 'COLLSCAN']
+    assert _plan_stages({'queryPlan': {'stage': 'IXSCAN'}}) == ['IXSCAN']
+
+def test_changed_indexes_are_only_rebuilt_on_request():
+    """Workers leave a changed index alone; a rebuild drops it only if the new one can be built."""
+    mongomock = pytest.importorskip('mongomock')
+    db = mongomock.MongoClient()['movie_app_test']
+    db.genres.create_index('name', name='name')
+    db.genres.insert_many([{'name': 'Drama'}, {'name': 'Drama'}, {'name': 'Crime'}])
+
+    assert ensure_indexes(db, ['genres']) == {'genres': ['movie_count_id']}
+    # Duplicates: the non-unique index is kept rather than dropped
+    assert ensure_indexes(db, ['genres'], rebuild=True) == {'genres': ['movie_count_id']}
+    assert not db.genres.index_information()['name'].get('unique')
+
+    db.genres.delete_one({'name': 'Drama'})
+    assert ensure_indexes(db, ['genres']) == {'genres': ['movie_count_id']}
+    assert not db.genres.index_information()['name'].get('unique')
+    assert ensure_indexes(db, ['genres'], rebuild=True) == {'genres': ['name', 'movie_count_id']}
+    assert db.genres.index_information()['name']['unique']
+
+def test_one_failed_index_does_not_stop_the_rest():
+    """A unique index that can't be built is logged and skipped."""
+    mongomock = pytest.importorskip('mongomock')
+    db = mongomock.MongoClient()['movie_app_test']
+    db.streaming_platforms_list.insert_many([{'name': 'Prime'}, {'name': 'Prime'}])
+    db.movie_search.insert_many([{'movie_id': 'a'}, {'movie_id': 'a'}])
+
+    created = ensure_indexes(db, ['streaming_platforms_list', 'movie_search'])
+    assert created == {'streaming_platforms_list': [], 'movie_search': ['tokens', 'words']}
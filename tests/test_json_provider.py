@@ -0,0 +1,57 @@
+import pytest
+from flask import Flask, jsonify
+from bson import ObjectId
+from datetime import datetime
+from api.utils import json_provider
+from api.utils.json_provider import BSONJSONProvider
+
+@pytest.fixture
+def app():
+    """Create a bare Flask application using the BSON JSON provider."""
+    app = Flask(__name__)
+    app.json = BSONJSONProvider(app)
+    return app
+
+@pytest.fixture
+def movie_detail():
+    """A movie_details document as it comes back from MongoDB."""
+    return {
+        '_id': ObjectId('65a1b2c3d4e5f60718293a4b'),
+        'movie_id': 'ABC123',
+        'title': 'Amélie',
+        'created_at': datetime(2024, 1, 2, 3, 4, 5, 678000),
+        'genres': [{'id': ObjectId('65a1b2c3d4e5f60718293a4c'), 'name': 'Comedy'}],
+        'streaming_platforms': [{
+            'platform_id': ObjectId('65a1b2c3d4e5f60718293a4d'),
+            'platform_name': 'Prime',
+            'available_until': None,
+            'added_date': datetime(2024, 1, 2)
+        }]
+    }
+
+def test_serializes_nested_bson_types(app, movie_detail):
+    """ObjectIds and datetimes are converted wherever they are nested."""
+    with app.app_context():
+        data = jsonify(movie_detail).get_json()
+    assert data['_id'] == '65a1b2c3d4e5f60718293a4b'
+    assert data['created_at'] == '2024-01-02T03:04:05.678000'
+    assert data['genres'][0]['id'] == '65a1b2c3d4e5f60718293a4c'
+    assert data['streaming_platforms'][0]['platform_id'] == '65a1b2c3d4e5f60718293a4d'
+    assert data['streaming_platforms'][0]['added_date'] == '2024-01-02T00:00:00'
+    assert data['streaming_platforms'][0]['available_until'] is None
+    assert data['title'] == 'Amélie'
+
+def test_stdlib_fallback_matches_fast_path(app, movie_detail, monkeypatch):
+    """The standard library encoder produces the same document as orjson."""
+    with app.app_context():
+        fast = app.json.loads(app.json.dumps(movie_detail))
+        monkeypatch.setattr(json_provider, 'orjson', None)
+        slow = app.json.loads(app.json.dumps(movie_detail))
+        indented = app.json.loads(app.json.dumps(movie_detail, indent=2))
+    assert fast == slow == indented
+
+def test_unknown_types_still_raise(app):
+    """Values with no JSON representation are rejected instead of silently dropped."""
+    with app.app_context():
+        with pytest.raises(TypeError):
+            app.json.dumps({'value': object()})
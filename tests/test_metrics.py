@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+from flask import Flask, jsonify
+from prometheus_client import REGISTRY
+from api.utils.metrics import CommandTimer, Metrics
+
+def test_requests_are_counted_per_route_and_status():
+    """Latency and status are labelled with the route template, and /metrics exposes them."""
+    app = Flask(__name__)
+    Metrics().init_app(app)
+
+    @app.route('/things/<thing_id>')
+    def get_thing(thing_id):
+        return jsonify({'id': thing_id}), 404 if thing_id == 'missing' else 200
+
+    labels = {'blueprint': '', 'route': '/things/<thing_id>', 'method': 'GET'}
+    before = REGISTRY.get_sample_value('http_requests_total', {**labels, 'status': '200'}) or 0
+    client = app.test_client()
+    client.get('/things/a')
+    client.get('/things/b')
+    client.get('/things/missing')
+
+    assert REGISTRY.get_sample_value('http_requests_total', {**labels, 'status': '200'}) == before + 2
+    assert REGISTRY.get_sample_value('http_requests_total', {**labels, 'status': '404'}) >= 1
+    assert REGISTRY.get_sample_value('http_requests_in_progress', {'blueprint': '', 'route': '/things/<thing_id>'}) == 0
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{blueprint="",le="0.005",method="GET",route="/things/<thing_id>"}' in body
+
+def test_mongo_commands_are_timed_per_collection():
+    """The collection named by the started event labels the finished command, getMore included."""
+    timer = CommandTimer()
+    labels = {'command': 'getMore', 'collection': 'movie_details'}
+    before = REGISTRY.get_sample_value('mongodb_command_duration_seconds_count', labels) or 0
+
+    timer.started(SimpleNamespace(command_name='getMore', request_id=7, connection_id=('db', 27017),
+                                  command={'getMore': 123, 'collection': 'movie_details'}))
+    timer.succeeded(SimpleNamespace(command_name='getMore', request_id=7, connection_id=('db', 27017),
+                                    duration_micros=1500))
+
+    assert REGISTRY.get_sample_value('mongodb_command_duration_seconds_count', labels) == before + 1
+    assert not timer._collections
@@ -0,0 +1,117 @@
+import pytest
+from flask import Flask
+from api import models
+from api.models.loader import RequestLoader
+from api.models.movie import Movie, MovieDetail
+
+class FakeCollection:
+    """Just enough of a pymongo collection to answer $in lookups and count them."""
+    def __init__(self, name, docs):
+        self.name = name
+        self.docs = docs
+        self.queries = []
+        self.projections = []
+    def find(self, filter, projection=None):
+        self.queries.append(filter)
+        self.projections.append(projection)
+        (field, condition), = filter.items()
+        docs = [dict(doc) for doc in self.docs if doc.get(field) in condition['$in']]
+        if not projection:
+            return docs
+        if any(value for name, value in projection.items() if name != '_id'):
+            return [{k: v for k, v in doc.items() if projection.get(k)} for doc in docs]
+        return [{k: v for k, v in doc.items() if projection.get(k, 1)} for doc in docs]
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+@pytest.fixture
+def db(monkeypatch):
+    """Two movies, one with details, behind counting fake collections."""
+    db = FakeDB(
+        movies=FakeCollection('movies', [
+            {'movie_id': 'a', 'title': 'Heat'},
+            {'movie_id': 'b', 'title': 'Ronin'},
+        ]),
+        movie_details=FakeCollection('movie_details', [
+            {'movie_id': 'a', 'director': 'Michael Mann'},
+        ])
+    )
+    monkeypatch.setattr(models, 'get_db', lambda: db)
+    return db
+
+def test_loader_dedups_keys_into_one_query(db):
+    """Repeated keys cost one $in query and come back in key order."""
+    loader = RequestLoader()
+    docs = loader.load_many(db.movies, 'movie_id', ['b', 'a', 'b', 'missing'])
+    assert [doc and doc['title'] for doc in docs] == ['Ronin', 'Heat', 'Ronin', None]
+    assert db.movies.queries == [{'movie_id': {'$in': ['b', 'a', 'missing']}}]
+
+def test_loader_reuses_earlier_loads(db):
+    """Keys loaded earlier, including misses and full documents, are not fetched again."""
+    loader = RequestLoader()
+    loader.load_many(db.movies, 'movie_id', ['a', 'missing'])
+    loader.load_many(db.movies, 'movie_id', ['a', 'missing'], {'title': 1})
+    loader.load_many(db.movies, 'movie_id', ['a', 'b'])
+    assert db.movies.queries == [
+        {'movie_id': {'$in': ['a', 'missing']}},
+        {'movie_id': {'$in': ['b']}}
+    ]
+
+def test_loader_projects_earlier_full_loads(db):
+    """A projected lookup answered from a full document gets only the projected fields, as from the server."""
+    db.movies.docs[0].update(_id=1, year=1995)
+    loader = RequestLoader()
+    loader.load_many(db.movies, 'movie_id', ['a'])
+    assert loader.load_many(db.movies, 'movie_id', ['a'], {'title': 1, '_id': 0}) == [
+        {'movie_id': 'a', 'title': 'Heat'}
+    ]
+    assert loader.load_many(db.movies, 'movie_id', ['a'], {'year': 0, '_id': 0}) == [
+        {'movie_id': 'a', 'title': 'Heat'}
+    ]
+    loader.load_many(db.movies, 'movie_id', ['a'], {'title.en': 1})
+    assert db.movies.queries == [{'movie_id': {'$in': ['a']}}, {'movie_id': {'$in': ['a']}}]
+
+def test_loader_keeps_the_key_field_in_any_projection(db):
+    """Excluding the key, alone or beside included fields, still matches documents to keys."""
+    for projection in ({'movie_id': 0}, {'title': 1, 'movie_id': 0}, {'title': 0}):
+        docs = RequestLoader().load_many(db.movies, 'movie_id', ['a', 'b'], projection)
+        assert [doc and doc['movie_id'] for doc in docs] == ['a', 'b']
+    assert db.movies.projections == [None, {'title': 1, 'movie_id': 1}, {'title': 0}]
+
+def test_get_full_movies_costs_one_query_per_collection(db):
+    """Composite reads batch every id into a single query per collection."""
+    app = Flask(__name__)
+    with app.app_context():
+        full = MovieDetail.get_full_movies(['a', 'b', 'a', 'missing'])
+        assert full[0]['details']['director'] == 'Michael Mann'
+        assert 'details' not in full[1]
+        assert full[2] == full[0]
+        assert full[3] is None
+        assert Movie.find_by_movie_id('b')['title'] == 'Ronin'
+    assert len(db.movies.queries) == 1
+    assert len(db.movie_details.queries) == 1
+
+def test_get_full_movie_is_one_aggregation_with_current_names(db):
+    """The full read is a single pipeline, and joined genre/platform names replace stale copies."""
+    genre_id, platform_id = object(), object()
+    pipelines = []
+    def aggregate(pipeline):
+        pipelines.append(pipeline)
+        return [{
+            'movie_id': 'a',
+            'streaming_platforms': [{'platform_id': platform_id, 'platform_name': 'Old'}],
+            'details': {'genres': [{'id': genre_id, 'name': 'Old'}, {'id': 'gone', 'name': 'Kept'}]},
+            '_genres': [{'_id': genre_id, 'name': 'Crime'}],
+            '_detail_platforms': [],
+            '_movie_platforms': [{'_id': platform_id, 'name': 'Prime'}],
+        }]
+    db.movies.aggregate = aggregate
+
+    movie = MovieDetail.get_full_movie('a', 'page')
+    assert len(pipelines) == 1
+    assert pipelines[0][-1]['$project']['details.director'] == 1
+    assert [genre['name'] for genre in movie['details']['genres']] == ['Crime', 'Kept']
+    assert movie['streaming_platforms'][0]['platform_name'] == 'Prime'
+    assert not any(key.startswith('_') for key in movie)
@@ -0,0 +1,97 @@
+import json
+from api.routes import movie_details as movie_details_routes
+from api.routes.movie_details import MAX_BATCH_IDS
+
+def test_batch_keeps_requested_order_and_reports_missing(mongo_app):
+    """Details come back in the order asked for, with null and a `missing` entry for unknown ids."""
+    app, db = mongo_app
+    db.movie_details.insert_many([{'movie_id': movie_id, 'title': title}
+                                  for movie_id, title in (('a', 'Heat'), ('b', 'Ronin'), ('c', 'Thief'))])
+    client = app.test_client()
+
+    response = client.get('/api/v1/movie-details/batch?ids=c,nope,a&fields=title')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['movie_details'] == [{'movie_id': 'c', 'title': 'Thief'}, None, {'movie_id': 'a', 'title': 'Heat'}]
+    assert body['missing'] == ['nope']
+
+    posted = client.post('/api/v1/movie-details/batch', json={'movie_ids': ['b', 'gone'], 'fields': 'title'})
+    assert posted.get_json() == {'movie_details': [{'movie_id': 'b', 'title': 'Ronin'}, None], 'missing': ['gone']}
+    listed = client.post('/api/v1/movie-details/batch', json={'movie_ids': ['b'], 'fields': ['title']})
+    assert listed.get_json() == {'movie_details': [{'movie_id': 'b', 'title': 'Ronin'}], 'missing': []}
+    assert client.post('/api/v1/movie-details/batch', json={'movie_ids': ['b'], 'fields': [1]}).status_code == 400
+
+def test_batch_answers_duplicate_ids_in_place(mongo_app):
+    """A repeated id is answered at every position it was asked at, and reported missing once."""
+    app, db = mongo_app
+    db.movie_details.insert_many([{'movie_id': 'a', 'title': 'Heat'}, {'movie_id': 'b', 'title': 'Ronin'}])
+    body = app.test_client().post('/api/v1/movie-details/batch', json={
+        'movie_ids': ['a', 'b', 'a', 'x', 'x'], 'fields': 'title'
+    }).get_json()
+    assert [detail and detail['title'] for detail in body['movie_details']] == ['Heat', 'Ronin', 'Heat', None, None]
+    assert body['missing'] == ['x']
+
+def test_batch_rejects_bad_id_lists(mongo_app):
+    """More than MAX_BATCH_IDS ids, no ids, or non-string ids are a 400."""
+    app, db = mongo_app
+    client = app.test_client()
+    too_many = [f'm{i}' for i in range(MAX_BATCH_IDS + 1)]
+    assert client.post('/api/v1/movie-details/batch', json={'movie_ids': too_many}).status_code == 400
+    assert client.get('/api/v1/movie-details/batch?ids=' + ','.join(too_many)).status_code == 400
+    assert client.post('/api/v1/movie-details/batch', json={'movie_ids': too_many[:MAX_BATCH_IDS]}).status_code == 200
+    assert client.get('/api/v1/movie-details/batch').status_code == 400
+    assert client.post('/api/v1/movie-details/batch', json={'movie_ids': [1, 2]}).status_code == 400
+
+def post_bulk(client, *lines, batch_size=10):
+    body = '\n'.join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+    response = client.post(f'/api/v1/movies/complete/bulk?batch_size={batch_size}', data=body,
+                           content_type='application/x-ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(row) for row in response.get_data(as_text=True).splitlines()]
+
+def test_bulk_reports_bad_lines_and_stores_the_rest(mongo_app, monkeypatch):
+    """Unparseable and invalid lines are errors by line number; good lines share new genres."""
+    app, db = mongo_app
+    ids = iter(['A', 'B', 'C'])
+    monkeypatch.setattr(movie_details_routes, 'generate_movie_id', lambda: next(ids))
+    rows = post_bulk(app.test_client(),
+                     {'title': 'Heat', 'genres': [{'name': 'Crime'}]},
+                     '{not json',
+                     {'year': 1998},
+                     {'title': 'Ronin', 'genres': [{'name': 'Crime'}, {'name': 'Crime'}]},
+                     batch_size=1)
+    assert [(row['line'], row['status'], row.get('movie_id')) for row in rows] == [
+        (1, 'created', 'A'), (2, 'error', None), (3, 'error', None), (4, 'created', 'B')
+    ]
+    assert rows[2]['error'] == 'Title is required'
+    assert sorted(movie['movie_id'] for movie in db.movies.find()) == ['A', 'B']
+    assert [(genre['name'], genre['movie_count']) for genre in db.genres.find()] == [('Crime', 2)]
+    assert sorted(entry['_id'] for entry in db.similar_movies_queue.find()) == ['A', 'B']
+
+def test_bulk_removes_movies_whose_details_failed(mongo_app, monkeypatch):
+    """A duplicate movie_id fails its line; a movie stored without its details is deleted again."""
+    app, db = mongo_app
+    db.movies.create_index('movie_id', unique=True)
+    db.movie_details.create_index('movie_id', unique=True)
+    db.movie_details.insert_one({'movie_id': 'C', 'title': 'Taken'})
+    ids = iter(['A', 'A', 'C', 'D'])
+    monkeypatch.setattr(movie_details_routes, 'generate_movie_id', lambda: next(ids))
+
+    rows = post_bulk(app.test_client(), *({'title': title} for title in ('Heat', 'Ronin', 'Thief', 'Collateral')))
+    assert [(row['line'], row['status'], row.get('movie_id')) for row in rows] == [
+        (1, 'created', 'A'), (2, 'error', None), (3, 'error', None), (4, 'created', 'D')
+    ]
+    assert 'duplicate' in rows[1]['error'].lower()
+    assert sorted(movie['movie_id'] for movie in db.movies.find()) == ['A', 'D']
+    assert [detail['title'] for detail in db.movie_details.find({'movie_id': {'$in': ['A', 'C', 'D']}})] == [
+        'Taken', 'Heat', 'Collateral'
+    ]
+
+def test_bulk_streams_a_row_as_each_batch_is_written(mongo_app):
+    """Rows for a batch follow the rows of lines that failed before it was written."""
+    app, db = mongo_app
+    rows = post_bulk(app.test_client(), {'title': 'Heat'}, {'year': 2000}, {'title': 'Ronin'}, {'year': 2001},
+                     batch_size=2)
+    assert [(row['line'], row['status']) for row in rows] == [(2, 'error'), (1, 'created'), (3, 'created'),
+                                                                (4, 'error')]
+    assert db.movies.count_documents({}) == 2
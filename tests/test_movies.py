@@ -1,9 +1,12 @@
 import pytest
 from api.models.movie import Movie, MovieDetail
+from api.utils.db import db
 from datetime import datetime
 
-@pytest.mark.asyncio
-async def test_movie_operations():
+# The models talk to the configured MongoDB directly
+pytestmark = pytest.mark.skipif(db is None, reason="MongoDB is not reachable")
+
+def test_movie_operations():
     """Test movie creation and retrieval operations."""
     # Generate unique movie_id using timestamp
     unique_id = f"test_{int(datetime.now().timestamp())}"
@@ -40,7 +43,7 @@ async def test_movie_operations():
     
     try:
         # Test 1: Create movie with details
-        result = await MovieDetail.create_with_movie(movie_data, movie_details)
+        result = MovieDetail.create_with_movie(movie_data, movie_details)
         assert result is not None
         assert result['movie_id'] == movie_data['movie_id']
         assert result['title'] == movie_data['title']
@@ -48,26 +51,26 @@ async def test_movie_operations():
         print("✅ Movie creation successful")
         
         # Test 2: Fetch movie by movie_id
-        movie = await Movie.find_by_movie_id(movie_data['movie_id'])
+        movie = Movie.find_by_movie_id(movie_data['movie_id'])
         assert movie is not None
         assert movie['title'] == movie_data['title']
         print("✅ Movie retrieval successful")
         
         # Test 3: Fetch movie details
-        details = await MovieDetail.find_by_movie_id(movie_data['movie_id'])
+        details = MovieDetail.find_by_movie_id(movie_data['movie_id'])
         assert details is not None
         assert details['director'] == movie_details['director']
         print("✅ Movie details retrieval successful")
         
         # Test 4: Get full movie
-        full_movie = await MovieDetail.get_full_movie(movie_data['movie_id'])
+        full_movie = MovieDetail.get_full_movie(movie_data['movie_id'])
         assert full_movie is not None
         assert full_movie['details'] is not None
         assert full_movie['details']['director'] == movie_details['director']
         print("✅ Full movie retrieval successful")
         
         # Test 5: Search by title
-        search_results = await Movie.search_by_title("Test")
+        search_results = Movie.search_by_title("Test")
         assert len(search_results) > 0
         assert any(m['movie_id'] == movie_data['movie_id'] for m in search_results)
         print("✅ Movie search successful")
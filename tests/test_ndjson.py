@@ -0,0 +1,19 @@
+import io
+from api.utils.ndjson import iter_ndjson
+
+def test_iter_ndjson_reports_each_line():
+    """Values and errors come back with their line numbers; blank lines are skipped."""
+    stream = io.BytesIO(b'{"title": "Heat"}\n\n{bad\n[1, 2]')
+    assert list(iter_ndjson(stream)) == [
+        (1, {'title': 'Heat'}, None),
+        (3, None, 'Invalid JSON: Expecting property name enclosed in double quotes: line 1 column 2 (char 1)'),
+        (4, [1, 2], None),
+    ]
+
+def test_iter_ndjson_skips_oversized_lines():
+    """A line over the limit is reported without losing the lines after it."""
+    stream = io.BytesIO(b'{"title": "' + b'x' * 100 + b'"}\n{"title": "Ronin"}\n')
+    assert list(iter_ndjson(stream, max_line_bytes=32)) == [
+        (1, None, 'Line exceeds 32 bytes'),
+        (2, {'title': 'Ronin'}, None),
+    ]
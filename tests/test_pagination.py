@@ -0,0 +1,57 @@
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from api.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+def test_cursor_round_trips_with_its_sort():
+    """A cursor decodes back to its sort value and _id under the sort it was made for."""
+    last_id = ObjectId()
+    token = encode_cursor(7.5, last_id, 'rating:desc')
+    assert decode_cursor(token, 'rating:desc') == (7.5, last_id)
+
+def test_cursor_rejected_under_another_sort():
+    """Replaying a cursor with a different ordering is an error, not a wrong page."""
+    token = encode_cursor('Heat', ObjectId(), 'title:asc')
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, 'title:desc')
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor('Heat', ObjectId()), 'title:asc')
+
+def test_cursor_round_trips_datetimes_and_missing_values():
+    """created_at cursors decode back to datetimes, and a null sort value stays null."""
+    last_id = ObjectId()
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(created_at, last_id)) == (created_at, last_id)
+    assert decode_cursor(encode_cursor(None, last_id)) == (None, last_id)
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor')
+
+def test_movie_pages_follow_next_through_ties(mongo_app):
+    """Walking `next` returns every movie once, newest first, across equal created_at values."""
+    app, db = mongo_app
+    created_at = [datetime(2024, 1, day) for day in (3, 2, 2, 2, 1, 1)]
+    db.movies.insert_many([{'movie_id': f'm{i}', 'title': f'Movie {i}', 'created_at': when}
+                           for i, when in enumerate(created_at)])
+    expected = [movie['movie_id'] for movie in
+                db.movies.find().sort([('created_at', -1), ('_id', -1)])]
+
+    client = app.test_client()
+    seen, cursor = [], None
+    while True:
+        url = '/api/v1/movies?limit=2&fields=movie_id' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url).get_json()
+        seen += [movie['movie_id'] for movie in page['movies']]
+        cursor = page['next']
+        if cursor is None:
+            break
+    assert seen == expected
+
+def test_movie_stream_applies_limit(mongo_app):
+    """?stream=true honours ?limit= when given and rejects a non-positive one."""
+    app, db = mongo_app
+    db.movies.insert_many([{'movie_id': f'm{i}', 'created_at': datetime(2024, 1, i + 1)} for i in range(5)])
+    client = app.test_client()
+    streamed = client.get('/api/v1/movies?stream=true&limit=2&fields=movie_id').get_json()
+    assert [movie['movie_id'] for movie in streamed] == ['m4', 'm3']
+    assert len(client.get('/api/v1/movies?stream=true').get_json()) == 5
+    assert client.get('/api/v1/movies?stream=true&limit=0').status_code == 400
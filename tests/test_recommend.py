@@ -0,0 +1,29 @@
+from api.utils.recommend import FeatureMatrix
+
+CATALOG = [
+    {'movie_id': 'heat', 'genres': [{'id': 'crime'}, {'id': 'thriller'}], 'director': 'Michael Mann',
+     'cast_members': ['Al Pacino', 'Robert De Niro'], 'year': '1995', 'rating': 8.3},
+    {'movie_id': 'collateral', 'genres': [{'id': 'crime'}, {'id': 'thriller'}], 'director': 'Michael Mann',
+     'cast_members': ['Tom Cruise'], 'year': '2004', 'rating': 7.5},
+    {'movie_id': 'casino', 'genres': [{'id': 'crime'}], 'director': 'Martin Scorsese',
+     'cast_members': ['Robert De Niro'], 'year': '1995', 'rating': 8.2},
+    {'movie_id': 'up', 'genres': [{'id': 'animation'}], 'year': '2009'},
+]
+
+def test_most_similar_ranks_by_shared_features_and_skips_seeds():
+    """Movies sharing more weighted features rank first; seeds and unrelated movies are left out."""
+    matrix = FeatureMatrix.build(CATALOG)
+    ranked = matrix.most_similar(['heat', 'unknown'], 5)
+    assert [movie_id for movie_id, _ in ranked] == ['collateral', 'casino']
+    assert 0 < ranked[1][1] < ranked[0][1] <= 1
+    assert matrix.most_similar(['unknown'], 5) == []
+
+def test_snapshot_round_trips_through_a_memory_map(tmp_path):
+    """A saved snapshot loads memory-mapped and answers exactly like the built matrix."""
+    built = FeatureMatrix.build(CATALOG)
+    path = str(tmp_path / 'recommendations')
+    built.save(path)
+    built.save(path)  # replacing an existing snapshot
+    loaded = FeatureMatrix.load(path)
+    assert loaded.size == 4
+    assert loaded.most_similar(['casino'], 3) == built.most_similar(['casino'], 3)
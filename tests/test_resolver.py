@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from bson import ObjectId
+from api.utils.resolver import NameResolver
+
+class FakeCollection:
+    """Just enough of a pymongo collection for NameResolver, counting round trips."""
+    def __init__(self, names):
+        self.docs = {name: ObjectId() for name in names}
+        self.calls = []
+    def find(self, filter, projection=None):
+        self.calls.append('find')
+        return [{'_id': self.docs[n], 'name': n} for n in filter['name']['$in'] if n in self.docs]
+    def bulk_write(self, operations, ordered=True):
+        self.calls.append('bulk_write')
+        upserted = {}
+        for index, operation in enumerate(operations):
+            name = operation._filter['name']
+            if name not in self.docs:
+                self.docs[name] = upserted[index] = ObjectId()
+        return SimpleNamespace(upserted_ids=upserted)
+
+def test_resolve_batches_lookups_and_creates_missing_names():
+    """Unknown names cost one lookup and one batch of upserts; known names none."""
+    genres = FakeCollection(['Drama'])
+    resolver = NameResolver('genres', lambda now: {'movie_count': 0})
+    db = {'genres': genres}
+
+    ids = resolver.resolve(db, ['Drama', 'Noir', 'Crime', 'Noir'])
+    assert ids == {name: genres.docs[name] for name in ('Drama', 'Noir', 'Crime')}
+    assert genres.calls == ['find', 'bulk_write']
+
+    assert resolver.resolve(db, ['Crime', 'Drama']) == {'Crime': ids['Crime'], 'Drama': ids['Drama']}
+    assert genres.calls == ['find', 'bulk_write']
+
+def test_forget_id_drops_the_cached_name():
+    """A renamed or deleted document is looked up again next time."""
+    genres = FakeCollection(['Drama'])
+    resolver = NameResolver('genres', lambda now: {})
+    db = {'genres': genres}
+    resolver.resolve(db, ['Drama'])
+    resolver.forget_id(genres.docs['Drama'])
+    resolver.resolve(db, ['Drama'])
+    assert genres.calls == ['find', 'find']
@@ -0,0 +1,52 @@
+import pytest
+from api.utils import search
+from api.utils.pagination import decode_cursor
+from api.utils.search import (build_search_pipeline, index_movie_title, normalize_title, search_candidates, search_titles,
+                              title_tokens, title_words)
+
+def test_normalize_title_strips_case_accents_and_punctuation():
+    """Titles normalize to lowercase, accent-free, space-separated words."""
+    assert normalize_title('Amélie: The  Movie!') == 'amelie the movie'
+    assert normalize_title(None) == ''
+
+def test_title_tokens_are_word_prefixes():
+    """Every prefix of every distinct word is indexed once."""
+    assert title_words('Dark dark Knight') == ['dark', 'knight']
+    assert title_tokens('Up Up') == ['u', 'up']
+    tokens = title_tokens('Dark Knight')
+    for token in ('d', 'da', 'dar', 'dark', 'k', 'kn', 'knight'):
+        assert token in tokens
+
+def test_search_pipeline_ranks_only_its_candidates():
+    """The pipeline starts from the candidate postings and scores them on exact word matches."""
+    pipeline = build_search_pipeline('the Knight', ['id1', 'id2'], limit=10)
+    assert pipeline[0] == {'$match': {'_id': {'$in': ['id1', 'id2']}}}
+    assert pipeline[1]['$addFields']['score']['$size']['$filter']['cond'] == {'$in': ['$$this', ['the', 'knight']]}
+    assert {'$limit': 11} in pipeline
+
+def test_search_ranks_and_pages_on_mongomock(monkeypatch):
+    """Exact word matches rank first, pages follow `next`, and only the newest candidates of each kind are scored."""
+    mongomock = pytest.importorskip('mongomock')
+    db = mongomock.MongoClient()['movie_app_test']
+    titles = ['Dark Water', 'The Dark Knight', 'Darkman', 'Knight and Day', 'Dark City']
+    db.movies.insert_many([{'movie_id': f'm{i}', 'title': title} for i, title in enumerate(titles)])
+    for i, title in enumerate(titles):
+        index_movie_title(db, f'm{i}', title)
+
+    page, cursor = search_titles(db, 'dark kni', limit=1)
+    assert [movie['title'] for movie in page] == ['The Dark Knight'] and cursor is None
+
+    first, cursor = search_titles(db, 'dark', limit=2, projection={'title': 1})
+    rest, end = search_titles(db, 'dark', limit=2, after=decode_cursor(cursor), projection={'title': 1})
+    assert end is None
+    # Exact matches (score 1), newest first, then Darkman's prefix match
+    assert [movie['title'] for movie in first + rest] == ['Dark City', 'The Dark Knight', 'Dark Water', 'Darkman']
+    assert set(first[0]) == {'title', 'score'}
+
+    # The newest two whole-word and the newest two prefix matches are ranked; older exact matches still are
+    monkeypatch.setattr(search, 'MAX_SEARCH_CANDIDATES', 2)
+    assert len(search_candidates(db, 'dark')) == 3
+    assert [movie['title'] for movie in search_titles(db, 'dark', limit=10)[0]] == [
+        'Dark City', 'The Dark Knight', 'Darkman'
+    ]
+    assert search_titles(db, 'zzz', limit=10) == ([], None)
@@ -0,0 +1,130 @@
+import pytest
+from datetime import datetime
+from api.utils import similarity as similarity_module
+from api.utils.similarity import (compute_similar_movies, drain_similar_movies, movie_features, queue_similar_movies,
+                                  rebuild_similar_movies, similarity, update_similar_movies, _top_neighbours)
+
+def test_similarity_weights_each_kind_of_overlap():
+    """Shared genres, cast, director and studio each add their weighted Jaccard score."""
+    a = movie_features({'genres': [{'id': 1}, {'id': 2}], 'cast_members': ['Ann', 'Bo'], 'director': 'Lee'})
+    b = movie_features({'genres': [{'id': 1}], 'cast_members': [' ann '], 'director': 'lee', 'studio': 'A24'})
+    assert similarity(a, b) == 3.0 * 1 / 2 + 1.5 * 1 / 2 + 2.0
+    assert similarity(a, b) == similarity(b, a)
+    assert similarity(a, movie_features({'genres': [{'id': 3}]})) == 0
+
+def test_top_neighbours_rank_by_score_then_rating():
+    """Movies sharing nothing are left out and ties go to the better rated movie."""
+    movie = {'movie_id': 'm', 'genres': [{'id': 1}]}
+    others = [
+        {'movie_id': 'low', 'genres': [{'id': 1}], 'rating': 5},
+        {'movie_id': 'high', 'genres': [{'id': 1}], 'rating': 8},
+        {'movie_id': 'none', 'genres': [{'id': 2}], 'rating': 9},
+        movie,
+    ]
+    neighbours = _top_neighbours(movie, movie_features(movie),
+                                 [(doc, movie_features(doc)) for doc in others], k=5)
+    assert [n['movie_id'] for n in neighbours] == ['high', 'low']
+    assert neighbours[0]['score'] == 3.0
+
+@pytest.fixture
+def db():
+    """movie_details for four movies, on mongomock."""
+    mongomock = pytest.importorskip('mongomock')
+    db = mongomock.MongoClient()['movie_app_test']
+    db.movie_details.insert_many([
+        {'movie_id': 'heat', 'title': 'Heat', 'rating': 8.3, 'director': 'Michael Mann',
+         'cast_members': ['Al Pacino', 'Robert De Niro'], 'genres': [{'id': 'crime'}]},
+        {'movie_id': 'thief', 'title': 'Thief', 'rating': 7.4, 'director': ' michael mann',
+         'cast_members': ['James Caan'], 'genres': [{'id': 'drama'}]},
+        {'movie_id': 'ronin', 'title': 'Ronin', 'rating': 7.2, 'director': 'John Frankenheimer',
+         'cast_members': ['robert de niro '], 'genres': [{'id': 'action'}]},
+        {'movie_id': 'ali', 'title': 'Ali', 'rating': 6.8, 'director': 'Michael Mann',
+         'cast_members': ['Will Smith'], 'genres': [{'id': 'sport'}]},
+    ])
+    return db
+
+def neighbour_ids(db, movie_id):
+    return [n['movie_id'] for n in db.similar_movies.find_one({'movie_id': movie_id})['neighbours']]
+
+def test_update_matches_features_the_way_the_rebuild_does(db):
+    """Differently spelled cast and director names are candidates for updates as for rebuilds."""
+    rebuild_similar_movies(db)
+    assert neighbour_ids(db, 'heat') == ['thief', 'ali', 'ronin']
+    assert update_similar_movies(db, 'heat') == db.similar_movies.find_one({'movie_id': 'heat'})['neighbours']
+    assert neighbour_ids(db, 'heat') == ['thief', 'ali', 'ronin']
+
+def test_update_adds_moves_and_removes_neighbours(db):
+    """A changed movie joins the lists it now scores in and leaves the ones it no longer does."""
+    rebuild_similar_movies(db)
+
+    db.movie_details.update_one({'movie_id': 'ronin'}, {'$set': {'cast_members': [], 'director': 'Michael Mann'}})
+    update_similar_movies(db, 'ronin')
+    assert 'ronin' in neighbour_ids(db, 'ali') and 'ali' in neighbour_ids(db, 'ronin')
+
+    db.movie_details.update_one({'movie_id': 'thief'}, {'$set': {'director': 'Someone Else'}})
+    update_similar_movies(db, 'thief')
+    assert neighbour_ids(db, 'thief') == []
+    assert 'thief' not in neighbour_ids(db, 'heat') and 'thief' not in neighbour_ids(db, 'ali')
+
+    db.movie_details.delete_one({'movie_id': 'ali'})
+    assert update_similar_movies(db, 'ali') is None
+    assert db.similar_movies.find_one({'movie_id': 'ali'}) is None
+    assert neighbour_ids(db, 'heat') == ['ronin']
+
+def test_compute_similar_movies_stores_nothing(db):
+    """A movie without a list is answered from the stored features without writing one."""
+    rebuild_similar_movies(db)
+    db.similar_movies.delete_one({'movie_id': 'heat'})
+    neighbours = compute_similar_movies(db, 'heat')
+    assert [n['movie_id'] for n in neighbours] == ['thief', 'ali', 'ronin']
+    assert neighbours[0]['title'] == 'Thief'
+    assert db.similar_movies.find_one({'movie_id': 'heat'}) is None
+    assert compute_similar_movies(db, 'missing') == []
+
+def test_writes_are_queued_and_drained(db, monkeypatch):
+    """Queued movies are refreshed once each, failures are queued again, and a rebuild clears the queue."""
+    rebuild_similar_movies(db)
+    db.movie_details.update_one({'movie_id': 'thief'}, {'$set': {'director': 'Someone Else'}})
+    queue_similar_movies(db, ['thief', 'ronin', 'thief'])
+    assert sorted(entry['_id'] for entry in db.similar_movies_queue.find()) == ['ronin', 'thief']
+    assert 'thief' in neighbour_ids(db, 'heat')
+
+    assert drain_similar_movies(db) == 2
+    assert 'thief' not in neighbour_ids(db, 'heat')
+    assert db.similar_movies_queue.count_documents({}) == 0
+
+    def fail(db, movie_id):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(similarity_module, 'update_similar_movies', fail)
+    queue_similar_movies(db, ['ali'])
+    assert drain_similar_movies(db) == 0
+    assert [entry['_id'] for entry in db.similar_movies_queue.find()] == ['ali']
+
+    monkeypatch.undo()
+    # Queued before the rebuild read movie_details, and after it
+    db.similar_movies_queue.update_one({'_id': 'ali'}, {'$set': {'queued_at': datetime(2000, 1, 1)}})
+    db.similar_movies_queue.insert_one({'_id': 'heat', 'queued_at': datetime(2100, 1, 1)})
+    rebuild_similar_movies(db)
+    assert [entry['_id'] for entry in db.similar_movies_queue.find()] == ['heat']
+
+def test_similar_route_validates_limit_and_queues_missing_lists(mongo_app):
+    """limit must be 1..TOP_K; a movie without a list gets [] and is queued, unknown ids are not."""
+    app, db = mongo_app
+    db.movie_details.insert_many([
+        {'movie_id': 'heat', 'title': 'Heat', 'director': 'Michael Mann'},
+        {'movie_id': 'ali', 'title': 'Ali', 'director': 'Michael Mann'},
+    ])
+    rebuild_similar_movies(db)
+    db.similar_movies.delete_one({'movie_id': 'heat'})
+    client = app.test_client()
+    for limit in ('0', '-1', str(similarity_module.TOP_K + 1), 'x'):
+        assert client.get(f'/api/v1/movie-details/similar?movie_id=heat&limit={limit}').status_code == 400
+
+    response = client.get('/api/v1/movie-details/similar?movie_id=heat')
+    assert (response.status_code, response.get_json()) == (200, [])
+    assert client.get('/api/v1/movie-details/similar?movie_id=nope').get_json() == []
+    assert [entry['_id'] for entry in db.similar_movies_queue.find()] == ['heat']
+
+    drain_similar_movies(db)
+    body = client.get('/api/v1/movie-details/similar?movie_id=heat&limit=1&fields=title').get_json()
+    assert body == [{'movie_id': 'ali', 'title': 'Ali'}]
@@ -0,0 +1,149 @@
+import threading
+import time
+import pytest
+from api.utils import suggest as suggest_module
+from api.utils.suggest import MAX_SUGGESTIONS, TitleSuggestIndex
+
+class FakeCursor(list):
+    """Just enough of a pymongo cursor for TitleSuggestIndex.build."""
+    def sort(self, *args):
+        return self
+    def limit(self, n):
+        return FakeCursor(self[:n])
+    def batch_size(self, n):
+        return self
+
+class FakeDB:
+    def __init__(self, docs):
+        self.movie_details = self
+        self.docs = docs
+    def find(self, *args):
+        return FakeCursor(self.docs)
+
+@pytest.fixture
+def index():
+    """An index built from a handful of movie_details documents."""
+    index = TitleSuggestIndex(refresh_seconds=0)
+    index.build(FakeDB([
+        {'movie_id': 'a', 'title': 'The Dark Knight', 'rating': 9.0},
+        {'movie_id': 'b', 'title': 'Dark Waters', 'rating': 7.1},
+        {'movie_id': 'c', 'title': 'Darkest Hour', 'rating': '7.4'},
+        {'movie_id': 'd', 'title': 'Knight and Day', 'rating': None},
+        {'movie_id': 'e', 'title': 'Amélie', 'rating': 8.3},
+    ]))
+    return index
+
+def ids(results):
+    return [r['movie_id'] for r in results]
+
+def test_prefix_matches_word_starts_ranked_by_rating(index):
+    """Any word start matches, and results come back best rated first."""
+    assert ids(index.suggest('dar')) == ['a', 'c', 'b']
+    assert ids(index.suggest('knight')) == ['a', 'd']
+    assert ids(index.suggest('dark k')) == ['a']
+    assert ids(index.suggest('AMEL')) == ['e']
+    assert index.suggest('ark') == []
+    assert index.suggest('  ') == []
+
+def test_limit_caps_results(index):
+    """Only the top `limit` titles are returned."""
+    assert ids(index.suggest('d', limit=2)) == ['a', 'c']
+
+def test_upsert_and_remove_patch_cached_prefixes(index):
+    """Writes are visible immediately, even for prefixes already cached."""
+    assert ids(index.suggest('dark')) == ['a', 'c', 'b']
+    index.upsert('b', 'Dark Waters', 9.5)
+    assert ids(index.suggest('dark')) == ['b', 'a', 'c']
+    index.upsert('b', 'Deep Waters', 9.5)
+    assert ids(index.suggest('dark')) == ['a', 'c']
+    assert ids(index.suggest('waters')) == ['b']
+    index.remove('a')
+    assert ids(index.suggest('dark')) == ['c']
+    assert ids(index.suggest('knight')) == ['d']
+
+def test_short_prefixes_are_precomputed(index, monkeypatch):
+    """One- and two-letter lookups never scan the index, and writes keep them current."""
+    monkeypatch.setattr(index, '_scan', lambda *args: pytest.fail(f'scanned {args[0]!r}'))
+    assert ids(index.suggest('d')) == ['a', 'c', 'b', 'd']
+    assert ids(index.suggest('kn')) == ['a', 'd']
+    assert index.suggest('zz') == []
+    index.upsert('f', 'Zorro', 6.0)
+    assert ids(index.suggest('zo')) == ['f']
+    index.remove('a')
+    assert ids(index.suggest('kn')) == ['d']
+
+def test_short_prefix_lists_are_recomputed_when_they_run_short():
+    """Removing titles from a truncated short-prefix list rebuilds it from the index."""
+    docs = [{'movie_id': f'm{i:02d}', 'title': f'Movie {i}', 'rating': i} for i in range(3 * MAX_SUGGESTIONS)]
+    index = TitleSuggestIndex(refresh_seconds=0)
+    index.build(FakeDB(docs))
+    for i in range(3 * MAX_SUGGESTIONS - 1, 2 * MAX_SUGGESTIONS - 2, -1):
+        index.remove(f'm{i:02d}')
+    expected = [f'm{i:02d}' for i in range(2 * MAX_SUGGESTIONS - 2, 2 * MAX_SUGGESTIONS - 2 - MAX_SUGGESTIONS, -1)]
+    assert ids(index.suggest('m', limit=MAX_SUGGESTIONS)) == expected
+
+def test_broad_prefixes_are_precomputed_and_scans_are_capped(monkeypatch):
+    """A longer prefix matching more than MAX_SCAN_KEYS keys is precomputed; others scan at most that many."""
+    monkeypatch.setattr(suggest_module, 'MAX_SCAN_KEYS', 3)
+    docs = [{'movie_id': f't{i}', 'title': f'The Movie {i}', 'rating': i} for i in range(5)]
+    docs.append({'movie_id': 'h', 'title': 'Heat', 'rating': 8.3})
+    index = TitleSuggestIndex(refresh_seconds=0)
+    index.build(FakeDB(docs))
+    assert {'the', 'the ', 'the m', 'movie'} <= set(index._precomputed)
+    assert 'hea' not in index._precomputed
+
+    scanned = []
+    original = index._scan
+    monkeypatch.setattr(index, '_scan', lambda keys, movies: scanned.append(len(keys)) or original(keys, movies))
+    assert ids(index.suggest('the')) == ['t4', 't3', 't2', 't1', 't0']
+    assert ids(index.suggest('heat')) == ['h']
+    assert scanned == [1]
+
+def test_lookup_scans_without_holding_the_lock(index, monkeypatch):
+    """A write can go ahead while a lookup ranks its slice, and the stale result isn't cached."""
+    original = index._scan
+
+    def scan(keys, movies):
+        writer = threading.Thread(target=index.upsert, args=('f', 'Darkman', 5.0))
+        writer.start()
+        writer.join(5)
+        assert not writer.is_alive()
+        return original(keys, movies)
+
+    monkeypatch.setattr(index, '_scan', scan)
+    assert ids(index.suggest('dark')) == ['a', 'c', 'b']
+    assert 'dark' not in index._cache
+    monkeypatch.setattr(index, '_scan', original)
+    assert ids(index.suggest('dark')) == ['a', 'c', 'b', 'f']
+
+def test_upsert_evicts_the_lowest_rated_title_past_capacity(index):
+    """A write that takes the index past max_titles drops its lowest-rated title."""
+    index.max_titles = 5
+    index.upsert('f', 'Dark Shadows', 6.2)
+    assert ids(index.suggest('dark')) == ['a', 'c', 'b', 'f']
+    assert index.suggest('knight and') == []
+    index.upsert('g', 'Darkman', 5.0)
+    assert ids(index.suggest('dark')) == ['a', 'c', 'b', 'f']
+    assert len(index._movies) == 5
+
+def test_lookups_wait_for_the_background_build():
+    """Before the first build finishes, suggestions are empty and the build runs off the request."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        started.set()
+        release.wait(5)
+        return FakeDB([{'movie_id': 'a', 'title': 'Heat', 'rating': 8.3}])
+
+    index = TitleSuggestIndex(refresh_seconds=0)
+    index._loader = loader
+    assert index.suggest('heat') == []
+    assert started.wait(5)
+    assert index.suggest('heat') == []
+    release.set()
+    for _ in range(100):
+        if index.loaded_at is not None:
+            break
+        time.sleep(0.01)
+    assert ids(index.suggest('heat')) == ['a']
@@ -0,0 +1,89 @@
+import pytest
+from flask import Flask, jsonify
+from api.utils import versions
+from api.utils.versions import CachedVersionStore, CollectionVersions, MemoryVersionStore
+
+@pytest.fixture
+def app():
+    """A bare app with one versioned read route and one write route."""
+    app = Flask(__name__)
+    app.config.update(VERSION_BACKEND='memory')
+    versions = CollectionVersions()
+    versions.init_app(app, get_db=None)
+    calls = {'count': 0}
+
+    @app.route('/genres', methods=['GET'])
+    @versions.etag('genres')
+    def get_genres():
+        calls['count'] += 1
+        return jsonify(['Action']), 200
+
+    @app.route('/genres', methods=['POST'])
+    @versions.bumps('genres')
+    def create_genre():
+        return jsonify({'message': 'created'}), 201
+
+    @app.route('/movies', methods=['POST'])
+    @versions.bumps('movies')
+    def create_movie():
+        return jsonify({'error': 'Title is required'}), 400
+
+    app.calls = calls
+    return app
+
+def test_matching_etag_returns_304_without_running_the_view(app):
+    """Revalidating an unchanged collection skips the view entirely."""
+    client = app.test_client()
+    first = client.get('/genres')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"')
+    second = client.get('/genres', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert app.calls['count'] == 1
+
+def test_etag_depends_on_query_args(app):
+    """Different query arguments never share an ETag."""
+    client = app.test_client()
+    assert client.get('/genres?page=1').headers['ETag'] != client.get('/genres?page=2').headers['ETag']
+
+def test_writes_change_the_etag(app):
+    """A successful write to the collection invalidates existing ETags; failed or unrelated writes do not."""
+    client = app.test_client()
+    etag = client.get('/genres').headers['ETag']
+    client.post('/movies')
+    assert client.get('/genres', headers={'If-None-Match': etag}).status_code == 304
+    client.post('/genres')
+    response = client.get('/genres', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+class CountingStore(MemoryVersionStore):
+    """A memory store that counts reads."""
+    def __init__(self):
+        super().__init__()
+        self.reads = []
+    def get_many(self, names):
+        names = list(names)
+        self.reads.append(names)
+        return super().get_many(names)
+
+def test_cached_store_reads_once_per_ttl(monkeypatch):
+    """Versions are reused until they expire; this worker's bumps are seen at once."""
+    now = [100.0]
+    monkeypatch.setattr(versions.time, 'monotonic', lambda: now[0])
+    backing = CountingStore()
+    store = CachedVersionStore(backing, ttl=1.0)
+
+    first = store.get_many(['genres', 'movies'])
+    assert store.get_many(['movies', 'genres']) == first
+    assert backing.reads == [['genres', 'movies']]
+
+    store.bump('genres')
+    assert store.get_many(['genres', 'movies'])['genres'] != first['genres']
+    assert backing.reads[-1] == ['genres']
+
+    backing.bump('movies')  # another worker's write
+    assert store.get_many(['movies']) == {'movies': first['movies']}
+    now[0] += 1.5
+    assert store.get_many(['movies'])['movies'] != first['movies']